@@ -0,0 +1,215 @@
+import logging
+import math
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import wave
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BLOCK_FRAMES = 1 << 16  # 64k frames: ~0.5 MB of stereo float32 per block
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class PcmStreamInfo:
+    def __init__(self, frame_rate: int, channels: int, sample_width: int, is_float: bool):
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.is_float = is_float
+        self.data_bytes: Optional[int] = None  # None = read to EOF (streamed WAV has no real size)
+
+
+def _read_exact(fh: BinaryIO, n: int) -> bytes:
+    out = b""
+    while len(out) < n:
+        chunk = fh.read(n - len(out))
+        if not chunk:
+            break
+        out += chunk
+    return out
+
+
+def read_wav_header(fh: BinaryIO) -> Optional[PcmStreamInfo]:
+    """Parse a RIFF/WAVE header and leave `fh` at the start of the sample data.
+
+    Works on non-seekable streams (e.g. an ffmpeg pipe, whose data size field is a
+    placeholder). Chunks after the data (LIST, smpl, ...) are excluded via data_bytes.
+    Returns None for anything that is not plain PCM or float WAV.
+    """
+    riff = _read_exact(fh, 12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        return None
+    info = None
+    while True:
+        header = _read_exact(fh, 8)
+        if len(header) < 8:
+            return None
+        chunk_id, size = header[:4], struct.unpack("<I", header[4:])[0]
+        if chunk_id == b"data":
+            if info is not None and 0 < size < 0xFFFFFFFF:
+                info.data_bytes = size
+            return info
+        body = _read_exact(fh, size + (size & 1))  # chunks are word aligned
+        if chunk_id == b"fmt ":
+            tag, channels, rate = struct.unpack("<HHI", body[:8])
+            bits = struct.unpack("<H", body[14:16])[0]
+            if tag == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                tag = struct.unpack("<H", body[24:26])[0]
+            if tag == _WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+                info = PcmStreamInfo(rate, channels, bits // 8, False)
+            elif tag == _WAVE_FORMAT_FLOAT and bits == 32:
+                info = PcmStreamInfo(rate, channels, 4, True)
+            else:
+                return None
+
+
+def _to_float32(raw: bytes, info: PcmStreamInfo) -> np.ndarray:
+    """Interleaved bytes -> (frames, channels) float32 in [-1, 1]."""
+    width = info.sample_width
+    if info.is_float:
+        data = np.frombuffer(raw, dtype="<f4")
+    elif width == 1:  # 8-bit wav is unsigned
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 3:  # no numpy dtype for 24-bit: assemble into the top of an int32
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        data = ((b[:, 0] << 8) | (b[:, 1] << 16) | (b[:, 2] << 24)).astype(np.float32) / 2147483648.0
+    else:
+        dtype = "<i2" if width == 2 else "<i4"
+        data = np.frombuffer(raw, dtype=dtype).astype(np.float32) / float(2 ** (8 * width - 1))
+    return data.reshape(-1, info.channels)
+
+
+def _ffmpeg_stream(src_path: str) -> Tuple[subprocess.Popen, BinaryIO]:
+    """ffmpeg decoding to float WAV on stdout; stderr goes to a temp file (a pipe could fill up and stall it)."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError(f"Cannot decode {os.path.basename(src_path)}: not a PCM WAV file and ffmpeg is not installed")
+    stderr = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(
+            [ffmpeg, "-v", "error", "-i", src_path, "-f", "wav", "-acodec", "pcm_f32le", "-"],
+            stdout=subprocess.PIPE, stderr=stderr)
+    except OSError:
+        stderr.close()
+        raise
+    return proc, stderr
+
+
+def _stderr_tail(stderr: BinaryIO, max_lines: int = 3, max_bytes: int = 4096) -> str:
+    """Last few lines ffmpeg wrote to stderr, for the error message."""
+    stderr.seek(0, os.SEEK_END)
+    stderr.seek(max(0, stderr.tell() - max_bytes))
+    lines = stderr.read().decode("utf-8", "replace").strip().splitlines()
+    return " | ".join(line.strip() for line in lines[-max_lines:])
+
+
+def iter_pcm_blocks(src_path: str, block_frames: int = BLOCK_FRAMES) -> Tuple[PcmStreamInfo, Iterator[np.ndarray]]:
+    """Stream any audio file as (frames, channels) float32 blocks without decoding it whole.
+
+    PCM/float WAV is read directly; everything else is decoded by an ffmpeg pipe. If ffmpeg
+    exits with an error, the last next() on the block iterator raises RuntimeError, so a
+    decode that fails partway is never mistaken for a shorter track.
+    """
+    fh = open(src_path, "rb")
+    info = read_wav_header(fh)
+    proc, stderr = None, None
+    if info is None:
+        fh.close()
+        proc, stderr = _ffmpeg_stream(src_path)
+        fh = proc.stdout
+        info = read_wav_header(fh)
+        if info is None:
+            proc.kill()
+            proc.wait()
+            fh.close()
+            detail = _stderr_tail(stderr)
+            stderr.close()
+            raise RuntimeError(f"ffmpeg could not decode {os.path.basename(src_path)}: {detail}")
+
+    def blocks() -> Iterator[np.ndarray]:
+        frame_bytes = info.sample_width * info.channels
+        remaining = info.data_bytes
+        finished = False
+        try:
+            while remaining is None or remaining > 0:
+                want = block_frames * frame_bytes
+                raw = _read_exact(fh, want if remaining is None else min(want, remaining))
+                if remaining is not None:
+                    remaining -= len(raw)
+                raw = raw[:len(raw) - len(raw) % frame_bytes]
+                if not raw:
+                    break
+                yield _to_float32(raw, info)
+            finished = True
+        finally:
+            fh.close()
+            if proc is not None:
+                if not finished:
+                    proc.kill()  # the consumer stopped early
+                proc.wait()
+                detail = _stderr_tail(stderr)
+                stderr.close()
+                if finished and proc.returncode != 0:
+                    raise RuntimeError(f"ffmpeg failed decoding {os.path.basename(src_path)} "
+                                       f"(exit {proc.returncode}): {detail}")
+
+    return info, blocks()
+
+
+def normalize_to_wav(src_path: str, dst_path: str, target_peak_dbfs: float = -1.0,
+                     min_peak_dbfs: float = -2.0, block_frames: int = BLOCK_FRAMES) -> Dict:
+    """Peak-normalize any audio file into a 16-bit PCM WAV with bounded memory.
+
+    Pass 1 streams the decoded audio into a float32 intermediate file (memory-mapped
+    later) while measuring peak and RMS; pass 2 applies the gain block by block and
+    writes PCM16. Files whose peak is already above `min_peak_dbfs` are not boosted.
+    Memory use is a few blocks, independent of file length.
+    """
+    tmp_path = dst_path + ".f32.tmp"
+    info, blocks = iter_pcm_blocks(src_path, block_frames)
+    peak, sum_sq, frames = 0.0, 0.0, 0
+    try:
+        with open(tmp_path, "wb") as tmp:
+            for block in blocks:
+                peak = max(peak, float(np.abs(block).max()))
+                sum_sq += float(np.square(block, dtype=np.float64).sum())
+                frames += block.shape[0]
+                tmp.write(block.tobytes())
+
+        peak_dbfs = 20 * math.log10(peak) if peak > 0 else float("-inf")
+        rms = math.sqrt(sum_sq / (frames * info.channels)) if frames else 0.0
+        gain_db = 0.0
+        if peak > 0 and peak_dbfs < min_peak_dbfs:
+            gain_db = target_peak_dbfs - peak_dbfs
+        gain = 10 ** (gain_db / 20.0)
+
+        with wave.open(dst_path, "wb") as out:
+            out.setnchannels(info.channels)
+            out.setsampwidth(2)
+            out.setframerate(info.frame_rate)
+            if frames:
+                pcm = np.memmap(tmp_path, dtype=np.float32, mode="r", shape=(frames, info.channels))
+                for start in range(0, frames, block_frames):
+                    block = pcm[start:start + block_frames] * np.float32(gain * 32768.0)
+                    out.writeframes(np.clip(np.rint(block), -32768, 32767).astype("<i2").tobytes())
+                del pcm
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {
+        "frames": frames,
+        "frame_rate": info.frame_rate,
+        "channels": info.channels,
+        "peak_dbfs": peak_dbfs,
+        "rms_dbfs": 20 * math.log10(rms) if rms > 0 else float("-inf"),
+        "gain_db": gain_db,
+    }
@@ -1,9 +1,65 @@
 import os
 import math
+import asyncio
 import random
 import time
-from pydub import AudioSegment
-from typing import Dict, Tuple, Optional, List
+from dataclasses import dataclass, field
+import numpy as np
+from typing import Any, Dict, NamedTuple, Tuple, Optional, List
+
+from .dsp import time_stretch
+from .pcm_store import PcmHandle, PcmStore, default_store
+
+
+class StagedDna(NamedTuple):
+    """A fully decoded + analyzed track waiting to be swapped in (a handle on shared PCM)."""
+    segment: PcmHandle
+    filename: str
+    base_tempo: float
+    info: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class ModulationSnapshot:
+    """Everything the modulator decided for one tick, computed exactly once.
+
+    Broadcasts, game instructions and metrics all read the same snapshot; the legacy
+    (intensity/filter/gain) and advanced views are derived from it rather than recomputed.
+    """
+    timestamp: float
+    emotion_vector: Dict[str, float]
+    tempo_bpm: float
+    tempo_multiplier: float
+    primary_emotion: str
+    base_tempo: float
+    intensity: float
+    current_track: Optional[str] = None
+    advanced: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def filter_cutoff_hz(self) -> int:
+        return 500 + int(4500 * self.intensity)  # 500Hz to 5000Hz
+
+    @property
+    def gain(self) -> float:
+        return 0.6 + 0.4 * self.intensity  # 0.6 to 1.0
+
+    def legacy_view(self) -> Dict[str, Any]:
+        """Legacy simple modulation fields (retained for existing clients)."""
+        return {
+            "intensity": round(self.intensity, 4),
+            "filter_cutoff_hz": self.filter_cutoff_hz,
+            "gain": round(self.gain, 3),
+        }
+
+    def modulation_view(self) -> Dict[str, Any]:
+        """Legacy fields + advanced descriptor nested under 'advanced' (studio contract)."""
+        view = self.legacy_view()
+        view["advanced"] = self.advanced
+        return view
+
+    def game_instruction(self) -> Dict[str, Any]:
+        return {"primary_emotion": self.primary_emotion, "tempo_bpm": self.tempo_bpm}
 
 class AudioModulator:
     """Music DNA modulation engine.
@@ -18,15 +74,20 @@ class AudioModulator:
     Backward compatibility: get_modulation_params() still returns (tempo, primary_emotion)
     so existing consumers keep working.
     """
-    def __init__(self):
-        self.base_dna: Optional[AudioSegment] = None
+    def __init__(self, pcm_store: Optional[PcmStore] = None):
+        # Decoded audio lives once in a process-wide refcounted store; base_dna is our handle on it
+        self.pcm_store = pcm_store or default_store
+        self.base_dna: Optional[PcmHandle] = None
         self.current_dna_file: Optional[str] = None
         self.base_tempo: float = 120.0  # Default BPM (placeholder until tempo detection integrated)
 
         # Internal evolving state for smoother / less static feel
         self._last_target_tempo: Optional[float] = None
         self._last_announced_tempo: Optional[float] = None
-        self._tempo_smoothing_factor: float = 0.15  # exponential smoothing
+        self._tempo_smoothing_factor: float = 0.15  # exponential smoothing per reference tick
+        self._tempo_reference_tick: float = 0.5  # seconds; smoothing is scaled to the real tick interval
+        self._last_smoothing_time: Optional[float] = None
+        self.last_snapshot: Optional[ModulationSnapshot] = None
         self._section_index: int = 0
         self._phrase_index: int = 0
         self._last_section_change: float = time.time()
@@ -35,41 +96,128 @@ class AudioModulator:
         self._phrase_duration_beats: int = 8
         self._beat_counter: float = 0.0  # approximate beats passed (updated externally via tick if needed)
         self._rng = random.Random(42)
+        self._track_started_at: Optional[float] = None
+        # Optional segment-level navigation (see segment_index.SegmentIndex)
+        self.segment_index = None
+        self._segment: int = -1
+        self._segment_started_at: float = 0.0
+        self._load_generation: int = 0
 
     # --- Core DNA Loading ---
+    # Loading is double-buffered: a new track is decoded and analyzed into a staging slot
+    # (off the event loop for load_dna_async) and only then swapped in with plain attribute
+    # assignments, so the active track stays valid - and modulation keeps flowing - throughout.
+
+    def _decode_dna(self, file_path: str) -> "StagedDna":
+        """Decode + analyze a track without touching the active one. Raises on failure.
+
+        The samples go into the shared PCM store, so modulators loading the same audio
+        end up holding views of a single read-only copy.
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        # pydub is only needed for files outside the warm library; import it on first use
+        from pydub import AudioSegment
+        from .dna_library import audio_segment_to_array
+
+        segment = AudioSegment.from_file(file_path)
+        raw, scale = audio_segment_to_array(segment)
+        handle = self.pcm_store.acquire_array(raw * np.float32(scale), segment.frame_rate,
+                                              name=os.path.basename(file_path))
+        # Simple analysis (can be replaced with librosa for more accuracy)
+        base_tempo = 120.0 # Placeholder, real tempo detection is complex
+        info = {
+            "duration_seconds": handle.duration_seconds,
+            "channels": handle.channels,
+            "sample_rate": handle.frame_rate,
+            "base_tempo_estimate": base_tempo
+        }
+        return StagedDna(handle, os.path.basename(file_path), base_tempo, info)
+
+    def _swap_in(self, staged: "StagedDna"):
+        previous = self.base_dna
+        self.base_dna = staged.segment
+        self.current_dna_file = staged.filename
+        self.base_tempo = staged.base_tempo
+        self._track_started_at = time.time()
+        self._segment = -1  # restart segment navigation inside the new track
+        if previous is not None and previous is not staged.segment:
+            previous.release()  # unreferenced PCM may now be evicted under the store's budget
+
+    def seconds_to_next_beat(self, beats: int = 1, now: Optional[float] = None) -> float:
+        """Time until the next multiple of `beats` on the active track's beat grid (0 if nothing is playing)."""
+        if not self.base_dna or self._track_started_at is None or beats <= 0:
+            return 0.0
+        now = time.time() if now is None else now
+        period = beats * 60.0 / (self.base_tempo or 120.0)
+        elapsed = now - self._track_started_at
+        return (period - elapsed % period) % period
 
     def load_dna(self, file_path: str) -> Dict:
-        """Loads a music file and analyzes its basic properties."""
-        try:
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
-
-            self.base_dna = AudioSegment.from_file(file_path)
-            self.current_dna_file = os.path.basename(file_path)
-            
-            # Simple analysis (can be replaced with librosa for more accuracy)
-            self.base_tempo = 120.0 # Placeholder, real tempo detection is complex
-            
-            info = {
-                "duration_seconds": self.base_dna.duration_seconds,
-                "channels": self.base_dna.channels,
-                "sample_rate": self.base_dna.frame_rate,
-                "base_tempo_estimate": self.base_tempo
-            }
-            return info
-        except Exception as e:
-            self.base_dna = None
-            self.current_dna_file = None
-            raise e
+        """Loads a music file and analyzes its basic properties.
 
-    def get_modulation_params(self, emotion_vector: Dict[str, float]) -> Tuple[float, str]:
+        On failure the previously active track is left in place and the error is re-raised.
         """
-        Determines audio modulation parameters based on the emotion vector.
-        Returns (target_tempo, primary_emotion).
+        staged = self._decode_dna(file_path)
+        self._load_generation += 1
+        self._swap_in(staged)
+        return dict(staged.info)
+
+    async def load_dna_async(self, file_path: str, align_beats: int = 0) -> Dict:
+        """Decode off the event loop, then swap atomically; the old track keeps playing meanwhile.
+
+        align_beats > 0 delays the swap to the next multiple of that many beats of the
+        current track (1 = next beat, 4 = next bar). If another load starts while this one
+        is in flight, the newer request wins and this one returns without swapping.
         """
-        if not self.base_dna:
-            return 120.0, "None"
-            
+        self._load_generation += 1
+        generation = self._load_generation
+        loop = asyncio.get_running_loop()
+        staged = await loop.run_in_executor(None, self._decode_dna, file_path)
+        return await self._swap_when_ready(staged, align_beats, generation)
+
+    def stage_track(self, track) -> "StagedDna":
+        """Stage an already decoded library track (see dna_library.PcmTrack) - no decoding involved."""
+        base_tempo = 120.0 # Placeholder, real tempo detection is complex
+        info = dict(track.info())
+        info["base_tempo_estimate"] = base_tempo
+        return StagedDna(track.open(self.pcm_store), track.name, base_tempo, info)
+
+    def select_track(self, track) -> Dict:
+        """Synchronously switch to a decoded library track (embedded / offline use; see select_track_async)."""
+        staged = self.stage_track(track)
+        self._load_generation += 1
+        self._swap_in(staged)
+        return dict(staged.info)
+
+    def reset_clock(self, now: float):
+        """Restart section / phrase progression at `now` (e.g. t=0 of an offline timeline)."""
+        self._section_index = self._phrase_index = 0
+        self._last_section_change = self._last_phrase_change = now
+        self._last_target_tempo = self._last_smoothing_time = None
+        self._track_started_at = now
+        self._rng.seed(42)
+
+    async def select_track_async(self, track, align_beats: int = 0) -> Dict:
+        """Switch to a warm library track; same swap semantics as load_dna_async."""
+        self._load_generation += 1
+        return await self._swap_when_ready(self.stage_track(track), align_beats, self._load_generation)
+
+    async def _swap_when_ready(self, staged: "StagedDna", align_beats: int, generation: int) -> Dict:
+        delay = self.seconds_to_next_beat(align_beats) if align_beats else 0.0
+        if delay > 0:
+            await asyncio.sleep(delay)
+        info = dict(staged.info)
+        info["swap_delay_seconds"] = round(delay, 3)
+        if generation != self._load_generation:
+            staged.segment.release()
+            info["superseded"] = True
+            return info
+        self._swap_in(staged)
+        return info
+
+    def _target_tempo(self, emotion_vector: Dict[str, float]) -> Tuple[float, str]:
+        """Unsmoothed tempo target and primary emotion for an emotion vector."""
         # Determine primary emotion
         primary_emotion = max(emotion_vector, key=emotion_vector.get) if emotion_vector else "calm"
         intensity = emotion_vector.get(primary_emotion, 0.0)
@@ -85,25 +233,116 @@ class AudioModulator:
         
         min_mult, max_mult = tempo_map.get(primary_emotion, (1.0, 1.0))
         tempo_multiplier = min_mult + (max_mult - min_mult) * intensity
-        target_tempo = self.base_tempo * tempo_multiplier
-
-        # In a full implementation, you would apply these changes here:
-        # e.g., self.change_speed(tempo_multiplier)
-        # e.g., self.apply_filter(primary_emotion)
-        # and then stream the resulting audio.
-        # For this version, we are just returning the parameters.
+        return self.base_tempo * tempo_multiplier, primary_emotion
 
-        # Apply smoothing so tempo does not jump every 500ms dramatically
-        if self._last_target_tempo is None:
+    def _smooth_tempo(self, target_tempo: float, now: float) -> float:
+        """Exponential smoothing scaled by elapsed time, so the result is independent of tick rate."""
+        if self._last_target_tempo is None or self._last_smoothing_time is None:
             smoothed = target_tempo
         else:
-            smoothed = (self._tempo_smoothing_factor * target_tempo +
-                        (1 - self._tempo_smoothing_factor) * self._last_target_tempo)
+            dt = max(0.0, now - self._last_smoothing_time)
+            # 0.15 per 0.5s reference tick -> equivalent continuous-time factor for dt
+            alpha = 1.0 - (1.0 - self._tempo_smoothing_factor) ** (dt / self._tempo_reference_tick)
+            smoothed = alpha * target_tempo + (1 - alpha) * self._last_target_tempo
         self._last_target_tempo = smoothed
         self._last_announced_tempo = smoothed
-        return round(smoothed, 2), primary_emotion
+        self._last_smoothing_time = now
+        return smoothed
+
+    def snapshot(self, emotion_vector: Dict[str, float], now: Optional[float] = None,
+                 forecast: Optional[Dict[str, float]] = None, forecast_horizon: float = 0.0) -> ModulationSnapshot:
+        """Compute this tick's modulation once (tempo smoothing included) and keep it as last_snapshot.
+
+        If a `forecast` vector (see EmotionPredictor) is given, pre-warm hints for it are
+        added to the advanced descriptor under 'forecast'.
+        """
+        now = time.time() if now is None else now
+        vector = dict(emotion_vector or {})
+        intensity = max(vector.values()) if vector else 0.0
+        if not self.base_dna:
+            snap = ModulationSnapshot(
+                timestamp=now, emotion_vector=vector, tempo_bpm=120.0, tempo_multiplier=1.0,
+                primary_emotion="None", base_tempo=self.base_tempo, intensity=intensity,
+                current_track=self.current_dna_file,
+            )
+        else:
+            target_tempo, primary_emotion = self._target_tempo(vector)
+            tempo = round(self._smooth_tempo(target_tempo, now), 2)
+            advanced = self._build_descriptor(vector, tempo, now)
+            if forecast is not None:
+                advanced['forecast'] = self.preview(forecast, forecast_horizon, current=advanced)
+            snap = ModulationSnapshot(
+                timestamp=now, emotion_vector=vector, tempo_bpm=tempo,
+                tempo_multiplier=round(tempo / (self.base_tempo or 120.0), 4),
+                primary_emotion=primary_emotion, base_tempo=self.base_tempo, intensity=intensity,
+                current_track=self.current_dna_file,
+                advanced=advanced,
+            )
+        self.last_snapshot = snap
+        return snap
+
+    def get_modulation_params(self, emotion_vector: Dict[str, float]) -> Tuple[float, str]:
+        """
+        Determines audio modulation parameters based on the emotion vector.
+        Returns (target_tempo, primary_emotion).
+        """
+        snap = self.snapshot(emotion_vector)
+        return snap.tempo_bpm, snap.primary_emotion
 
     # --- Advanced Modulation Descriptor ---
+    @staticmethod
+    def _energy_valence(emotion_vector: Dict[str, float]) -> Tuple[float, float]:
+        # Energy & Valence heuristics
+        energy = min(1.0, (
+            emotion_vector.get('excitement', 0) * 0.5 +
+            emotion_vector.get('tension', 0) * 0.3 +
+            emotion_vector.get('fear', 0) * 0.2
+        ))
+        # Joy minus dark emotions for valence
+        valence = emotion_vector.get('joy', 0) * 0.7 + emotion_vector.get('calm', 0) * 0.3 - (
+            emotion_vector.get('fear', 0) * 0.5 + emotion_vector.get('tension', 0) * 0.3
+        )
+        valence = max(0.0, min(1.0, 0.5 + valence * 0.5))  # normalize around 0.5 baseline
+        return energy, valence
+
+    @staticmethod
+    def _layers(emotion_vector: Dict[str, float], energy: float, valence: float) -> Dict[str, bool]:
+        return {
+            'core': True,
+            'percussion_plus': energy > 0.35,
+            'high_arps': valence > 0.55 and energy > 0.4,
+            'dark_pad': valence < 0.45 and emotion_vector.get('fear',0) > 0.2,
+            'sub_pulse': emotion_vector.get('tension',0) > 0.25
+        }
+
+    def preview(self, emotion_vector: Dict[str, float], horizon: float, current: Optional[Dict] = None) -> Dict:
+        """Side-effect free hints for a forecast vector, so clients can pre-warm transitions.
+
+        `current` is the descriptor being sent this tick; when given, the hints list the
+        layers expected to switch and whether the primary emotion / tempo will move.
+        """
+        target_tempo, primary_emotion = self._target_tempo(emotion_vector)
+        energy, valence = self._energy_valence(emotion_vector)
+        layers = self._layers(emotion_vector, energy, valence)
+        hints = {
+            'horizon_seconds': horizon,
+            'vector': {k: round(v, 4) for k, v in emotion_vector.items()},
+            'primary_emotion': primary_emotion,
+            'tempo_bpm': round(target_tempo, 2),
+            'energy': round(energy, 3),
+            'valence': round(valence, 3),
+            'layers': layers,
+        }
+        if current:
+            current_layers = current.get('layers', {})
+            hints['prewarm'] = {
+                'layers_on': [k for k, v in layers.items() if v and not current_layers.get(k)],
+                'layers_off': [k for k, v in layers.items() if not v and current_layers.get(k)],
+                'primary_change': primary_emotion != current.get('primary_emotion'),
+                'tempo_delta_bpm': round(target_tempo - current.get('tempo_bpm', target_tempo), 2),
+            }
+        return hints
+
     def compute_modulation(self, emotion_vector: Dict[str, float]) -> Dict:
         """Return a rich modulation descriptor capturing multiple musical dimensions.
 
@@ -118,10 +357,14 @@ class AudioModulator:
           fx: list of effect intents with target parameters
           layers: suggestion which stem groups should be active (future)
           micro_variation: seed + toggles to randomize arps, ornaments client-side
+          segment: (when a segment index is attached) current bar-sized segment, possibly in
+                   another library track; 'jump' marks a non-linear move to a precomputed jump point
+          forecast: (when a predictor is attached) see preview()
         """
-        if not self.base_dna:
-            return {}
+        return self.snapshot(emotion_vector).advanced
 
+    def _build_descriptor(self, emotion_vector: Dict[str, float], tempo: float, now: float) -> Dict:
+        """Advanced descriptor for an already smoothed tempo (see compute_modulation for fields)."""
         # Derive primary emotion & intensities
         primary_emotion = 'calm'
         intensity = 0.0
@@ -129,24 +372,11 @@ class AudioModulator:
             primary_emotion = max(emotion_vector, key=emotion_vector.get)
             intensity = emotion_vector.get(primary_emotion, 0.0)
 
-        # Energy & Valence heuristics
-        energy = min(1.0, (
-            emotion_vector.get('excitement', 0) * 0.5 +
-            emotion_vector.get('tension', 0) * 0.3 +
-            emotion_vector.get('fear', 0) * 0.2
-        ))
-        # Joy minus dark emotions for valence
-        valence = emotion_vector.get('joy', 0) * 0.7 + emotion_vector.get('calm', 0) * 0.3 - (
-            emotion_vector.get('fear', 0) * 0.5 + emotion_vector.get('tension', 0) * 0.3
-        )
-        valence = max(0.0, min(1.0, 0.5 + valence * 0.5))  # normalize around 0.5 baseline
+        energy, valence = self._energy_valence(emotion_vector)
 
-        # Tempo (reuse mapping logic)
-        tempo, _ = self.get_modulation_params(emotion_vector)
         tempo_multiplier = tempo / (self.base_tempo or 120.0)
 
         # Section / phrase progression (time-based fallback). Without a beat clock, we approximate
-        now = time.time()
         section_elapsed = now - self._last_section_change
         phrase_elapsed = now - self._last_phrase_change
         # Use seconds->beats approximation (base tempo) to decide rollovers
@@ -186,13 +416,9 @@ class AudioModulator:
             fx.append({'type': 'saturation', 'drive': round(0.3 + drive * 0.7, 3)})
 
         # Layer activation suggestions (future stems). Always include 'core'
-        layers = {
-            'core': True,
-            'percussion_plus': energy > 0.35,
-            'high_arps': valence > 0.55 and energy > 0.4,
-            'dark_pad': valence < 0.45 and emotion_vector.get('fear',0) > 0.2,
-            'sub_pulse': emotion_vector.get('tension',0) > 0.25
-        }
+        layers = self._layers(emotion_vector, energy, valence)
+
+        segment = self._advance_segment(energy, valence, tempo_multiplier, now)
 
         # Micro-variation seed ensures deterministic randomness per phrase
         phrase_seed = hash((self._section_index, self._phrase_index)) & 0xFFFFFFFF
@@ -224,10 +450,42 @@ class AudioModulator:
             'layers': layers,
             'micro_variation': micro_variation
         }
+        if segment is not None:
+            descriptor['segment'] = segment
         return descriptor
 
-    def change_speed(self, audio_segment: AudioSegment, speed: float = 1.0) -> AudioSegment:
-        """Changes the speed of an audio segment without changing pitch. (Currently unused)"""
+    def _advance_segment(self, energy: float, valence: float, tempo_multiplier: float, now: float) -> Optional[Dict]:
+        """Step through the segment index on its bar grid, picking each next bar by vector lookup."""
+        index = self.segment_index
+        if index is None or not len(index):
+            return None
+        jumped = False
+        if self._segment < 0:
+            self._segment = index.nearest(energy, valence, track=self.current_dna_file)
+            self._segment_started_at = now
+        else:
+            sr = float(index.sample_rates[index.track_ids[self._segment]])
+            duration = float(index.ends[self._segment] - index.starts[self._segment]) / sr / max(0.1, tempo_multiplier)
+            if now - self._segment_started_at >= duration:
+                natural = int(index.jump_targets[self._segment][0]) if index.jump_targets.shape[1] else -1
+                nxt = index.next_segment(self._segment, energy, valence)
+                jumped = nxt != natural
+                self._segment = nxt
+                # Stay on the bar grid unless we fell more than a bar behind (e.g. after idling)
+                elapsed = now - self._segment_started_at
+                self._segment_started_at = now if elapsed >= 2 * duration else self._segment_started_at + duration
+        info = index.describe(self._segment)
+        info['jump'] = jumped
+        info['started_at'] = round(self._segment_started_at, 3)
+        return info
+
+    def change_speed(self, samples, speed: float = 1.0) -> np.ndarray:
+        """Changes the speed of audio without changing pitch (phase vocoder, see dsp.time_stretch).
+
+        Accepts a (frames, channels) float32 array or anything with `.samples` (e.g. base_dna).
+        (Currently unused)
+        """
+        samples = getattr(samples, "samples", samples)
         if speed == 1.0:
-            return audio_segment
-        return audio_segment.speedup(playback_speed=speed)
\ No newline at end of file
+            return np.asarray(samples, dtype=np.float32)
+        return time_stretch(samples, speed)
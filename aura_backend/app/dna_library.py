@@ -0,0 +1,332 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .audio_io import BLOCK_FRAMES, iter_pcm_blocks
+from .pcm_store import PcmHandle, PcmStore, default_store
+from .segment_index import SegmentIndex, analyze_segments
+from .track_index import TrackIndex, analyze_pcm
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a", ".aac"}
+CACHE_DIRNAME = ".pcm_cache"
+ACTIVE_STATE_FILE = "active.json"  # last-active track, preloaded first on the next start
+# <source stem>.<signature><suffix>: PCM, its metadata, features and segmentation (see DnaLibrary._cache_paths)
+CACHE_FILE_RE = re.compile(r"^(?P<stem>.+)\.(?P<signature>[0-9a-f]{12})"
+                           r"(\.f32|\.json|\.features\.json|\.segments\.npz)$")
+
+
+class PcmTrack:
+    """A decoded library track backed by a raw float32 PCM cache file.
+
+    Exposes the same basic attributes as pydub's AudioSegment (frame_rate, channels,
+    duration_seconds). Playback goes through open(), which hands out a refcounted,
+    memory-mapped view from the shared PcmStore, so every session selecting the same
+    track shares one mapping (and the page cache).
+    """
+    def __init__(self, name: str, pcm_path: str, frame_rate: int, channels: int, frames: int,
+                 content_key: Optional[str] = None, store: Optional[PcmStore] = None):
+        self.name = name
+        self.pcm_path = pcm_path
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.frames = frames
+        # Cache entries written before content hashing existed fall back to their (unique) path
+        self.content_key = content_key or pcm_path
+        self.store = store or default_store
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frames / float(self.frame_rate) if self.frame_rate else 0.0
+
+    def open(self, store: Optional[PcmStore] = None) -> PcmHandle:
+        """Refcounted zero-copy handle on the shared PCM; release() it when done."""
+        return (store or self.store).acquire_file(self.content_key, self.pcm_path, self.frames,
+                                                  self.channels, self.frame_rate, name=self.name)
+
+    def info(self) -> Dict:
+        return {
+            "duration_seconds": self.duration_seconds,
+            "channels": self.channels,
+            "sample_rate": self.frame_rate,
+        }
+
+
+def _signature(path: Path) -> str:
+    # Size + mtime is enough to notice a re-upload under the same name, without hashing audio
+    st = path.stat()
+    return hashlib.sha1(f"{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()[:12]
+
+
+def audio_segment_to_array(seg) -> Tuple[np.ndarray, float]:
+    """(frames, channels) integer view of a pydub AudioSegment, plus the scale mapping it to [-1, 1]."""
+    if seg.sample_width in (1, 3):
+        # 8-bit wav is unsigned and 24-bit has no numpy dtype; widen to a signed type first
+        seg = seg.set_sample_width(2 if seg.sample_width == 1 else 4)
+    dtype = {2: np.int16, 4: np.int32}[seg.sample_width]
+    raw = np.frombuffer(seg.raw_data, dtype=dtype).reshape(-1, seg.channels)
+    return raw, 1.0 / float(2 ** (8 * seg.sample_width - 1))
+
+
+def decode_to_pcm(src_path: str, pcm_path: str, chunk_frames: int = BLOCK_FRAMES) -> Dict:
+    """Decode an audio file once into a raw float32 interleaved PCM file, block by block.
+
+    The returned metadata includes a sha1 of the float32 data, used as the PcmStore key
+    so identical audio under different names is only ever mapped once.
+    """
+    info, blocks = iter_pcm_blocks(src_path, chunk_frames)
+    tmp_path = pcm_path + ".tmp"
+    digest = hashlib.sha1()
+    frames = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            for block in blocks:
+                data = np.ascontiguousarray(block, dtype=np.float32)
+                out.write(data.data)
+                digest.update(data.data)
+                frames += data.shape[0]
+    except BaseException:
+        # e.g. ffmpeg failing partway: never publish a truncated track
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, pcm_path)
+    return {"frame_rate": info.frame_rate, "channels": info.channels, "frames": frames,
+            "sha1": digest.hexdigest()}
+
+
+class DnaLibrary:
+    """Warm library over music_dna_store: every file is decoded once into a PCM cache on disk.
+
+    warm()/warm_async() scan the store and fill the cache in the background; get() then
+    returns a memory-mapped PcmTrack in milliseconds, so selecting any known track never
+    goes through pydub/ffmpeg again.
+    """
+    def __init__(self, store_dir: str, cache_dir: Optional[str] = None, pcm_store: Optional[PcmStore] = None):
+        self.store_dir = Path(store_dir)
+        self.pcm_store = pcm_store or default_store
+        self.cache_dir = Path(cache_dir) if cache_dir else self.store_dir / CACHE_DIRNAME
+        self.tracks: Dict[str, PcmTrack] = {}
+        self.track_features: Dict[str, Dict[str, float]] = {}
+        self.errors: Dict[str, str] = {}
+        self.warming = False
+        # Held while cache files are published or pruned, so a prune never deletes a fresh entry
+        self._cache_lock = threading.RLock()
+
+    def scan(self) -> List[str]:
+        if not self.store_dir.exists():
+            return []
+        return sorted(p.name for p in self.store_dir.iterdir()
+                      if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS)
+
+    def _cache_paths(self, name: str):
+        src = self.store_dir / name
+        base = self.cache_dir / f"{src.stem}.{_signature(src)}"
+        return src, str(base) + ".f32", str(base) + ".json"
+
+    def ensure(self, name: str) -> PcmTrack:
+        """Return the cached track, decoding it into the PCM cache first if needed."""
+        src, pcm_path, meta_path = self._cache_paths(name)
+        track = self.tracks.get(name)
+        if track is not None and track.pcm_path == pcm_path:
+            return track
+        with self._cache_lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            meta = None
+            if os.path.exists(pcm_path) and os.path.exists(meta_path):
+                try:
+                    with open(meta_path, "r", encoding="utf-8") as fh:
+                        meta = json.load(fh)
+                except (OSError, ValueError):
+                    meta = None
+            if meta is None:
+                meta = decode_to_pcm(str(src), pcm_path)
+                with open(meta_path, "w", encoding="utf-8") as fh:
+                    json.dump(meta, fh)
+                # A re-upload / touched file gets a new signature: drop the previous version's files
+                self.prune_cache(src.stem)
+            track = PcmTrack(name, pcm_path, meta["frame_rate"], meta["channels"], meta["frames"],
+                             content_key=meta.get("sha1"), store=self.pcm_store)
+            self.tracks[name] = track
+            self.errors.pop(name, None)
+            return track
+
+    def prune_cache(self, stem: Optional[str] = None) -> int:
+        """Delete cache files that belong to no current store file (all stems, or just `stem`).
+
+        Covers earlier versions of re-uploaded tracks and tracks removed from the store,
+        whose in-memory entries are dropped too. Mappings already handed out stay valid
+        (on POSIX an unlinked file lives on until unmapped). Returns the files removed.
+        """
+        with self._cache_lock:
+            sources = [self.store_dir / name for name in self.scan()]
+            valid: Set[Tuple[str, str]] = set()
+            for src in sources:
+                if stem is None or src.stem == stem:
+                    try:
+                        valid.add((src.stem, _signature(src)))
+                    except OSError:
+                        continue  # removed meanwhile
+            removed = 0
+            if self.cache_dir.is_dir():
+                for path in self.cache_dir.iterdir():
+                    match = CACHE_FILE_RE.match(path.name)
+                    if match is None or (stem is not None and match["stem"] != stem):
+                        continue
+                    if (match["stem"], match["signature"]) in valid:
+                        continue
+                    try:
+                        path.unlink()
+                        removed += 1
+                    except OSError as e:
+                        logger.warning(f"Could not remove stale cache file {path.name}: {e}")
+            if stem is None:
+                present = {src.name for src in sources}
+                for table in (self.tracks, self.track_features, self.errors):
+                    for name in [n for n in table if n not in present]:
+                        del table[name]
+            if removed:
+                logger.info(f"Pruned {removed} stale DNA cache files")
+            return removed
+
+    def features(self, name: str) -> Dict[str, float]:
+        """Per-track descriptors (see track_index.analyze_pcm), computed once and cached beside the PCM."""
+        track = self.ensure(name)
+        cached = self.track_features.get(name)
+        if cached is not None and cached.get("_pcm") == track.pcm_path:
+            return cached
+        feature_path = track.pcm_path[:-len(".f32")] + ".features.json"
+        features = None
+        if os.path.exists(feature_path):
+            try:
+                with open(feature_path, "r", encoding="utf-8") as fh:
+                    features = json.load(fh)
+            except (OSError, ValueError):
+                features = None
+        if features is None:
+            with track.open() as handle:  # counted as in use by the PcmStore while analyzing
+                features = analyze_pcm(handle.samples, track.frame_rate)
+            with open(feature_path, "w", encoding="utf-8") as fh:
+                json.dump(features, fh)
+        features["_pcm"] = track.pcm_path
+        self.track_features[name] = features
+        return features
+
+    def build_index(self) -> TrackIndex:
+        """(energy, valence) index over every cached track; features are computed at most once per file."""
+        table = {}
+        for name in list(self.tracks):
+            try:
+                table[name] = self.features(name)
+            except Exception as e:
+                logger.warning(f"Could not analyze DNA track {name}: {e}")
+        return TrackIndex.from_features(table)
+
+    def segments(self, name: str) -> Dict[str, np.ndarray]:
+        """Bar-level segmentation + per-segment descriptors, computed once and cached as .segments.npz."""
+        track = self.ensure(name)
+        segment_path = track.pcm_path[:-len(".f32")] + ".segments.npz"
+        if os.path.exists(segment_path):
+            try:
+                with np.load(segment_path) as data:
+                    return {k: data[k] for k in data.files}
+            except (OSError, ValueError):
+                pass
+        tempo = self.features(name).get("tempo_bpm") or 120.0
+        with track.open() as handle:
+            result = analyze_segments(handle.samples, track.frame_rate, tempo)
+        with open(segment_path, "wb") as fh:
+            np.savez(fh, **result)
+        return result
+
+    def build_segment_index(self) -> SegmentIndex:
+        """One contiguous segment index (with jump points) across every cached track."""
+        per_track, rates = {}, {}
+        for name in list(self.tracks):
+            try:
+                per_track[name] = self.segments(name)
+                rates[name] = self.tracks[name].frame_rate
+            except Exception as e:
+                logger.warning(f"Could not segment DNA track {name}: {e}")
+        return SegmentIndex.build(per_track, rates)
+
+    def get(self, name: str) -> Optional[PcmTrack]:
+        return self.tracks.get(name)
+
+    # --- Last-active track (survives restarts) ---
+
+    def remember_active(self, name: str):
+        """Persist the active track name so a restarted server can warm it before anything else."""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.cache_dir / ACTIVE_STATE_FILE
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"track": name}, fh)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not persist active DNA track {name}: {e}")
+
+    def last_active(self) -> Optional[str]:
+        """The track remembered by remember_active(), if it is still in the store."""
+        try:
+            with open(self.cache_dir / ACTIVE_STATE_FILE, "r", encoding="utf-8") as fh:
+                name = json.load(fh).get("track")
+        except (OSError, ValueError, AttributeError):
+            return None
+        if name and (self.store_dir / name).is_file():
+            return name
+        return None
+
+    def warm(self) -> int:
+        """Synchronously make sure every track in the store is cached. Returns the track count."""
+        for name in self.scan():
+            try:
+                self.ensure(name)
+            except Exception as e:
+                self.errors[name] = str(e)
+                logger.warning(f"Could not warm DNA track {name}: {e}")
+        self.prune_cache()
+        return len(self.tracks)
+
+    async def ensure_async(self, name: str) -> PcmTrack:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.ensure, name)
+
+    async def warm_async(self) -> int:
+        """Background warm-up: decode missing cache entries one by one off the event loop."""
+        self.warming = True
+        try:
+            for name in self.scan():
+                try:
+                    await self.ensure_async(name)
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    logger.warning(f"Could not warm DNA track {name}: {e}")
+            await asyncio.get_running_loop().run_in_executor(None, self.prune_cache)
+            logger.info(f"DNA library warm: {len(self.tracks)} tracks cached in {self.cache_dir}")
+            return len(self.tracks)
+        finally:
+            self.warming = False
+
+    def listing(self) -> List[Dict]:
+        out = []
+        for name in self.scan():
+            track = self.tracks.get(name)
+            entry = {"name": name, "cached": track is not None, "url": f"/music_dna/{name}"}
+            if track is not None:
+                entry.update(track.info())
+            if name in self.track_features:
+                entry["features"] = {k: v for k, v in self.track_features[name].items() if not k.startswith("_")}
+            if name in self.errors:
+                entry["error"] = self.errors[name]
+            out.append(entry)
+        return out
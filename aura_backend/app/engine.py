@@ -0,0 +1,150 @@
+"""Embeddable AURA engine: emotion fusion + music modulation with a direct Python API.
+
+    from app.engine import AuraEngine
+
+    engine = AuraEngine(library_dir="aura_backend/music_dna_store")
+    engine.warm_library()                       # optional: decode tracks, build the emotion index
+    engine.load_track("calm_sample.wav")
+    ...
+    engine.push_game_state({"threat_proximity": 0.7, "player_speed": 0.4})
+    engine.push_sensor("face", {"emotion": "happy", "confidence": 0.8})
+    snapshot = engine.tick()                    # ModulationSnapshot (tempo, filter, fx, ...)
+
+Nothing here imports the web stack; the FastAPI server (main.py) is a thin wrapper that
+feeds the same engine from its WebSockets and broadcasts what tick() returns. Each tick
+costs the same however many inputs were pushed since the last one: pushes only fold
+into the orchestrator's running sums, and tick() fuses, forecasts and modulates once.
+"""
+import logging
+import time
+from typing import Any, Dict, Optional, Union
+
+from .audio_modulator import AudioModulator, ModulationSnapshot
+from .dna_library import DnaLibrary, PcmTrack
+from .models import EmotionPayload, GameState
+from .orchestrator import Orchestrator
+from .pcm_store import PcmStore
+from .predictor import EmotionPredictor
+from .timeline import TimelineWriter
+from .track_index import TrackSelector
+
+logger = logging.getLogger(__name__)
+
+
+class AuraEngine:
+    """Orchestrator + AudioModulator (+ forecast, track selection) behind push/tick calls.
+
+    `switch_tracks` makes tick() swap to the recommended library track itself (embedded
+    use); the server leaves it off and performs beat-aligned swaps asynchronously.
+    """
+    def __init__(self, library_dir: Optional[str] = None, forecast_horizon: float = 1.5,
+                 auto_track_select: bool = True, switch_tracks: bool = True,
+                 record_path: Optional[str] = None, source_timeout: float = 5.0,
+                 pcm_store: Optional[PcmStore] = None):
+        self.orchestrator = Orchestrator(source_timeout=source_timeout)
+        self.modulator = AudioModulator(pcm_store=pcm_store)
+        self.predictor = EmotionPredictor(horizon=forecast_horizon)
+        self.library = DnaLibrary(library_dir, pcm_store=pcm_store) if library_dir else None
+        self.track_selector = TrackSelector()
+        self.track_selector.enabled = auto_track_select
+        self.switch_tracks = switch_tracks
+        # Optional JSONL recording of the fused vector per tick (replayable offline, see render.py)
+        self.recorder = TimelineWriter(record_path) if record_path else None
+        self.last_vector: Dict[str, float] = {}
+        self.last_selection: Optional[Dict] = None
+
+    # --- Inputs ---
+
+    def push_game_state(self, state: Union[GameState, Dict[str, Any]], player_id: Optional[str] = None):
+        game_state = state if isinstance(state, GameState) else GameState(**state)
+        self.orchestrator.update_game_state(game_state,
+                                            source_id=f"game_state:{player_id}" if player_id else "game_state")
+
+    def push_sensor(self, source: str, payload: Union[EmotionPayload, Dict[str, Any]],
+                    source_id: Optional[str] = None) -> bool:
+        """Feed one sensor reading; same semantics as the /ws/sensors messages.
+
+        "face" / "speech" take an emotion label + confidence; any other source may send
+        {"vector": {...}} directly and is weighted under its own name. `source_id`
+        distinguishes several devices of one kind. Returns False for unusable readings;
+        malformed payloads and built-in names on the generic path raise (pydantic
+        ValidationError / ValueError).
+        """
+        if source in ("face", "speech"):
+            emotion = payload if isinstance(payload, EmotionPayload) else EmotionPayload(**payload)
+            if source == "face":
+                self.orchestrator.update_face_emotion(
+                    emotion, source_id=f"face_emotion:{source_id}" if source_id else "face_emotion")
+            else:
+                self.orchestrator.update_speech_emotion(
+                    emotion, source_id=f"speech_emotion:{source_id}" if source_id else "speech_emotion")
+            return True
+        vector = payload.get("vector") if isinstance(payload, dict) else None
+        if source and isinstance(vector, dict):
+            self.orchestrator.update_feed(source, vector, device_id=source_id)
+            return True
+        return False
+
+    def push_audience_vote(self, mood: str):
+        self.orchestrator.update_audience_vote(mood)
+
+    # --- Music DNA ---
+
+    def warm_library(self) -> int:
+        """Decode every library track and build the track / segment indexes (blocking)."""
+        if self.library is None:
+            return 0
+        count = self.library.warm()
+        self.track_selector.index = self.library.build_index()
+        self.modulator.segment_index = self.library.build_segment_index()
+        return count
+
+    def track(self, name: str) -> PcmTrack:
+        if self.library is None:
+            raise RuntimeError("AuraEngine was created without a library_dir")
+        return self.library.get(name) or self.library.ensure(name)
+
+    def load_track(self, name: str) -> Dict:
+        """Switch to a library track immediately (decoding it first if it is not warm)."""
+        return self.modulator.select_track(self.track(name))
+
+    def load_dna(self, file_path: str) -> Dict:
+        """Switch to an arbitrary audio file outside the library."""
+        return self.modulator.load_dna(file_path)
+
+    # --- Tick ---
+
+    def tick(self, now: Optional[float] = None) -> ModulationSnapshot:
+        """Fuse the current inputs and compute this tick's modulation snapshot.
+
+        The fused vector and the track recommendation are kept on `last_vector` /
+        `last_selection` for callers that want more than the snapshot.
+        """
+        now = time.time() if now is None else now
+        vector = self.orchestrator.get_final_emotion_vector()
+        self.predictor.update(vector, now)
+        if self.recorder:
+            self.recorder.write(vector, now)
+        snapshot = self.modulator.snapshot(vector, now=now, forecast=self.predictor.forecast(),
+                                           forecast_horizon=self.predictor.horizon)
+
+        # Emotion-indexed track selection (no-op until the library index is built)
+        selection = None
+        if len(self.track_selector.index):
+            energy, valence = self.modulator._energy_valence(vector)
+            selection = self.track_selector.update(energy, valence, self.modulator.current_dna_file, now)
+            if selection["switch"] and self.switch_tracks:
+                try:
+                    self.load_track(selection["recommended_track"])
+                except Exception as e:
+                    logger.error(f"Track switch to {selection['recommended_track']} failed: {e}")
+        self.last_vector = vector
+        self.last_selection = selection
+        return snapshot
+
+    def close(self):
+        if self.recorder:
+            self.recorder.close()
+        if self.modulator.base_dna is not None:
+            self.modulator.base_dna.release()
+            self.modulator.base_dna = None
@@ -1,18 +1,21 @@
 import os
+import json
+import math
+import time
 import asyncio
 from pathlib import Path
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
-import socketio
 import logging
-from typing import Dict, List
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from .orchestrator import Orchestrator
-from .audio_modulator import AudioModulator
-from pydub import AudioSegment
-from .models import GameState, EmotionPayload, AudienceVote
+from .engine import AuraEngine
+from .models import AudienceVote, TrackSelection
+from .audio_io import normalize_to_wav
+from .streaming import SSEHub, SSE_TOPICS, STUDIO_TOPICS, StudioSubscription, parse_topics
 
 # --- Basic Setup ---
 logging.basicConfig(level=logging.INFO)
@@ -27,13 +30,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- State Management ---
-orchestrator = Orchestrator()
-audio_modulator = AudioModulator()
+DNA_SWAP_ALIGN_BEATS = int(os.getenv("AURA_DNA_SWAP_ALIGN_BEATS", "4"))  # 0 = swap immediately
+UPLOAD_CHUNK_BYTES = 1 << 20
 PUBLIC_BASE_URL = os.getenv("BACKEND_PUBLIC_BASE_URL", "http://localhost:8000")  # configurable for frontend
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins=[])
-socket_app = socketio.ASGIApp(sio)
-app.mount('/socket.io', socket_app)
+# socket.io is not used by the bundled clients; mount it only when asked for
+if os.getenv("AURA_ENABLE_SOCKETIO", "0") == "1":
+    import socketio
+    sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins=[])
+    app.mount('/socket.io', socketio.ASGIApp(sio))
 
 # --- Paths & External Asset Mounts ---
 # main.py resides at <project_root>/aura_backend/app/main.py
@@ -45,6 +49,31 @@ GAME_STATIC_DIR = GAME_CLIENT_DIR / "static"
 MUSIC_DNA_DIR = BACKEND_DIR / "music_dna_store"
 GAME_TEMPLATE_FILE = GAME_CLIENT_DIR / "templates" / "game.html"
 
+# --- State Management ---
+# The server is a thin wrapper around the embeddable engine (see engine.py): WebSockets push
+# into it, main_loop ticks it and broadcasts the snapshot. Track switches stay async here
+# (beat-aligned, announced to studios), so the engine itself does not swap tracks.
+engine = AuraEngine(
+    library_dir=str(MUSIC_DNA_DIR),
+    forecast_horizon=float(os.getenv("AURA_FORECAST_HORIZON", "1.5")),
+    auto_track_select=os.getenv("AURA_AUTO_TRACK_SELECT", "1") == "1",
+    switch_tracks=False,
+    # Optional JSONL recording of the fused vector per tick (replayable by benchmarks / offline render)
+    record_path=os.getenv("AURA_SESSION_RECORD_PATH"),
+)
+orchestrator = engine.orchestrator
+audio_modulator = engine.modulator
+# Warm library: every track in the store decoded once into a memory-mapped PCM cache
+dna_library = engine.library
+# Picks the library track closest to the fused emotion (hysteresis + crossfade hints)
+track_selector = engine.track_selector
+sse_hub = SSEHub()
+_track_switch_task: Optional[asyncio.Task] = None
+_studio_track_tasks: Set[asyncio.Task] = set()  # director picks swapping in the background
+# Startup milestones for /ready (seconds since the startup event); None = not reached yet
+startup_state: Dict[str, Any] = {"started_at": None, "first_tick": None, "dna_ready": None, "library_ready": None}
+background_tasks: List[asyncio.Task] = []
+
 if GAME_STATIC_DIR.exists():
     app.mount("/static", StaticFiles(directory=str(GAME_STATIC_DIR)), name="static")
 else:
@@ -87,6 +116,8 @@ class ConnectionManager:
         self.studio_connections: List[WebSocket] = []
         self.sensor_connections: List[WebSocket] = []
         self.game_connections: List[WebSocket] = []
+        # Per-studio topic/rate filters; studios without an entry get everything
+        self.studio_subscriptions: Dict[WebSocket, StudioSubscription] = {}
 
     async def connect(self, websocket: WebSocket, connection_type: str):
         await websocket.accept()
@@ -105,6 +136,7 @@ class ConnectionManager:
         try:
             if connection_type == "studio" and websocket in self.studio_connections:
                 self.studio_connections.remove(websocket)
+                self.studio_subscriptions.pop(websocket, None)
             elif connection_type == "sensor" and websocket in self.sensor_connections:
                 self.sensor_connections.remove(websocket)
             elif connection_type == "game" and websocket in self.game_connections:
@@ -114,16 +146,80 @@ class ConnectionManager:
             # Defensive: never let disconnect raise inside event handlers
             logger.exception("Error while disconnecting websocket")
 
-    async def broadcast_to_studios(self, message: dict):
-        dead = []
+    def subscribe_studio(self, websocket: WebSocket, subscription: StudioSubscription):
+        self.studio_subscriptions[websocket] = subscription
+
+    def studio_wants(self, topic: str) -> bool:
+        """True if at least one connected studio follows `topic`."""
+        for connection in self.studio_connections:
+            sub = self.studio_subscriptions.get(connection)
+            if sub is None or topic in sub.min_interval:
+                return True
+        return False
+
+    def wanted_studio_topics(self) -> Set[str]:
+        wanted: Set[str] = set()
         for connection in self.studio_connections:
+            sub = self.studio_subscriptions.get(connection)
+            if sub is None:
+                return set(STUDIO_TOPICS)
+            wanted |= sub.topics
+        return wanted
+
+    async def _send_text_all(self, connections: List[WebSocket], targets: List[Tuple[WebSocket, str]]):
+        dead = []
+        for connection, text in targets:
             try:
-                await connection.send_json(message)
+                await connection.send_text(text)
             except Exception:
                 dead.append(connection)
         for d in dead:
-            if d in self.studio_connections:
-                self.studio_connections.remove(d)
+            if d in connections:
+                connections.remove(d)
+            self.studio_subscriptions.pop(d, None)
+
+    async def broadcast_to_studios(self, message: dict, topic: Optional[str] = None):
+        """Send `message` to studios following `topic` (all studios when topic is None)."""
+        now = time.time()
+        targets = []
+        for connection in self.studio_connections:
+            sub = self.studio_subscriptions.get(connection)
+            if topic is not None and sub is not None:
+                if not sub.due(topic, now):
+                    continue
+                sub.mark_sent(topic, now)
+            targets.append(connection)
+        if not targets:
+            return
+        text = json.dumps(message)  # serialize once for every recipient
+        await self._send_text_all(self.studio_connections, [(c, text) for c in targets])
+
+    async def broadcast_aura_update(self, parts: Dict[str, Tuple[str, Any]]):
+        """Send an `aura_update` carrying only the topics each studio currently wants.
+
+        `parts` maps topic -> (payload key, value). Studios that end up with the same
+        topic set share a single serialized message.
+        """
+        now = time.time()
+        encoded: Dict[Tuple[str, ...], str] = {}
+        targets = []
+        for connection in self.studio_connections:
+            sub = self.studio_subscriptions.get(connection)
+            if sub is None:
+                topics = tuple(parts)
+            else:
+                topics = tuple(t for t in parts if sub.due(t, now))
+                for t in topics:
+                    sub.mark_sent(t, now)
+            if not topics:
+                continue
+            if topics not in encoded:
+                encoded[topics] = json.dumps({
+                    "type": "aura_update",
+                    "payload": {parts[t][0]: parts[t][1] for t in topics}
+                })
+            targets.append((connection, encoded[topics]))
+        await self._send_text_all(self.studio_connections, targets)
 
     async def broadcast_to_games(self, message: dict):
         dead = []
@@ -146,6 +242,29 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+# --- Passive Viewer Stream (read-only SSE fan-out) ---
+@app.get("/stream")
+async def stream_events(topics: str = "final_vector,audience"):
+    """Server-Sent Events feed for passive viewers. `topics` is a comma separated subset of SSE_TOPICS."""
+    requested = parse_topics(topics)
+    if not requested:
+        return JSONResponse({"error": f"No valid topics requested (choose from {list(SSE_TOPICS)})"}, status_code=400)
+    sub = sse_hub.subscribe(requested)
+
+    async def event_source():
+        try:
+            async for chunk in sse_hub.events(sub):
+                yield chunk
+        finally:
+            sse_hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --- Game Client Serving ---
 @app.get("/game", response_class=HTMLResponse)
 async def read_game():
@@ -162,49 +281,125 @@ async def read_game():
 # --- HTTP Endpoints ---
 @app.post("/upload_music_dna/")
 async def upload_music_dna(file: UploadFile = File(...)):
-    """Upload an audio file, normalize peak to -1 dBFS if needed, and set as active DNA."""
+    """Upload an audio file, normalize peak to -1 dBFS if needed, and set as active DNA.
+
+    The upload is streamed to disk and normalized block by block (see audio_io), so
+    memory stays bounded however long the file is.
+    """
     try:
-        raw_path = os.path.join("music_dna_store", file.filename)
+        raw_path = os.path.join(MUSIC_DNA_DIR, file.filename)
         with open(raw_path, "wb") as buffer:
-            buffer.write(await file.read())
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                buffer.write(chunk)
 
-        # Load with pydub for normalization (supports many formats via ffmpeg if installed)
-        seg = AudioSegment.from_file(raw_path)
-        peak_dbfs = seg.max_dBFS  # negative number (0 is max)
         normalized_filename = f"norm_{file.filename.rsplit('.',1)[0]}.wav"
-        normalized_path = os.path.join("music_dna_store", normalized_filename)
-        normalized = seg
-        changed = False
-        # If peak lower than -2 dBFS, boost so peak is at -1 dBFS
-        if peak_dbfs < -2.0:
-            boost = -1.0 - peak_dbfs  # positive gain to bring peak to -1
-            normalized = seg.apply_gain(boost)
-            changed = True
-        # Always export as 16-bit PCM wav for browser compatibility
-        normalized.export(normalized_path, format="wav", parameters=["-acodec", "pcm_s16le"])
-
-        # Point audio_modulator to normalized file
-        dna_info = audio_modulator.load_dna(normalized_path)
+        normalized_path = os.path.join(MUSIC_DNA_DIR, normalized_filename)
+        # Two streaming passes (measure, then gain + 16-bit PCM export) off the event loop;
+        # quiet files (peak below -2 dBFS) are boosted so their peak sits at -1 dBFS
+        loop = asyncio.get_running_loop()
+        stats = await loop.run_in_executor(None, normalize_to_wav, raw_path, normalized_path)
+        peak_dbfs = stats["peak_dbfs"]
+
+        # Cache the normalized file in the library (decoded off-loop), then swap on the next bar
+        track = await dna_library.ensure_async(normalized_filename)
+        track_selector.enabled = False  # the director chose this track explicitly
+        dna_info = await audio_modulator.select_track_async(track, align_beats=DNA_SWAP_ALIGN_BEATS)
+        if not dna_info.get("superseded"):
+            dna_library.remember_active(normalized_filename)
+        asyncio.create_task(rebuild_track_index())
         dna_info.update({
             "normalized": True,
-            "original_peak_dbfs": round(peak_dbfs, 2),
-            "normalization_applied_db": round((-1.0 - peak_dbfs) if changed else 0.0, 2),
+            "original_peak_dbfs": round(peak_dbfs, 2) if math.isfinite(peak_dbfs) else None,
+            "original_rms_dbfs": round(stats["rms_dbfs"], 2) if math.isfinite(stats["rms_dbfs"]) else None,
+            "normalization_applied_db": round(stats["gain_db"], 2),
             "serving_file": normalized_filename
         })
 
-        await manager.broadcast_to_studios({
-            "type": "dna_loaded",
-            "payload": {
-                "filename": normalized_filename,
-                "info": dna_info
-            }
-        })
+        dna_payload = {"filename": normalized_filename, "info": dna_info}
+        await manager.broadcast_to_studios({"type": "dna_loaded", "payload": dna_payload}, topic="dna_loaded")
+        sse_hub.publish("dna_loaded", dna_payload)
         return {"filename": normalized_filename, "info": dna_info}
     except Exception as e:
         logger.error(f"Error uploading file: {e}")
         return {"error": str(e)}, 500
 
 
+async def rebuild_track_index():
+    loop = asyncio.get_running_loop()
+    track_selector.index = await loop.run_in_executor(None, dna_library.build_index)
+
+
+def _mark_startup(milestone: str):
+    if startup_state[milestone] is None and startup_state["started_at"] is not None:
+        startup_state[milestone] = round(time.time() - startup_state["started_at"], 3)
+        logger.info(f"Startup: {milestone} after {startup_state[milestone]}s")
+
+
+async def warm_library():
+    """Background warm-up: the last-active track (and its analysis) first, then everything else.
+
+    The main loop is already broadcasting while this runs; /ready turns true once the
+    last-active DNA is playing again.
+    """
+    loop = asyncio.get_running_loop()
+    name = dna_library.last_active()
+    if name and audio_modulator.current_dna_file is None:
+        try:
+            await select_library_track(name, align_beats=0, manual=False)
+            # Its features + segmentation (cached on disk) so the first index builds find them ready
+            await loop.run_in_executor(None, dna_library.segments, name)
+        except Exception as e:
+            logger.warning(f"Could not preload last active DNA {name}: {e}")
+    _mark_startup("dna_ready")
+    await dna_library.warm_async()
+    await rebuild_track_index()
+    audio_modulator.segment_index = await loop.run_in_executor(None, dna_library.build_segment_index)
+    _mark_startup("library_ready")
+
+
+async def select_library_track(name: str, align_beats: Optional[int] = None, manual: bool = True) -> Dict:
+    """Swap the active DNA to a library track and announce it like an upload.
+
+    A manual pick (director / API) turns automatic track selection off until re-enabled.
+    """
+    if manual:
+        track_selector.enabled = False
+    track = dna_library.get(name) or await dna_library.ensure_async(name)
+    dna_info = await audio_modulator.select_track_async(
+        track, DNA_SWAP_ALIGN_BEATS if align_beats is None else align_beats)
+    if not dna_info.get("superseded"):
+        dna_library.remember_active(name)
+    dna_info["serving_file"] = name
+    dna_payload = {"filename": name, "info": dna_info}
+    await manager.broadcast_to_studios({"type": "dna_loaded", "payload": dna_payload}, topic="dna_loaded")
+    sse_hub.publish("dna_loaded", dna_payload)
+    return dna_payload
+
+
+@app.get("/dna")
+async def list_dna():
+    """Tracks available in the warm DNA library."""
+    return {
+        "tracks": dna_library.listing(),
+        "current_track": audio_modulator.current_dna_file,
+        "warming": dna_library.warming,
+    }
+
+
+@app.post("/dna/select")
+async def select_dna(selection: TrackSelection):
+    if selection.name not in dna_library.scan():
+        return JSONResponse({"error": f"Unknown track: {selection.name}"}, status_code=404)
+    try:
+        return await select_library_track(selection.name, selection.align_beats)
+    except Exception as e:
+        logger.error(f"Error selecting track {selection.name}: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
 # --- Diagnostics / Health ---
 @app.get("/health")
 async def health():
@@ -212,23 +407,60 @@ async def health():
     return {
         "status": "ok",
         "connections": manager.summary(),
+        "sse": sse_hub.summary(),
         "sources_last_update": orchestrator.last_update_time,
         "current_track": audio_modulator.current_dna_file,
+        "pcm_store": audio_modulator.pcm_store.stats(),
     }
 
+@app.get("/ready")
+async def ready():
+    """Readiness (vs /health liveness): the loop is ticking and the last-active DNA is loaded.
+
+    Returns 503 until then; the full library may still be warming in the background.
+    """
+    is_ready = startup_state["first_tick"] is not None and startup_state["dna_ready"] is not None
+    body = {
+        "ready": is_ready,
+        "startup_seconds": {k: v for k, v in startup_state.items() if k != "started_at"},
+        "current_track": audio_modulator.current_dna_file,
+        "library_warming": dna_library.warming,
+    }
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
 @app.get("/debug/emotions")
 async def debug_emotions():
     return {
         "final_vector": orchestrator.get_final_emotion_vector(),
-        "sources": orchestrator.get_all_sources_data()
+        "sources": orchestrator.get_all_sources_data(),
+        "last_modulation": asdict(audio_modulator.last_snapshot) if audio_modulator.last_snapshot else None,
     }
 
 
 # --- WebSocket Endpoints ---
+async def _select_track_for_studio(websocket: WebSocket, selection: TrackSelection):
+    try:
+        await select_library_track(selection.name, selection.align_beats)
+    except Exception as e:
+        logger.error(f"Error selecting track {selection.name}: {e}")
+        try:
+            await websocket.send_json({"type": "error", "message": f"Could not load track: {selection.name}"})
+        except Exception:
+            pass  # studio already gone
+
+
 @app.websocket("/ws/studio")
 async def websocket_studio(websocket: WebSocket):
     await manager.connect(websocket, "studio")
     try:
+        # Current state straight away rather than on the next tick (up to 0.5s later)
+        snapshot = audio_modulator.last_snapshot
+        if snapshot is not None:
+            await websocket.send_json({"type": "aura_update", "payload": {
+                "final_emotion_vector": engine.last_vector,
+                "source_data": orchestrator.get_all_sources_data(),
+                "audio": build_audio_block(snapshot, engine.last_selection),
+            }})
         while True:
             data = await websocket.receive_json()
             if data.get("type") == "audience_vote":
@@ -244,6 +476,24 @@ async def websocket_studio(websocket: WebSocket):
             elif data.get("type") == "set_manual_override":
                 payload = data.get("payload", {})
                 orchestrator.set_manual_override(payload.get("active", False), payload.get("vector", {}))
+            elif data.get("type") == "select_track":
+                payload = data.get("payload", {})
+                selection = TrackSelection(**payload)
+                if selection.name in dna_library.scan():
+                    # The swap waits for the beat; the dna_loaded broadcast confirms it, and
+                    # this studio's other messages keep being handled meanwhile
+                    task = asyncio.create_task(_select_track_for_studio(websocket, selection))
+                    _studio_track_tasks.add(task)
+                    task.add_done_callback(_studio_track_tasks.discard)
+                else:
+                    await websocket.send_json({"type": "error", "message": f"Unknown track: {selection.name}"})
+            elif data.get("type") == "set_auto_track":
+                track_selector.enabled = bool(data.get("payload", {}).get("active", True))
+            elif data.get("type") == "subscribe":
+                # e.g. {"topics": {"final_vector": 1, "audio": 2}} or {"topics": ["audio"]}
+                subscription = StudioSubscription.from_payload(data.get("payload", {}))
+                manager.subscribe_studio(websocket, subscription)
+                await websocket.send_json({"type": "subscribed", "payload": {"topics": subscription.describe()}})
     except WebSocketDisconnect:
         manager.disconnect(websocket, "studio")
     except Exception as e:
@@ -258,19 +508,19 @@ async def websocket_sensors(websocket: WebSocket):
             data = await websocket.receive_json()
             source = data.get("source")
             payload = data.get("payload", {})
+            # Optional per-device id so several cameras / mics / feeds register as separate sources
+            device_id = data.get("source_id")
             
             try:
-                if source == "face":
-                    orchestrator.update_face_emotion(EmotionPayload(**payload))
-                    # Relay frame thumbnail if present
-                    frame_b64 = data.get("frame")
-                    if frame_b64:
-                        await manager.broadcast_to_studios({
-                            "type": "face_frame",
-                            "payload": {"frame": frame_b64}
-                        })
-                elif source == "speech":
-                    orchestrator.update_speech_emotion(EmotionPayload(**payload))
+                # face / speech labels, or a generic feed (e.g. biometrics) sending {"vector": {...}}
+                engine.push_sensor(source, payload, source_id=device_id)
+                # Relay frame thumbnail if present
+                frame_b64 = data.get("frame")
+                if source == "face" and frame_b64 and manager.studio_wants("face_frame"):
+                    await manager.broadcast_to_studios({
+                        "type": "face_frame",
+                        "payload": {"frame": frame_b64}
+                    }, topic="face_frame")
             except Exception as e:
                 logger.warning(f"Malformed sensor payload from {source}: {e}")
                 await websocket.send_json({"type": "error", "message": "Invalid sensor payload"})
@@ -288,8 +538,7 @@ async def websocket_game(websocket: WebSocket):
         while True:
             data = await websocket.receive_json()
             if data.get("type") == "game_state":
-                game_state = GameState(**data.get("payload", {}))
-                orchestrator.update_game_state(game_state)
+                engine.push_game_state(data.get("payload", {}), player_id=data.get("player_id"))
                 # Lightweight ack (throttled client-side) helps confirm flow during debugging
                 await websocket.send_json({"type": "ack", "payload": {"received": True}})
     except WebSocketDisconnect:
@@ -300,64 +549,75 @@ async def websocket_game(websocket: WebSocket):
 
 
 # --- Main Application Logic Loop ---
+def build_audio_block(snapshot, selection: Optional[Dict]) -> Dict[str, Any]:
+    track_url = None
+    if snapshot.current_track:
+        track_url = f"/music_dna/{snapshot.current_track}"
+    full_track_url = f"{PUBLIC_BASE_URL}{track_url}" if track_url else None
+    return {
+        "tempo_bpm": snapshot.tempo_bpm,
+        "tempo_multiplier": snapshot.tempo_multiplier,
+        "primary_emotion": snapshot.primary_emotion,
+        "current_track": snapshot.current_track or "N/A",
+        "track_url": track_url,
+        "full_track_url": full_track_url,
+        "base_tempo": snapshot.base_tempo,
+        # Legacy simple modulation (retained) + advanced descriptor nested under 'advanced'
+        "modulation": snapshot.modulation_view(),
+        # Track recommendation; when 'switch' is set, 'crossfade' tells clients how to blend
+        "selection": selection
+    }
+
+
 async def main_loop():
+    global _track_switch_task
     logger.info("Starting AURA main loop...")
     loop_counter = 0
     while True:
-        # 1. Aggregate emotions from all sources
-        final_emotion_vector = orchestrator.get_final_emotion_vector()
-        # 2. Modulate audio: legacy (tempo, primary_emotion) + advanced descriptor
-        tempo, primary_emotion = audio_modulator.get_modulation_params(final_emotion_vector)  # smoothed
-        advanced_mod = audio_modulator.compute_modulation(final_emotion_vector)
-
-        # 3. Construct the state update payload for the studio
-        tempo_multiplier = round(tempo / (audio_modulator.base_tempo or 120.0), 4)
-        track_name = audio_modulator.current_dna_file or "N/A"
-        track_url = None
-        if audio_modulator.current_dna_file:
-            track_url = f"/music_dna/{audio_modulator.current_dna_file}"
-        full_track_url = f"{PUBLIC_BASE_URL}{track_url}" if track_url else None
-
-        # Derive simple modulation hints (placeholder logic)
-        # intensity = max emotion value; map to filter cutoff & gain range
-        intensity_val = max(final_emotion_vector.values()) if final_emotion_vector else 0.0
-        filter_cutoff = 500 + int(4500 * intensity_val)  # 500Hz to 5000Hz
-        gain = 0.6 + 0.4 * intensity_val  # 0.6 to 1.0
-        # Legacy simple modulation (retained) + advanced fields merged under advanced_mod
-        modulation = {
-            "intensity": round(intensity_val, 4),
-            "filter_cutoff_hz": filter_cutoff,
-            "gain": round(gain, 3),
-            "advanced": advanced_mod  # new nested descriptor (non-breaking addition)
-        }
-        studio_update = {
-            "type": "aura_update",
-            "payload": {
-                "final_emotion_vector": final_emotion_vector,
-                "source_data": orchestrator.get_all_sources_data(),
-                "audio": {
-                    "tempo_bpm": tempo,
-                    "tempo_multiplier": tempo_multiplier,
-                    "primary_emotion": primary_emotion,
-                    "current_track": track_name,
-                    "track_url": track_url,
-                    "full_track_url": full_track_url,
-                    "base_tempo": audio_modulator.base_tempo
-                    ,"modulation": modulation
-                }
-            }
-        }
-        
-        # 4. Broadcast the full state to all connected studios
-        await manager.broadcast_to_studios(studio_update)
+        # 1-2. Fuse all sources, forecast and modulate once per tick; every consumer below
+        # reads this same snapshot
+        snapshot = engine.tick()
+        final_emotion_vector = engine.last_vector
+        # Only compute / serialize what at least one studio or passive viewer follows
+        studio_topics = manager.wanted_studio_topics()
+        wants_audio = "audio" in studio_topics or sse_hub.wants("audio")
+
+        # 2b. Emotion-indexed track selection: the engine recommends, the server swaps on the beat
+        selection = engine.last_selection
+        if selection and selection["switch"] and (_track_switch_task is None or _track_switch_task.done()):
+            _track_switch_task = asyncio.create_task(
+                select_library_track(selection["recommended_track"], manual=False))
+
+        # 3. Construct the state update parts for the studios
+        parts: Dict[str, Tuple[str, Any]] = {}
+        if "final_vector" in studio_topics:
+            parts["final_vector"] = ("final_emotion_vector", final_emotion_vector)
+        if "source_data" in studio_topics:
+            parts["source_data"] = ("source_data", orchestrator.get_all_sources_data())
+        audio_block = None
+        if wants_audio:
+            audio_block = build_audio_block(snapshot, selection)
+            if "audio" in studio_topics:
+                parts["audio"] = ("audio", audio_block)
+
+        # 4. Broadcast to connected studios (each gets only its subscribed, rate-limited topics)
+        if parts:
+            await manager.broadcast_aura_update(parts)
+
+        # Passive viewers: each topic is encoded once per tick and shared by every subscriber
+        sse_hub.publish("final_vector", final_emotion_vector)
+        if sse_hub.wants("audience"):
+            sse_hub.publish("audience", {
+                "votes": orchestrator.state["audience_votes"],
+                "vector": orchestrator.get_audience_vector()
+            })
+        if audio_block is not None:
+            sse_hub.publish("audio", audio_block)
 
         # Also push simplified directive to games (tempo + primary emotion)
         await manager.broadcast_to_games({
             "type": "aura_instruction",
-            "payload": {
-                "primary_emotion": primary_emotion,
-                "tempo_bpm": tempo
-            }
+            "payload": snapshot.game_instruction()
         })
         
         # 5. Send simplified instructions to the game
@@ -365,10 +625,22 @@ async def main_loop():
         
         # 6. Wait for the next cycle
         loop_counter += 1
+        if loop_counter == 1:
+            _mark_startup("first_tick")
         if loop_counter % 40 == 0:  # every ~20s at 2Hz
             logger.info(f"Heartbeat: connections={manager.summary()} vector={final_emotion_vector}")
         await asyncio.sleep(0.5) # Update rate of 2Hz
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(main_loop())
\ No newline at end of file
+    startup_state["started_at"] = time.time()
+    background_tasks.append(asyncio.create_task(main_loop()))
+    background_tasks.append(asyncio.create_task(warm_library()))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop ticking first, then flush/close the session recording and release the DNA
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    engine.close()
\ No newline at end of file
@@ -15,4 +15,8 @@ class EmotionPayload(BaseModel):
     confidence: float = 0.0
 
 class AudienceVote(BaseModel):
-    mood: str
\ No newline at end of file
+    mood: str
+
+class TrackSelection(BaseModel):
+    name: str
+    align_beats: Optional[int] = None
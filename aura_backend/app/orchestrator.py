@@ -1,9 +1,68 @@
 import time
-from typing import Dict, Any
+import heapq
+from typing import Dict, Any, List, Optional, Tuple
 from .models import GameState, EmotionPayload
 
+EMOTIONS = ["tension", "excitement", "fear", "joy", "calm"]
+
+# Mapping from DeepFace/Speech model outputs to our desired vector
+# This needs to be customized based on your model's output labels
+EMOTION_LABEL_MAP = {
+    "angry": {"tension": 0.8, "excitement": 0.4},
+    "disgust": {"tension": 0.6},
+    "fear": {"fear": 1.0, "tension": 0.7},
+    "happy": {"joy": 1.0, "excitement": 0.6},
+    "sad": {"calm": 0.5}, # Can be mapped differently
+    "surprise": {"excitement": 0.9, "fear": 0.2},
+    "neutral": {"calm": 0.8},
+    # Labels of the speech model (sensor_modules/speech_model.py), which differ from DeepFace's
+    "fearful": {"fear": 1.0, "tension": 0.7},
+    "calm": {"calm": 1.0}
+}
+
+
+def label_to_vector(emotion: str, confidence: float) -> Dict[str, float]:
+    """Emotion vector for a sensor label (e.g. 'happy' at 0.8 confidence); unknown labels give zeros."""
+    vector = {k: 0.0 for k in EMOTIONS}
+    for key, value in EMOTION_LABEL_MAP.get(emotion.lower(), {}).items():
+        vector[key] = value * confidence
+    return vector
+
+
+class EmotionSource:
+    """A registered emotion input (a camera, a player, a biometric feed, ...).
+
+    `contribution` caches the source's emotion vector as of its last update so the
+    fused vector never has to recompute it. Sources sharing a `weight_key` share that
+    weight (e.g. every camera counts towards "face").
+    """
+    def __init__(self, source_id: str, weight_key: str, timeout: float = 5.0):
+        self.source_id = source_id
+        self.weight_key = weight_key
+        self.timeout = timeout
+        self.contribution: List[float] = [0.0] * len(EMOTIONS)
+        self.last_update: float = 0.0
+        self.active: bool = False
+        self.scheduled_at: Optional[float] = None  # due time of the source's pending timer (see _expire_stale_sources)
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "weight_key": self.weight_key,
+            "active": self.active,
+            "age_seconds": round(now - self.last_update, 3) if self.last_update else None,
+            "vector": dict(zip(EMOTIONS, self.contribution)),
+        }
+
+
 class Orchestrator:
-    def __init__(self):
+    # Default source id -> weight key for the built-in inputs
+    DEFAULT_SOURCES = {"game_state": "game_state", "face_emotion": "face", "speech_emotion": "speech"}
+    # Built-in weight groups; generic feeds may not report into them (see update_feed)
+    RESERVED_WEIGHT_KEYS = frozenset({"game_state", "face", "speech", "audience"})
+    MAX_CUSTOM_WEIGHT_KEYS = 8
+    MAX_SOURCES = 256
+
+    def __init__(self, source_timeout: float = 5.0, source_grace: float = 60.0):
         self.weights = {
             "game_state": 0.8,
             "face": 0.1,
@@ -26,22 +85,137 @@ class Orchestrator:
         self.last_update_time = {
             "game_state": 0, "face_emotion": 0, "speech_emotion": 0
         }
-        self.emotion_map = ["tension", "excitement", "fear", "joy", "calm"]
+        self.emotion_map = list(EMOTIONS)
 
-    def _is_stale(self, source: str, timeout: int = 5) -> bool:
-        return time.time() - self.last_update_time.get(source, 0) > timeout
+        # Source registry + incremental fusion state. Each weight group keeps a running
+        # sum of its active sources' contributions, so fusing costs O(groups) per tick
+        # no matter how many sources are registered.
+        self.source_timeout = source_timeout
+        self.source_grace = source_grace  # idle time after expiry before a non-default source is forgotten
+        self.sources: Dict[str, EmotionSource] = {}
+        self._group_sums: Dict[str, List[float]] = {}
+        self._group_counts: Dict[str, int] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []  # (deadline, source_id)
+        for source_id, weight_key in self.DEFAULT_SOURCES.items():
+            self.register_source(source_id, weight_key)
 
-    def update_game_state(self, game_state: GameState):
-        self.state["game_state"] = game_state
-        self.last_update_time["game_state"] = time.time()
+    # --- Source Registry ---
 
-    def update_face_emotion(self, emotion_payload: EmotionPayload):
-        self.state["face_emotion"] = emotion_payload
-        self.last_update_time["face_emotion"] = time.time()
+    def register_source(self, source_id: str, weight_key: str, timeout: Optional[float] = None,
+                        weight: float = 0.1) -> EmotionSource:
+        """Register (or return) a source. Unknown weight keys get a new, director-adjustable weight.
+
+        Raises ValueError once MAX_SOURCES sources or MAX_CUSTOM_WEIGHT_KEYS custom weight keys exist.
+        """
+        source = self.sources.get(source_id)
+        if source is None and len(self.sources) >= self.MAX_SOURCES:
+            raise ValueError(f"Too many emotion sources (max {self.MAX_SOURCES})")
+        if weight_key not in self.weights and \
+                sum(k not in self.RESERVED_WEIGHT_KEYS for k in self.weights) >= self.MAX_CUSTOM_WEIGHT_KEYS:
+            raise ValueError(f"Too many custom weight keys (max {self.MAX_CUSTOM_WEIGHT_KEYS})")
+        if source is None:
+            source = EmotionSource(source_id, weight_key, self.source_timeout if timeout is None else timeout)
+            self.sources[source_id] = source
+            self.last_update_time.setdefault(source_id, 0)
+        if weight_key not in self.weights:
+            self.weights[weight_key] = max(0.0, min(1.0, float(weight)))
+        self._group_sums.setdefault(weight_key, [0.0] * len(EMOTIONS))
+        self._group_counts.setdefault(weight_key, 0)
+        return source
+
+    def update_source(self, source_id: str, vector: Dict[str, float], weight_key: Optional[str] = None):
+        """Cache a source's new emotion vector and fold the change into its group's running sum."""
+        source = self.sources.get(source_id) or self.register_source(source_id, weight_key or source_id)
+        new = [max(0.0, min(1.0, float(vector.get(k, 0.0)))) for k in EMOTIONS]
+        group_sum = self._group_sums[source.weight_key]
+        if source.active:
+            for i in range(len(EMOTIONS)):
+                group_sum[i] += new[i] - source.contribution[i]
+        else:
+            for i in range(len(EMOTIONS)):
+                group_sum[i] += new[i]
+            self._group_counts[source.weight_key] += 1
+            source.active = True
+        source.contribution = new
+        now = time.time()
+        source.last_update = now
+        self.last_update_time[source_id] = now
+        deadline = now + source.timeout
+        if source.scheduled_at is None or source.scheduled_at > deadline:
+            # No timer yet, or only the later forget timer of an expired source
+            self._schedule(source, deadline)
 
-    def update_speech_emotion(self, emotion_payload: EmotionPayload):
-        self.state["speech_emotion"] = emotion_payload
-        self.last_update_time["speech_emotion"] = time.time()
+    def update_feed(self, name: str, vector: Dict[str, float], device_id: Optional[str] = None):
+        """A generic sensor feed (e.g. biometrics) sending its own vector, weighted under `name`.
+
+        Built-in names are refused, so a feed can't report into the game, face, speech or
+        audience groups. Raises ValueError.
+        """
+        if not name or ":" in name or name in self.RESERVED_WEIGHT_KEYS or name in self.DEFAULT_SOURCES:
+            raise ValueError(f"Reserved or invalid source name {name!r}")
+        self.update_source(f"{name}:{device_id}" if device_id else name, vector, weight_key=name)
+
+    def _schedule(self, source: EmotionSource, due: float):
+        heapq.heappush(self._expiry_heap, (due, source.source_id))
+        source.scheduled_at = due
+
+    def _expire_stale_sources(self, now: float):
+        """Pop due timers: deactivate sources past their timeout, forget them after the grace period.
+
+        A source refreshed since its timer was set is simply re-armed; heap entries that are
+        no longer the source's current timer are skipped.
+        """
+        while self._expiry_heap and self._expiry_heap[0][0] < now:
+            due, source_id = heapq.heappop(self._expiry_heap)
+            source = self.sources.get(source_id)
+            if source is None or source.scheduled_at != due:
+                continue
+            deadline = source.last_update + source.timeout
+            if deadline >= now:
+                self._schedule(source, deadline)
+                continue
+            if source.active:
+                source.active = False
+                key = source.weight_key
+                self._group_counts[key] -= 1
+                if self._group_counts[key] == 0:
+                    # Reset rather than subtract so float drift can't accumulate
+                    self._group_sums[key] = [0.0] * len(EMOTIONS)
+                else:
+                    group_sum = self._group_sums[key]
+                    for i in range(len(EMOTIONS)):
+                        group_sum[i] -= source.contribution[i]
+            if source_id in self.DEFAULT_SOURCES:
+                source.scheduled_at = None
+            elif deadline + self.source_grace >= now:
+                self._schedule(source, deadline + self.source_grace)
+            else:
+                self._forget_source(source)
+
+    def _forget_source(self, source: EmotionSource):
+        """Drop an expired source, and its weight group if it was the group's last custom source."""
+        del self.sources[source.source_id]
+        self.last_update_time.pop(source.source_id, None)
+        key = source.weight_key
+        if key not in self.RESERVED_WEIGHT_KEYS and all(s.weight_key != key for s in self.sources.values()):
+            self.weights.pop(key, None)
+            self._group_sums.pop(key, None)
+            self._group_counts.pop(key, None)
+
+    def update_game_state(self, game_state: GameState, source_id: str = "game_state"):
+        if source_id == "game_state":
+            self.state["game_state"] = game_state
+        self.update_source(source_id, self._get_game_state_vector(game_state), weight_key="game_state")
+
+    def update_face_emotion(self, emotion_payload: EmotionPayload, source_id: str = "face_emotion"):
+        if source_id == "face_emotion":
+            self.state["face_emotion"] = emotion_payload
+        self.update_source(source_id, self._get_emotion_payload_vector(emotion_payload), weight_key="face")
+
+    def update_speech_emotion(self, emotion_payload: EmotionPayload, source_id: str = "speech_emotion"):
+        if source_id == "speech_emotion":
+            self.state["speech_emotion"] = emotion_payload
+        self.update_source(source_id, self._get_emotion_payload_vector(emotion_payload), weight_key="speech")
 
     def update_audience_vote(self, mood: str):
         if mood in self.state["audience_votes"]:
@@ -67,9 +241,10 @@ class Orchestrator:
                     except Exception:
                         continue
 
-    def _get_game_state_vector(self) -> Dict[str, float]:
-        gs = self.state["game_state"]
-        
+    def _get_game_state_vector(self, gs: Optional[GameState] = None) -> Dict[str, float]:
+        if gs is None:
+            gs = self.state["game_state"]
+
         # Threat proximity is a good proxy for Fear and Tension
         fear = gs.threat_proximity * 0.8
         tension = gs.threat_proximity * 0.6
@@ -93,25 +268,7 @@ class Orchestrator:
         return vector
 
     def _get_emotion_payload_vector(self, payload: EmotionPayload) -> Dict[str, float]:
-        # Mapping from DeepFace/Speech model outputs to our desired vector
-        # This needs to be customized based on your model's output labels
-        emotion_mapping = {
-            "angry": {"tension": 0.8, "excitement": 0.4},
-            "disgust": {"tension": 0.6},
-            "fear": {"fear": 1.0, "tension": 0.7},
-            "happy": {"joy": 1.0, "excitement": 0.6},
-            "sad": {"calm": 0.5}, # Can be mapped differently
-            "surprise": {"excitement": 0.9, "fear": 0.2},
-            "neutral": {"calm": 0.8}
-        }
-        
-        base_vector = {k: 0.0 for k in self.emotion_map}
-        dominant_emotion = payload.emotion.lower()
-        
-        if dominant_emotion in emotion_mapping:
-            for key, value in emotion_mapping[dominant_emotion].items():
-                base_vector[key] = value * payload.confidence
-        return base_vector
+        return label_to_vector(payload.emotion, payload.confidence)
     
     def get_audience_vector(self) -> Dict[str, float]:
         total_votes = sum(self.state["audience_votes"].values())
@@ -124,48 +281,36 @@ class Orchestrator:
         }
 
     def get_final_emotion_vector(self) -> Dict[str, float]:
+        self._expire_stale_sources(time.time())
         # Manual override short-circuit for demos
         if self.manual_override["active"]:
             return self.manual_override["vector"].copy()
 
         final_vector = {k: 0.0 for k in self.emotion_map}
 
-        # Determine active sources and dynamically re-normalize weights so that
-        # emotions still move when the game client (dominant weight) is absent.
-        active_sources = []
-        effective_weights = {}
-        for source_key, weight_key in [("game_state", "game_state"), ("face_emotion", "face"), ("speech_emotion", "speech")]:
-            if not self._is_stale(source_key):
-                active_sources.append(weight_key)
-        if not active_sources:
+        # Only groups with at least one fresh source take part; weights are re-normalized
+        # over them so emotions still move when the game client (dominant weight) is absent.
+        active_groups = [key for key, count in self._group_counts.items() if count > 0]
+        if not active_groups:
             return final_vector  # all stale -> zeros
-        weight_sum = sum(self.weights[w] for w in active_sources)
-        if weight_sum == 0:
-            # fallback uniform distribution if configured weights zero out
-            for w in active_sources:
-                effective_weights[w] = 1 / len(active_sources)
-        else:
-            for w in active_sources:
-                effective_weights[w] = self.weights[w] / weight_sum
-
-        if "game_state" in active_sources:
-            game_vector = self._get_game_state_vector()
-            for k in self.emotion_map:
-                final_vector[k] += game_vector.get(k, 0.0) * effective_weights["game_state"]
-        if "face" in active_sources:
-            face_vector = self._get_emotion_payload_vector(self.state["face_emotion"])
-            for k in self.emotion_map:
-                final_vector[k] += face_vector.get(k, 0.0) * effective_weights["face"]
-        if "speech" in active_sources:
-            speech_vector = self._get_emotion_payload_vector(self.state["speech_emotion"])
-            for k in self.emotion_map:
-                final_vector[k] += speech_vector.get(k, 0.0) * effective_weights["speech"]
+        weight_sum = sum(self.weights.get(key, 0.0) for key in active_groups)
+        for key in active_groups:
+            if weight_sum == 0:
+                # fallback uniform distribution if configured weights zero out
+                effective_weight = 1 / len(active_groups)
+            else:
+                effective_weight = self.weights.get(key, 0.0) / weight_sum
+            # Sources within a group share its weight equally (mean of contributions)
+            scale = effective_weight / self._group_counts[key]
+            for i, k in enumerate(EMOTIONS):
+                final_vector[k] += self._group_sums[key][i] * scale
 
         for k in self.emotion_map:
             final_vector[k] = max(0.0, min(1.0, final_vector[k]))
         return final_vector
 
     def get_all_sources_data(self) -> Dict[str, Any]:
+        now = time.time()
         return {
             "game_state": self.state["game_state"].dict(),
             "face_emotion": self.state["face_emotion"].dict(),
@@ -174,4 +319,5 @@ class Orchestrator:
             "audience_vector": self.get_audience_vector(),
             "weights": self.weights,
             "manual_override": self.manual_override,
+            "sources": {source_id: source.to_dict(now) for source_id, source in self.sources.items()},
         }
\ No newline at end of file
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _PcmEntry:
+    def __init__(self, key: str, array: np.ndarray, frame_rate: int, channels: int):
+        array.flags.writeable = False
+        self.key = key
+        self.array = array
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.nbytes = int(array.nbytes)
+        self.refcount = 0
+        self.last_used = time.time()
+
+
+class PcmHandle:
+    """A counted, read-only reference to shared PCM in a PcmStore.
+
+    `samples` is a zero-copy (frames, channels) float32 view. The handle exposes the same
+    basic attributes as pydub's AudioSegment so AudioModulator can use it as base DNA.
+    Call release() (or use it as a context manager) when done; releasing twice is harmless.
+    """
+    def __init__(self, store: "PcmStore", entry: _PcmEntry, name: Optional[str] = None):
+        self._store = store
+        self.key = entry.key
+        self.name = name
+        self.samples: np.ndarray = entry.array.view()
+        self.frame_rate = entry.frame_rate
+        self.channels = entry.channels
+        self.released = False
+
+    @property
+    def frames(self) -> int:
+        return int(self.samples.shape[0])
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frames / float(self.frame_rate) if self.frame_rate else 0.0
+
+    def info(self) -> Dict:
+        return {"duration_seconds": self.duration_seconds, "channels": self.channels, "sample_rate": self.frame_rate}
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self._store._release(self.key)
+
+    def __enter__(self) -> "PcmHandle":
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def content_hash(array: np.ndarray) -> str:
+    return hashlib.sha1(np.ascontiguousarray(array).data).hexdigest()
+
+
+class PcmStore:
+    """Process-wide, read-only PCM shared by every AudioModulator, keyed by content hash.
+
+    Identical audio is held once no matter how many sessions play it. Entries are
+    refcounted through PcmHandle; unreferenced entries stay cached and are dropped in
+    LRU order once the total exceeds `budget_bytes`. Referenced entries are never evicted.
+    """
+    def __init__(self, budget_bytes: int = 512 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[str, _PcmEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, loader: Callable[[], np.ndarray], frame_rate: int, channels: int,
+                name: Optional[str] = None) -> PcmHandle:
+        """Handle for `key`, calling `loader()` (outside the lock) only on a cache miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._checkout(entry, name)
+        array = loader()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:  # another thread may have loaded the same content meanwhile
+                entry = _PcmEntry(key, array, frame_rate, channels)
+                self._entries[key] = entry
+            handle = self._checkout(entry, name)
+            self._evict()
+            return handle
+
+    def acquire_array(self, array: np.ndarray, frame_rate: int, name: Optional[str] = None) -> PcmHandle:
+        """Share a freshly decoded (frames, channels) float32 array; duplicates collapse onto one copy."""
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        if array.ndim == 1:
+            array = array[:, None]
+        return self.acquire(content_hash(array), lambda: array, frame_rate, array.shape[1], name)
+
+    def acquire_file(self, key: str, pcm_path: str, frames: int, channels: int, frame_rate: int,
+                     name: Optional[str] = None) -> PcmHandle:
+        """Share a raw float32 PCM cache file via a read-only memory map (page cache backed)."""
+        return self.acquire(
+            key, lambda: np.memmap(pcm_path, dtype=np.float32, mode="r", shape=(frames, channels)),
+            frame_rate, channels, name)
+
+    def _checkout(self, entry: _PcmEntry, name: Optional[str]) -> PcmHandle:
+        entry.refcount += 1
+        entry.last_used = time.time()
+        self._entries.move_to_end(entry.key)
+        return PcmHandle(self, entry, name)
+
+    def _release(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refcount > 0:
+                entry.refcount -= 1
+            self._evict()
+
+    def _evict(self):
+        total = sum(e.nbytes for e in self._entries.values())
+        if total <= self.budget_bytes:
+            return
+        for key in list(self._entries):  # oldest first
+            entry = self._entries[key]
+            if entry.refcount == 0:
+                del self._entries[key]
+                total -= entry.nbytes
+                if total <= self.budget_bytes:
+                    return
+        logger.debug("PCM store over budget with only referenced entries left (%d bytes)", total)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e.nbytes for e in self._entries.values()),
+                "referenced": sum(1 for e in self._entries.values() if e.refcount),
+                "budget_bytes": self.budget_bytes,
+            }
+
+
+# Shared by every AudioModulator / library in the process unless one is passed explicitly
+default_store = PcmStore(int(float(os.getenv("AURA_PCM_BUDGET_MB", "512")) * 1024 * 1024))
@@ -0,0 +1,63 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from .orchestrator import EMOTIONS
+
+
+class EmotionPredictor:
+    """Short-horizon forecast of the fused emotion vector (Holt linear extrapolation).
+
+    Fed with the orchestrator's output every tick, it tracks a smoothed level and a
+    per-second trend for each emotion and extrapolates them `horizon` seconds ahead,
+    so music changes can be prepared before the vector actually gets there.
+
+    alpha / beta are the level / trend smoothing factors per `reference_tick` seconds and
+    are rescaled to the real tick interval, like the tempo smoothing in AudioModulator.
+    """
+    def __init__(self, alpha: float = 0.5, beta: float = 0.3, horizon: float = 1.5,
+                 reference_tick: float = 0.5, history_seconds: float = 30.0):
+        self.alpha = alpha
+        self.beta = beta
+        self.horizon = horizon
+        self.reference_tick = reference_tick
+        self.level: Dict[str, float] = {k: 0.0 for k in EMOTIONS}
+        self.trend: Dict[str, float] = {k: 0.0 for k in EMOTIONS}  # units per second
+        self.last_time: Optional[float] = None
+        self.history_seconds = history_seconds
+        self.history: Deque[Tuple[float, Dict[str, float]]] = deque()
+
+    def reset(self):
+        self.level = {k: 0.0 for k in EMOTIONS}
+        self.trend = {k: 0.0 for k in EMOTIONS}
+        self.last_time = None
+        self.history.clear()
+
+    def update(self, vector: Dict[str, float], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.history.append((now, dict(vector)))
+        while self.history and now - self.history[0][0] > self.history_seconds:
+            self.history.popleft()
+
+        if self.last_time is None:
+            self.level = {k: float(vector.get(k, 0.0)) for k in EMOTIONS}
+            self.trend = {k: 0.0 for k in EMOTIONS}
+            self.last_time = now
+            return
+        dt = now - self.last_time
+        if dt <= 0:
+            return
+        steps = dt / self.reference_tick
+        a = 1.0 - (1.0 - self.alpha) ** steps
+        b = 1.0 - (1.0 - self.beta) ** steps
+        for k in EMOTIONS:
+            prev_level = self.level[k]
+            level = a * float(vector.get(k, 0.0)) + (1 - a) * (prev_level + self.trend[k] * dt)
+            self.trend[k] = b * (level - prev_level) / dt + (1 - b) * self.trend[k]
+            self.level[k] = level
+        self.last_time = now
+
+    def forecast(self, horizon: Optional[float] = None) -> Dict[str, float]:
+        """Extrapolated vector `horizon` seconds after the last update (clamped 0-1)."""
+        h = self.horizon if horizon is None else horizon
+        return {k: max(0.0, min(1.0, self.level[k] + self.trend[k] * h)) for k in EMOTIONS}
@@ -0,0 +1,239 @@
+"""Offline rendering of an adapted soundtrack from a recorded emotion timeline.
+
+    cd aura_backend
+    python -m app.render music_dna_store/calm_sample.wav session.jsonl -o soundtrack.wav
+
+The timeline is JSONL (see timeline.py): fused vectors recorded with
+AURA_SESSION_RECORD_PATH, or label entries written by the sensors' offline modes.
+
+The control curve (tempo, filter, reverb, drive, delay, gain per tick) is computed once,
+in order, by the same AudioModulator the live server uses. The output is then cut into
+chunks at phrase boundaries that are rendered independently in a process pool - each
+worker memory-maps the decoded DNA, follows the tempo curve with the phase vocoder and
+runs the effect kernels from dsp.py - and the chunks are stitched with equal-power
+crossfades while the WAV is written.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .audio_modulator import AudioModulator
+from .dna_library import PcmTrack, decode_to_pcm
+from .dsp import Biquad, Reverb, TempoDelay, phase_vocoder, saturate
+from .pcm_store import PcmStore
+from .timeline import load_timeline, vector_at
+
+logger = logging.getLogger(__name__)
+
+CONTROL_TICK = 0.5          # seconds between modulation decisions, like the live loop
+BLOCK_FRAMES = 4096         # effect parameters are updated (and ramped) per block
+PREROLL_SECONDS = 2.0       # rendered and dropped before each chunk so filter/reverb/delay state is warm
+CROSSFADE_SECONDS = 0.1
+DELAY_EVENT_SECONDS = 2.0   # how long a delay_event keeps the delay send open
+DELAY_SEND = 0.3
+N_FFT = 2048
+HOP = 512
+
+Timeline = Sequence[Tuple[float, Dict[str, float]]]
+
+
+def build_control_curve(timeline: Timeline, duration: float, track: PcmTrack,
+                        tick: float = CONTROL_TICK) -> Dict[str, np.ndarray]:
+    """Per-tick modulation parameters for the whole timeline, plus the source read position.
+
+    `source_pos` (in source samples) integrates the tempo multiplier, so chunks rendered
+    anywhere in the timeline know exactly where in the (looping) DNA they are.
+    """
+    modulator = AudioModulator(pcm_store=PcmStore())  # private store: nothing shared with a live server
+    modulator.select_track(track)
+    modulator.reset_clock(0.0)
+    times = np.arange(0.0, duration + 2 * tick, tick)
+    curve = {k: np.zeros(times.shape[0]) for k in (
+        "tempo_multiplier", "tempo_bpm", "cutoff_hz", "resonance", "reverb_mix",
+        "drive", "delay_mix", "delay_feedback", "gain", "phrase")}
+    timeline_times = [e[0] for e in timeline]
+    delay_until, delay_feedback = -1.0, 0.35
+    for j, t in enumerate(times):
+        snap = modulator.snapshot(vector_at(timeline, float(t), timeline_times), now=float(t))
+        fx = {f["type"]: f for f in snap.advanced.get("fx", [])}
+        if "delay_event" in fx:
+            delay_until, delay_feedback = t + DELAY_EVENT_SECONDS, fx["delay_event"]["feedback"]
+        curve["tempo_multiplier"][j] = snap.tempo_multiplier
+        curve["tempo_bpm"][j] = snap.tempo_bpm
+        curve["cutoff_hz"][j] = fx.get("filter", {}).get("cutoff_hz", 20000)
+        curve["resonance"][j] = fx.get("filter", {}).get("resonance", 0.707)
+        curve["reverb_mix"][j] = fx.get("reverb_send", {}).get("mix", 0.0)
+        curve["drive"][j] = fx.get("saturation", {}).get("drive", 0.0)
+        curve["delay_mix"][j] = DELAY_SEND if t < delay_until else 0.0
+        curve["delay_feedback"][j] = delay_feedback
+        curve["gain"][j] = snap.gain
+        curve["phrase"][j] = snap.advanced.get("phrase", {}).get("global_index", 0)
+    modulator.base_dna.release()
+    mult = curve["tempo_multiplier"]
+    curve["source_pos"] = np.concatenate([[0.0], np.cumsum((mult[1:] + mult[:-1]) * 0.5 * tick)]) * track.frame_rate
+    curve["time"] = times
+    return curve
+
+
+def plan_chunks(curve: Dict[str, np.ndarray], duration: float, chunk_seconds: float) -> List[Tuple[float, float]]:
+    """Split [0, duration) at phrase starts into chunks of roughly `chunk_seconds`."""
+    times, phrase = curve["time"], curve["phrase"]
+    starts = times[1:][phrase[1:] != phrase[:-1]]
+    if not starts.size:  # no phrase changes (very short timeline): fall back to fixed cuts
+        starts = np.arange(chunk_seconds, duration, chunk_seconds)
+    cuts = [0.0]
+    for b in starts:
+        # Keep the last chunk from being a sliver
+        if b - cuts[-1] >= chunk_seconds and duration - b >= 0.25 * chunk_seconds:
+            cuts.append(float(b))
+    return list(zip(cuts, cuts[1:] + [duration]))
+
+
+def _interp(t: float, curve: Dict[str, np.ndarray], key: str) -> float:
+    return float(np.interp(t, curve["time"], curve[key]))
+
+
+def render_chunk(job: Dict) -> np.ndarray:
+    """Render [start, end + crossfade) of the soundtrack (worker entry point)."""
+    sr, curve = job["frame_rate"], job["curve"]
+    t_a = max(0.0, job["start"] - PREROLL_SECONDS)
+    t_b = min(job["duration"], job["end"] + CROSSFADE_SECONDS)
+    first, last = int(round(t_a * sr)), int(round(t_b * sr))
+    n_out = last - first
+
+    # Tempo-following read of the (looping) DNA: only the source region this chunk needs is copied
+    src = np.memmap(job["pcm_path"], dtype=np.float32, mode="r", shape=(job["frames"], job["channels"]))
+    hop_times = (first + np.arange(-(-n_out // HOP) + N_FFT // HOP) * HOP) / float(sr)
+    pos = np.interp(hop_times, curve["time"], curve["source_pos"])
+    base = int(math.floor(pos.min())) - N_FFT
+    span = int(math.ceil(pos.max())) - base + N_FFT
+    region = np.asarray(src[(base + np.arange(span)) % job["frames"]], dtype=np.float32)
+    audio = phase_vocoder(region, pos - base, n_out, N_FFT, HOP)
+
+    params = {k: _interp(t_a, curve, k) for k in ("cutoff_hz", "resonance", "tempo_bpm", "drive", "gain")}
+    # Cutoff moves once per control tick, so a 256-frame coefficient ramp is smooth and cheaper
+    lowpass = Biquad(sr, job["channels"], "lowpass", params["cutoff_hz"], params["resonance"], ramp_frames=256)
+    delay = TempoDelay(sr, job["channels"], "1/8", params["tempo_bpm"])
+    delay_bpm = params["tempo_bpm"]
+    reverb = Reverb(sr, job["channels"])
+    reverb.mix = _interp(t_a, curve, "reverb_mix")
+    drive, gain = params["drive"], params["gain"]
+    for s in range(0, n_out, BLOCK_FRAMES):
+        e = min(n_out, s + BLOCK_FRAMES)
+        t = (first + e) / float(sr)  # parameters ramp towards their value at the end of the block
+        block = audio[s:e]
+        lowpass.set_params(_interp(t, curve, "cutoff_hz"), _interp(t, curve, "resonance"))
+        block = lowpass.process(block)
+        new_drive = _interp(t, curve, "drive")
+        block = saturate(block, new_drive, drive)
+        drive = new_drive
+        bpm = _interp(t, curve, "tempo_bpm")
+        if abs(bpm - delay_bpm) > 0.02 * delay_bpm:  # re-sync only on real tempo moves
+            delay.set_time(bpm, "1/8")
+            delay_bpm = bpm
+        block = delay.process(block, feedback=_interp(t, curve, "delay_feedback"), mix=_interp(t, curve, "delay_mix"))
+        block = reverb.process(block, _interp(t, curve, "reverb_mix"))
+        new_gain = _interp(t, curve, "gain")
+        audio[s:e] = block * np.linspace(gain, new_gain, e - s, endpoint=False, dtype=np.float32)[:, None]
+        gain = new_gain
+    return audio[int(round(job["start"] * sr)) - first:]
+
+
+def _write_pcm16(out: wave.Wave_write, audio: np.ndarray):
+    out.writeframes((np.clip(audio, -1.0, 1.0) * 32767.0).astype("<i2").tobytes())
+
+
+def stitch(chunks: Sequence[Tuple[float, float]], rendered: Iterable[np.ndarray], out_path: str,
+           frame_rate: int, channels: int) -> int:
+    """Write rendered chunks as one 16-bit WAV, crossfading each chunk's tail into the next head."""
+    carry: Optional[np.ndarray] = None
+    written = 0
+    with wave.open(out_path, "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(frame_rate)
+        for i, ((start, end), audio) in enumerate(zip(chunks, rendered)):
+            if carry is not None:
+                n = min(carry.shape[0], audio.shape[0])
+                fade = (np.arange(n, dtype=np.float32) + 0.5) / n * (np.pi / 2)
+                audio = audio.copy()
+                audio[:n] = carry[:n] * np.cos(fade)[:, None] + audio[:n] * np.sin(fade)[:, None]
+            body = audio.shape[0] if i == len(chunks) - 1 else \
+                int(round(end * frame_rate)) - int(round(start * frame_rate))
+            _write_pcm16(out, audio[:body])
+            written += min(body, audio.shape[0])
+            carry = audio[body:]
+    return written
+
+
+def render_timeline(dna_path: str, timeline: Union[str, Timeline], out_path: str,
+                    duration: Optional[float] = None, workers: Optional[int] = None,
+                    chunk_seconds: float = 30.0, tick: float = CONTROL_TICK) -> Dict:
+    """Render `dna_path` adapted to `timeline` (JSONL path or [(t, vector), ...]) into a WAV.
+
+    Returns a small summary (duration, chunk count, wall time, realtime factor).
+    """
+    timeline = load_timeline(timeline) if isinstance(timeline, str) else list(timeline)
+    if duration is None:
+        duration = (timeline[-1][0] + tick) if timeline else 0.0
+    if duration <= 0:
+        raise ValueError("Nothing to render: empty timeline and no duration given")
+    workers = workers or os.cpu_count() or 1
+    started = time.time()
+    tmp_dir = tempfile.mkdtemp(prefix="aura_render_")
+    try:
+        pcm_path = os.path.join(tmp_dir, "dna.f32")
+        meta = decode_to_pcm(dna_path, pcm_path)
+        track = PcmTrack(os.path.basename(dna_path), pcm_path, meta["frame_rate"], meta["channels"],
+                         meta["frames"], store=PcmStore())
+        curve = build_control_curve(timeline, duration, track, tick)
+        chunks = plan_chunks(curve, duration, chunk_seconds)
+        jobs = [{"pcm_path": pcm_path, "frames": meta["frames"], "channels": meta["channels"],
+                 "frame_rate": meta["frame_rate"], "start": start, "end": end, "duration": duration,
+                 "curve": curve} for start, end in chunks]
+        logger.info(f"Rendering {duration:.1f}s in {len(chunks)} chunks on {min(workers, len(jobs))} workers")
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                frames = stitch(chunks, pool.map(render_chunk, jobs), out_path, meta["frame_rate"], meta["channels"])
+        else:
+            frames = stitch(chunks, map(render_chunk, jobs), out_path, meta["frame_rate"], meta["channels"])
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    elapsed = time.time() - started
+    return {
+        "output": out_path,
+        "duration_seconds": round(frames / float(meta["frame_rate"]), 3),
+        "chunks": len(chunks),
+        "workers": min(workers, len(chunks)),
+        "render_seconds": round(elapsed, 3),
+        "realtime_factor": round(duration / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Render an adapted soundtrack for an emotion timeline")
+    parser.add_argument("dna", help="music DNA file (wav, or anything ffmpeg can decode)")
+    parser.add_argument("timeline", help="JSONL emotion timeline")
+    parser.add_argument("-o", "--output", default="soundtrack.wav")
+    parser.add_argument("--duration", type=float, default=None, help="seconds (default: timeline length)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--chunk-seconds", type=float, default=30.0)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    summary = render_timeline(args.dna, args.timeline, args.output, duration=args.duration,
+                              workers=args.workers, chunk_seconds=args.chunk_seconds)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
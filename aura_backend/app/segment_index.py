@@ -0,0 +1,177 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .track_index import features_to_energy_valence, spread_coords
+
+N_BANDS = 16
+EDGE_SAMPLES = 2048
+JUMP_BLOCK_ROWS = 256
+
+
+def _band_profile(block: np.ndarray, sample_rate: int, edges: np.ndarray) -> np.ndarray:
+    """Log-band energies (dB) of a short mono block - used to judge if two segments join smoothly."""
+    if block.shape[0] < EDGE_SAMPLES:
+        block = np.pad(block, (0, EDGE_SAMPLES - block.shape[0]))
+    spec = np.abs(np.fft.rfft(block * np.hanning(block.shape[0]))) ** 2
+    freqs = np.fft.rfftfreq(block.shape[0], 1.0 / sample_rate)
+    band = np.digitize(freqs, edges) - 1
+    energies = np.bincount(np.clip(band, 0, N_BANDS - 1), weights=spec, minlength=N_BANDS)
+    return 10 * np.log10(energies + 1e-10)
+
+
+def analyze_segments(samples: np.ndarray, sample_rate: int, tempo_bpm: float,
+                     beats_per_segment: int = 4, frame_size: int = 2048) -> Dict[str, np.ndarray]:
+    """Cut a (frames, channels) track into bar-sized segments on its beat grid and describe each one.
+
+    Returns arrays (one row per segment): starts/ends in samples, coords (energy, valence),
+    and the head/tail band profiles used to precompute jump compatibility.
+    """
+    mono = samples.mean(axis=1) if samples.ndim == 2 else np.asarray(samples)
+    tempo = tempo_bpm if tempo_bpm and tempo_bpm > 0 else 120.0
+    seg_len = max(frame_size * 2, int(round(sample_rate * 60.0 / tempo * beats_per_segment)))
+    n_segments = max(1, mono.shape[0] // seg_len)
+    edges = np.geomspace(40.0, sample_rate / 2.0, N_BANDS + 1)
+    edges[0] = 0.0
+    window = np.hanning(frame_size).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_size, 1.0 / sample_rate)
+
+    starts = np.arange(n_segments, dtype=np.int64) * seg_len
+    ends = np.minimum(starts + seg_len, mono.shape[0])
+    coords = np.zeros((n_segments, 2), dtype=np.float32)
+    heads = np.zeros((n_segments, N_BANDS), dtype=np.float32)
+    tails = np.zeros((n_segments, N_BANDS), dtype=np.float32)
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        seg = np.asarray(mono[s:e], dtype=np.float32)
+        hop = frame_size // 2
+        idx = np.arange(0, max(1, seg.shape[0] - frame_size + 1), hop)
+        frames = np.stack([seg[j:j + frame_size] for j in idx]) if seg.shape[0] >= frame_size else seg[None, :]
+        if frames.shape[1] < frame_size:
+            frames = np.pad(frames, ((0, 0), (0, frame_size - frames.shape[1])))
+        spec = np.abs(np.fft.rfft(frames * window, axis=1))
+        power = spec.sum(axis=1) + 1e-12
+        flux = np.maximum(0.0, np.diff(np.log1p(spec), axis=0)).sum(axis=1) if spec.shape[0] > 1 else np.zeros(1)
+        onsets = int(((flux[1:-1] > flux[:-2]) & (flux[1:-1] >= flux[2:]) &
+                      (flux[1:-1] > flux.mean() + flux.std())).sum()) if flux.size > 3 else 0
+        features = {
+            "rms_db": float(20 * np.log10(np.sqrt(np.mean(seg ** 2)) + 1e-12)),
+            "centroid_hz": float(np.mean((spec * freqs).sum(axis=1) / power)),
+            "onset_rate": onsets / max(1e-6, seg.shape[0] / sample_rate),
+            "tempo_bpm": tempo,
+            "low_ratio": float(np.mean(spec[:, freqs < 200].sum(axis=1) / power)),
+        }
+        coords[i] = features_to_energy_valence(features)
+        heads[i] = _band_profile(seg[:EDGE_SAMPLES], sample_rate, edges)
+        tails[i] = _band_profile(seg[-EDGE_SAMPLES:], sample_rate, edges)
+    return {"starts": starts, "ends": ends, "coords": coords, "heads": heads, "tails": tails}
+
+
+class SegmentIndex:
+    """All library segments in one contiguous set of arrays, plus precomputed jump points.
+
+    Row i describes one bar-sized segment: track_ids[i], starts[i]/ends[i] (samples) and
+    coords[i] (energy, valence). jump_targets[i] lists the segments that can follow i
+    without an audible seam (the natural successor first, at cost 0), so choosing the
+    next segment at runtime is a lookup over a handful of rows, never an analysis pass.
+    """
+    def __init__(self, track_names: List[str], sample_rates: Sequence[int], track_ids: np.ndarray,
+                 starts: np.ndarray, ends: np.ndarray, coords: np.ndarray,
+                 jump_targets: np.ndarray, jump_costs: np.ndarray):
+        self.track_names = track_names
+        self.sample_rates = np.asarray(sample_rates, dtype=np.int64)
+        self.track_ids = track_ids
+        self.starts = starts
+        self.ends = ends
+        self.coords = coords
+        self.jump_targets = jump_targets
+        self.jump_costs = jump_costs
+
+    def __len__(self) -> int:
+        return int(self.track_ids.shape[0])
+
+    @classmethod
+    def build(cls, per_track: Dict[str, Dict[str, np.ndarray]], sample_rates: Dict[str, int],
+              max_jumps: int = 8, max_jump_cost: float = 12.0) -> "SegmentIndex":
+        names = sorted(per_track)
+        if not names:
+            empty_i = np.zeros(0, dtype=np.int64)
+            return cls([], [], empty_i.astype(np.int32), empty_i, empty_i, np.zeros((0, 2), np.float32),
+                       np.zeros((0, 0), np.int32), np.zeros((0, 0), np.float32))
+        track_ids = np.concatenate([np.full(per_track[n]["starts"].shape[0], i, dtype=np.int32)
+                                    for i, n in enumerate(names)])
+        starts = np.concatenate([per_track[n]["starts"] for n in names]).astype(np.int64)
+        ends = np.concatenate([per_track[n]["ends"] for n in names]).astype(np.int64)
+        coords = np.ascontiguousarray(spread_coords(np.concatenate([per_track[n]["coords"] for n in names])))
+        heads = np.concatenate([per_track[n]["heads"] for n in names])
+        tails = np.concatenate([per_track[n]["tails"] for n in names])
+        rates = [sample_rates[n] for n in names]
+
+        # Seam cost of playing j right after i: spectral mismatch (dB) between i's tail and j's head.
+        # Computed for a block of rows at a time, keeping only each row's best candidates, so
+        # memory stays O(rows * n) however large the library is
+        n = tails.shape[0]
+        natural = np.arange(1, n + 1)
+        last_of_track = np.append(track_ids[1:] != track_ids[:-1], True)
+        natural[last_of_track] = -1
+        k = min(max_jumps, n)
+        targets = np.full((n, k), -1, dtype=np.int32)
+        costs = np.full((n, k), np.inf, dtype=np.float32)
+        for r in range(0, n, JUMP_BLOCK_ROWS):
+            rows = np.arange(r, min(r + JUMP_BLOCK_ROWS, n))
+            block = np.zeros((rows.shape[0], n), dtype=np.float32)
+            for band in range(tails.shape[1]):  # (rows, n) temporaries, never (rows, n, bands)
+                block += np.abs(tails[rows, band, None] - heads[None, :, band])
+            block /= tails.shape[1]
+            block[rows - r, rows] = np.inf  # repeating a bar is what the natural loop already does
+            has_natural = natural[rows] >= 0
+            block[(rows - r)[has_natural], natural[rows][has_natural]] = np.inf  # listed first, at cost 0
+            if k < n:
+                candidates = np.argpartition(block, k - 1, axis=1)[:, :k]
+            else:
+                candidates = np.broadcast_to(np.arange(n), block.shape)
+            candidate_costs = np.take_along_axis(block, candidates, axis=1)
+            order = np.argsort(candidate_costs, axis=1, kind="stable")
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_costs = np.take_along_axis(candidate_costs, order, axis=1)
+            for i, cand, cand_cost in zip(rows, candidates, candidate_costs):
+                keep = cand_cost <= max_jump_cost
+                row = ([int(natural[i])] if natural[i] >= 0 else []) + cand[keep].tolist()
+                row_costs = ([0.0] if natural[i] >= 0 else []) + cand_cost[keep].tolist()
+                targets[i, :min(k, len(row))] = row[:k]
+                costs[i, :min(k, len(row))] = row_costs[:k]
+        return cls(names, rates, track_ids, starts, ends, coords, targets, costs)
+
+    def nearest(self, energy: float, valence: float, track: Optional[str] = None) -> int:
+        """Global nearest segment (optionally restricted to one track); -1 if the index is empty."""
+        if not len(self):
+            return -1
+        d = ((self.coords - np.array([energy, valence], dtype=np.float32)) ** 2).sum(axis=1)
+        if track in self.track_names:
+            d = np.where(self.track_ids == self.track_names.index(track), d, np.inf)
+        return int(np.argmin(d))
+
+    def next_segment(self, current: int, energy: float, valence: float, seam_weight: float = 0.02) -> int:
+        """Best follow-up for `current` among its precomputed jump points (emotion fit + seam cost)."""
+        if current < 0 or current >= len(self):
+            return self.nearest(energy, valence)
+        targets = self.jump_targets[current]
+        valid = targets >= 0
+        if not valid.any():
+            # End of a track with no compatible jump: loop back to the track's first segment
+            same = np.flatnonzero(self.track_ids == self.track_ids[current])
+            return int(same[0])
+        targets = targets[valid]
+        d = np.sqrt(((self.coords[targets] - np.array([energy, valence], dtype=np.float32)) ** 2).sum(axis=1))
+        score = d + seam_weight * self.jump_costs[current][valid]
+        return int(targets[int(np.argmin(score))])
+
+    def describe(self, i: int) -> Dict:
+        sr = float(self.sample_rates[self.track_ids[i]])
+        return {
+            "index": int(i),
+            "track": self.track_names[self.track_ids[i]],
+            "start_s": round(float(self.starts[i]) / sr, 4),
+            "end_s": round(float(self.ends[i]) / sr, 4),
+            "energy": round(float(self.coords[i, 0]), 3),
+            "valence": round(float(self.coords[i, 1]), 3),
+        }
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Topics a passive (read-only) viewer can follow over /stream
+SSE_TOPICS = ("final_vector", "audience", "audio", "dna_loaded")
+# Topics a studio can subscribe to over /ws/studio (default: all of them, every tick)
+STUDIO_TOPICS = ("final_vector", "source_data", "audio", "face_frame", "dna_loaded")
+
+
+def encode_sse(topic: str, data) -> bytes:
+    """Serialize one event using text/event-stream framing."""
+    body = json.dumps(data, separators=(",", ":"))
+    return f"event: {topic}\ndata: {body}\n\n".encode("utf-8")
+
+
+def parse_topics(raw: str) -> Set[str]:
+    """Parse a comma separated topic list, keeping only known SSE topics."""
+    requested = {t.strip() for t in (raw or "").split(",") if t.strip()}
+    return {t for t in requested if t in SSE_TOPICS}
+
+
+class SSESubscriber:
+    """One passive viewer: the topics it follows and a small queue of encoded events."""
+    def __init__(self, topics: Set[str], max_pending: int = 8):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def offer(self, chunk: bytes):
+        # A slow viewer loses its oldest pending event instead of stalling the main loop
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(chunk)
+
+
+class SSEHub:
+    """Read-only fan-out for large passive audiences.
+
+    Each published event is encoded exactly once; the same bytes object is then queued
+    to every subscriber of that topic, so thousands of viewers cost one serialization
+    per tick. Topics nobody follows are never encoded at all (see wants()).
+    """
+    def __init__(self, keepalive_seconds: float = 15.0):
+        self.subscribers: Dict[str, Set[SSESubscriber]] = {t: set() for t in SSE_TOPICS}
+        self.keepalive_seconds = keepalive_seconds
+
+    def subscribe(self, topics: Iterable[str]) -> SSESubscriber:
+        sub = SSESubscriber(set(topics))
+        for topic in sub.topics:
+            self.subscribers[topic].add(sub)
+        logger.debug(f"SSE viewer subscribed to {sorted(sub.topics)}")
+        return sub
+
+    def unsubscribe(self, sub: SSESubscriber):
+        for topic in sub.topics:
+            self.subscribers[topic].discard(sub)
+
+    def wants(self, topic: str) -> bool:
+        return bool(self.subscribers.get(topic))
+
+    def publish(self, topic: str, data) -> int:
+        """Encode `data` once and queue it to every subscriber of `topic`. Returns fan-out count."""
+        subs = self.subscribers.get(topic)
+        if not subs:
+            return 0
+        chunk = encode_sse(topic, data)
+        for sub in subs:
+            sub.offer(chunk)
+        return len(subs)
+
+    async def events(self, sub: SSESubscriber) -> AsyncIterator[bytes]:
+        """Yield encoded events for one subscriber, with comment keepalives when idle."""
+        yield b"retry: 2000\n\n"
+        while True:
+            try:
+                chunk = await asyncio.wait_for(sub.queue.get(), timeout=self.keepalive_seconds)
+            except asyncio.TimeoutError:
+                chunk = b": keepalive\n\n"
+            yield chunk
+
+    def summary(self) -> Dict[str, int]:
+        viewers = set()
+        for subs in self.subscribers.values():
+            viewers.update(subs)
+        return {"viewers": len(viewers), **{t: len(s) for t, s in self.subscribers.items()}}
+
+
+class StudioSubscription:
+    """Topic filter + per-topic rate limit negotiated by one studio connection.
+
+    Built from a `subscribe` message payload. `topics` may be a list of topic names
+    (unthrottled) or a mapping of topic -> max rate in Hz (0/None = unthrottled).
+    A studio that never subscribes keeps the legacy behaviour: every topic, every tick.
+    """
+    def __init__(self, max_rates: Optional[Dict[str, Optional[float]]] = None):
+        if max_rates is None:
+            max_rates = {t: None for t in STUDIO_TOPICS}
+        self.min_interval: Dict[str, float] = {}
+        for topic, rate in max_rates.items():
+            if topic not in STUDIO_TOPICS:
+                continue
+            try:
+                rate = float(rate) if rate else 0.0
+            except (TypeError, ValueError):
+                rate = 0.0
+            self.min_interval[topic] = 1.0 / rate if rate > 0 else 0.0
+        self._last_sent: Dict[str, float] = {}
+
+    @classmethod
+    def from_payload(cls, payload: Dict) -> "StudioSubscription":
+        topics = (payload or {}).get("topics", "all")
+        if topics == "all" or topics is None:
+            return cls()
+        if isinstance(topics, str):
+            topics = [t.strip() for t in topics.split(",")]
+        if isinstance(topics, dict):
+            return cls(topics)
+        return cls({t: None for t in topics})
+
+    @property
+    def topics(self) -> Set[str]:
+        return set(self.min_interval)
+
+    def due(self, topic: str, now: Optional[float] = None) -> bool:
+        """True if the studio follows `topic` and its rate limit allows a send now."""
+        interval = self.min_interval.get(topic)
+        if interval is None:
+            return False
+        if interval == 0.0:
+            return True
+        now = time.time() if now is None else now
+        return now - self._last_sent.get(topic, 0.0) >= interval
+
+    def mark_sent(self, topic: str, now: Optional[float] = None):
+        if self.min_interval.get(topic):
+            self._last_sent[topic] = time.time() if now is None else now
+
+    def describe(self) -> Dict[str, Optional[float]]:
+        return {t: (round(1.0 / i, 3) if i else None) for t, i in self.min_interval.items()}
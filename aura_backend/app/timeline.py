@@ -0,0 +1,122 @@
+import bisect
+import json
+import logging
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .orchestrator import EMOTIONS, label_to_vector
+
+logger = logging.getLogger(__name__)
+
+# Timestamped emotion timelines are JSON Lines, one entry per line:
+#   {"t": 12.5, "vector": {"tension": 0.2, ...}}
+# or, as written by the sensors' offline modes,
+#   {"t": 12.5, "emotion": "happy", "confidence": 0.8}
+# `t` is seconds from the start of the session / media file.
+
+
+SESSION_GAP_SECONDS = 1.0  # between the end of a recorded session and the next one appended to the file
+
+
+def _last_time(path: str, tail_bytes: int = 65536) -> Optional[float]:
+    """`t` of the last complete entry in an existing timeline file, None if there is none."""
+    try:
+        with open(path, "rb") as fh:
+            fh.seek(0, 2)
+            fh.seek(max(0, fh.tell() - tail_bytes))
+            lines = fh.read().splitlines()
+    except FileNotFoundError:
+        return None
+    if lines and not lines[-1].endswith(b"}"):
+        lines.pop()  # cut short by a crash mid-write
+    for line in reversed(lines):
+        try:
+            return float(json.loads(line)["t"])
+        except (ValueError, KeyError, TypeError):
+            continue  # blank or not an entry
+    return None
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as fh:
+        fh.seek(-1, 2)
+        return fh.read(1) == b"\n"
+
+
+class TimelineWriter:
+    """Append-only JSONL recorder for live sessions (fused vector per tick).
+
+    A session appended to an existing file continues its time axis (after
+    SESSION_GAP_SECONDS) instead of restarting at 0, so the loaders, which sort by `t`,
+    replay the sessions one after another rather than interleaved.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        last = _last_time(path)
+        self._offset = 0.0 if last is None else last + SESSION_GAP_SECONDS
+        self._fh = open(path, "a", encoding="utf-8")
+        if self._fh.tell() and not _ends_with_newline(path):
+            self._fh.write("\n")  # don't glue the first entry onto a line cut short by a crash
+        self._t0: Optional[float] = None
+
+    def write(self, vector: Dict[str, float], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        if self._t0 is None:
+            self._t0 = now
+        entry = {"t": round(self._offset + now - self._t0, 4), "vector": {k: round(v, 5) for k, v in vector.items()}}
+        self._fh.write(json.dumps(entry) + "\n")
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+def iter_timeline(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as fh:
+        for number, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # e.g. the last line of a session that crashed mid-write
+                logger.warning(f"{path}:{number}: skipping malformed timeline entry")
+
+
+def load_vector_timeline(path: str) -> List[Tuple[float, Dict[str, float]]]:
+    """Load a timeline of fused vectors, sorted by time. Entries without a vector are skipped."""
+    entries = [(float(e["t"]), e["vector"]) for e in iter_timeline(path) if isinstance(e.get("vector"), dict)]
+    entries.sort(key=lambda e: e[0])
+    return entries
+
+
+def load_timeline(path: str) -> List[Tuple[float, Dict[str, float]]]:
+    """Load either kind of entry as (t, vector), sorted by time.
+
+    Label entries are mapped to vectors the same way live sensor payloads are.
+    """
+    entries = []
+    for e in iter_timeline(path):
+        if isinstance(e.get("vector"), dict):
+            entries.append((float(e["t"]), {k: float(e["vector"].get(k, 0.0)) for k in EMOTIONS}))
+        elif "emotion" in e:
+            entries.append((float(e["t"]), label_to_vector(str(e["emotion"]), float(e.get("confidence", 1.0)))))
+    entries.sort(key=lambda e: e[0])
+    return entries
+
+
+def vector_at(timeline: Sequence[Tuple[float, Dict[str, float]]], t: float,
+              times: Optional[List[float]] = None) -> Dict[str, float]:
+    """Linearly interpolated vector at time t (held constant before the first / after the last entry)."""
+    if not timeline:
+        return {k: 0.0 for k in EMOTIONS}
+    times = times if times is not None else [e[0] for e in timeline]
+    i = bisect.bisect_right(times, t)
+    if i == 0:
+        return dict(timeline[0][1])
+    if i >= len(timeline):
+        return dict(timeline[-1][1])
+    (t0, v0), (t1, v1) = timeline[i - 1], timeline[i]
+    f = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+    return {k: v0.get(k, 0.0) + (v1.get(k, 0.0) - v0.get(k, 0.0)) * f for k in EMOTIONS}
@@ -0,0 +1,173 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Descriptor names stored per track (cached next to the PCM cache, see DnaLibrary.features)
+FEATURE_KEYS = ("rms_db", "centroid_hz", "onset_rate", "tempo_bpm", "low_ratio")
+
+
+def analyze_pcm(samples: np.ndarray, sample_rate: int, frame_size: int = 2048,
+                max_frames: int = 4000) -> Dict[str, float]:
+    """Compute coarse energy / brightness descriptors for a (frames, channels) float32 track.
+
+    Frames are spread evenly over the whole track (at most `max_frames` of them) so long
+    tracks cost the same as short ones. Runs once per track; results are cached on disk.
+    """
+    mono = samples.mean(axis=1) if samples.ndim == 2 else np.asarray(samples)
+    n = mono.shape[0]
+    if n < frame_size:
+        mono = np.pad(np.asarray(mono, dtype=np.float32), (0, frame_size - n))
+        n = frame_size
+    hop = max(frame_size // 2, (n - frame_size) // max_frames + 1)
+    starts = np.arange(0, n - frame_size + 1, hop)
+    frames = np.stack([mono[s:s + frame_size] for s in starts]).astype(np.float32)
+
+    rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+    rms_db = float(20 * np.log10(np.mean(rms) + 1e-12))
+
+    spec = np.abs(np.fft.rfft(frames * np.hanning(frame_size).astype(np.float32), axis=1))
+    freqs = np.fft.rfftfreq(frame_size, 1.0 / sample_rate)
+    power = spec.sum(axis=1) + 1e-12
+    centroid = float(np.mean((spec * freqs).sum(axis=1) / power))
+    low_ratio = float(np.mean(spec[:, freqs < 200].sum(axis=1) / power))
+
+    # Spectral flux onset envelope -> onset rate and a rough tempo (only meaningful for contiguous frames)
+    flux = np.maximum(0.0, np.diff(np.log1p(spec), axis=0)).sum(axis=1)
+    frame_rate = sample_rate / float(hop)
+    onset_rate, tempo = 0.0, 0.0
+    if flux.size > 3:
+        threshold = flux.mean() + flux.std()
+        peaks = (flux[1:-1] > flux[:-2]) & (flux[1:-1] >= flux[2:]) & (flux[1:-1] > threshold)
+        onset_rate = float(peaks.sum() / (flux.size / frame_rate))
+        env = flux - flux.mean()
+        ac = np.correlate(env, env, mode="full")[env.size - 1:]
+        lags = np.arange(ac.size)
+        bpm = np.where(lags > 0, 60.0 * frame_rate / np.maximum(lags, 1), 0.0)
+        valid = (bpm >= 60) & (bpm <= 180)
+        if valid.any():
+            tempo = float(bpm[valid][np.argmax(ac[valid])])
+    return {
+        "rms_db": round(rms_db, 3),
+        "centroid_hz": round(centroid, 1),
+        "onset_rate": round(onset_rate, 3),
+        "tempo_bpm": round(tempo, 2),
+        "low_ratio": round(low_ratio, 4),
+    }
+
+
+def features_to_energy_valence(features: Dict[str, float]) -> Tuple[float, float]:
+    """Place a track in the same (energy, valence) space AudioModulator derives from emotions."""
+    loudness = np.clip((features["rms_db"] + 40.0) / 30.0, 0.0, 1.0)       # -40 dBFS .. -10 dBFS
+    density = np.clip(features["onset_rate"] / 6.0, 0.0, 1.0)              # onsets per second
+    pace = np.clip((features["tempo_bpm"] - 70.0) / 90.0, 0.0, 1.0) if features["tempo_bpm"] else 0.5
+    energy = 0.5 * loudness + 0.3 * density + 0.2 * pace
+    brightness = np.clip((features["centroid_hz"] - 500.0) / 3500.0, 0.0, 1.0)
+    valence = 0.7 * brightness + 0.3 * (1.0 - np.clip(features["low_ratio"] * 2.0, 0.0, 1.0))
+    return float(energy), float(valence)
+
+
+def spread_coords(coords: np.ndarray) -> np.ndarray:
+    """Rescale each (energy, valence) axis to span 0-1 across a library (flat axes -> 0.5)."""
+    coords = np.asarray(coords, dtype=np.float32)
+    if coords.shape[0] < 2:
+        return coords
+    lo, hi = coords.min(axis=0), coords.max(axis=0)
+    span = hi - lo
+    return np.where(span > 1e-6, (coords - lo) / np.where(span > 1e-6, span, 1.0), 0.5).astype(np.float32)
+
+
+class TrackIndex:
+    """Library tracks as points in (energy, valence) space; nearest-track lookups are one argmin."""
+    def __init__(self, names: List[str], coords: np.ndarray):
+        self.names = names
+        self.coords = np.asarray(coords, dtype=np.float32).reshape(-1, 2)
+
+    @classmethod
+    def from_features(cls, features: Dict[str, Dict[str, float]], spread: bool = True) -> "TrackIndex":
+        """Build from per-track descriptors. With `spread`, each axis is rescaled to span 0-1
+        across the library so even a stylistically narrow library covers the emotion space."""
+        names = sorted(features)
+        coords = np.array([features_to_energy_valence(features[n]) for n in names], dtype=np.float32).reshape(-1, 2)
+        return cls(names, spread_coords(coords) if spread else coords)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def distances(self, energy: float, valence: float) -> np.ndarray:
+        return np.sqrt(((self.coords - np.array([energy, valence], dtype=np.float32)) ** 2).sum(axis=1))
+
+    def nearest(self, energy: float, valence: float) -> Tuple[Optional[str], float]:
+        if not self.names:
+            return None, float("inf")
+        d = self.distances(energy, valence)
+        i = int(np.argmin(d))
+        return self.names[i], float(d[i])
+
+    def distance_to(self, name: Optional[str], energy: float, valence: float) -> float:
+        if name not in self.names:
+            return float("inf")
+        e, v = self.coords[self.names.index(name)]
+        return float(np.hypot(e - energy, v - valence))
+
+
+class TrackSelector:
+    """Switching policy with hysteresis on top of a TrackIndex.
+
+    A switch is only proposed when the best track beats the current one by `margin`,
+    has stayed the best for `confirm_ticks` consecutive ticks, and the current track has
+    played for at least `min_dwell_seconds`. Each decision carries a crossfade hint whose
+    length grows with how far apart the two tracks are.
+    """
+    def __init__(self, margin: float = 0.08, confirm_ticks: int = 3, min_dwell_seconds: float = 12.0,
+                 min_crossfade_seconds: float = 2.0, max_crossfade_seconds: float = 6.0):
+        self.index = TrackIndex([], np.zeros((0, 2)))
+        self.enabled = True
+        self.margin = margin
+        self.confirm_ticks = confirm_ticks
+        self.min_dwell_seconds = min_dwell_seconds
+        self.min_crossfade_seconds = min_crossfade_seconds
+        self.max_crossfade_seconds = max_crossfade_seconds
+        self._candidate: Optional[str] = None
+        self._candidate_ticks = 0
+        self._current_since: float = 0.0
+        self._current: Optional[str] = None
+
+    def update(self, energy: float, valence: float, current: Optional[str],
+               now: Optional[float] = None) -> Dict:
+        now = time.time() if now is None else now
+        if current != self._current:
+            self._current, self._current_since = current, now
+        best, best_d = self.index.nearest(energy, valence)
+        current_d = self.index.distance_to(current, energy, valence)
+        decision = {
+            "auto": self.enabled,
+            "recommended_track": best,
+            "distance_best": round(best_d, 4) if best else None,
+            "distance_current": round(current_d, 4) if current_d != float("inf") else None,
+            "switch": False,
+        }
+        if not self.enabled or best is None or best == current:
+            self._candidate, self._candidate_ticks = None, 0
+            return decision
+        if best == self._candidate:
+            self._candidate_ticks += 1
+        else:
+            self._candidate, self._candidate_ticks = best, 1
+        clearly_better = current_d - best_d >= self.margin
+        settled = current is None or now - self._current_since >= self.min_dwell_seconds
+        if current is None or (clearly_better and settled and self._candidate_ticks >= self.confirm_ticks):
+            # Crossfade length scales with how far apart the two tracks sit (unknown current -> longest)
+            gap = self.index.distance_to(current, *self.index.coords[self.index.names.index(best)])
+            gap = 1.0 if gap == float("inf") else min(1.0, gap)
+            duration = self.min_crossfade_seconds + (self.max_crossfade_seconds - self.min_crossfade_seconds) * gap
+            decision["switch"] = True
+            decision["crossfade"] = {
+                "from_track": current,
+                "to_track": best,
+                "duration_ms": int(duration * 1000),
+                "curve": "equal_power",
+                "align": "bar",
+            }
+            self._candidate, self._candidate_ticks = None, 0
+        return decision
@@ -0,0 +1,86 @@
+"""Speech capture cost: deque of Python floats vs the preallocated ring buffer.
+
+Replays what speech_emotion_sender does for each second of microphone audio: 43
+callbacks of 1024 float32 samples, then one 2 s analysis window taken from the buffer.
+Reports CPU milliseconds per second of audio for the callbacks and the window read, and
+the peak Python heap allocated while doing it.
+
+    python benchmarks/bench_audio_capture.py [--seconds 60]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sensor_modules"))
+
+from audio_ring import AudioRingBuffer  # noqa: E402
+
+SAMPLE_RATE = 44100
+WINDOW = 2 * SAMPLE_RATE
+BLOCK = 1024
+
+
+class DequeCapture:
+    """The previous implementation."""
+    def __init__(self):
+        self.buffer = deque(maxlen=WINDOW)
+
+    def callback(self, block):
+        self.buffer.extend(block)
+
+    def window(self):
+        return np.array(list(self.buffer))
+
+
+class RingCapture:
+    def __init__(self):
+        self.buffer = AudioRingBuffer(WINDOW + SAMPLE_RATE)
+
+    def callback(self, block):
+        self.buffer.write(block)
+
+    def window(self):
+        return self.buffer.latest(WINDOW)
+
+
+def run(capture, blocks, per_second):
+    callback_s = window_s = 0.0
+    tracemalloc.start()
+    for i, block in enumerate(blocks, 1):
+        start = time.process_time()
+        capture.callback(block)
+        callback_s += time.process_time() - start
+        if i % per_second == 0:
+            start = time.process_time()
+            window = capture.window()
+            window_s += time.process_time() - start
+            assert len(window) == min(WINDOW, i * BLOCK)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return callback_s, window_s, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=60)
+    args = parser.parse_args()
+
+    per_second = SAMPLE_RATE // BLOCK
+    rng = np.random.default_rng(0)
+    blocks = [rng.standard_normal(BLOCK).astype(np.float32) * 0.1 for _ in range(args.seconds * per_second)]
+
+    print(f"{args.seconds}s of audio, {BLOCK}-sample callbacks, {WINDOW}-sample window read once per second")
+    print(f"{'buffer':<10}{'callbacks ms/s':>16}{'window ms/s':>14}{'peak heap MB':>14}")
+    for name, capture in (("deque", DequeCapture()), ("ring", RingCapture())):
+        callback_s, window_s, peak = run(capture, blocks, per_second)
+        print(f"{name:<10}{callback_s * 1000 / args.seconds:>16.2f}{window_s * 1000 / args.seconds:>14.2f}"
+              f"{peak / 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
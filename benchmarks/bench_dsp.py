@@ -0,0 +1,139 @@
+"""Throughput benchmark for the DSP kernels in app/dsp.py.
+
+Streams stereo 44.1 kHz noise through each kernel in fixed-size blocks (parameters change
+every block, so ramping is included) and reports the realtime factor per core: seconds
+of audio processed per second of CPU time, with numpy/BLAS pinned to one thread.
+
+    python benchmarks/bench_dsp.py [--seconds 20] [--block 4096] [--target 50]
+
+Each kernel is also checked against a straightforward reference implementation.
+The default block matches offline rendering; small callback-sized blocks (<= 1024) trade
+throughput for latency, mostly in the reverb, whose partitions are 2048 frames.
+"""
+import os
+
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import argparse  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aura_backend"))
+
+from app import dsp  # noqa: E402
+
+SR = 44100
+
+
+def stream(kernel, x, block, params):
+    """Feed `x` through `kernel(block, i)` block by block; returns (output, cpu seconds)."""
+    out = []
+    start = time.process_time()
+    for i, s in enumerate(range(0, x.shape[0], block)):
+        out.append(kernel(x[s:s + block], params[i % len(params)]))
+    return np.concatenate(out), time.process_time() - start
+
+
+def reference_biquad(x, cutoff, q):
+    c = dsp.biquad_coefficients("lowpass", cutoff, q, SR)
+    try:
+        from scipy.signal import lfilter
+        return lfilter(c[:3], [1.0, c[3], c[4]], x.astype(np.float64), axis=0)
+    except ImportError:
+        y = np.zeros_like(x, dtype=np.float64)
+        s1 = s2 = np.zeros(x.shape[1])
+        for n in range(x.shape[0]):
+            y[n] = c[0] * x[n] + s1
+            s1, s2 = c[1] * x[n] - c[3] * y[n] + s2, c[2] * x[n] - c[4] * y[n]
+        return y
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--block", type=int, default=4096)
+    parser.add_argument("--target", type=float, default=50.0, help="realtime factor to flag")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    x = (rng.standard_normal((int(args.seconds * SR), 2)) * 0.25).astype(np.float32)
+    rng_params = np.random.default_rng(2)
+    cutoffs = 400 + 5000 * rng_params.random(64)
+    rows = []
+
+    # Biquad lowpass, cutoff/Q ramped to a new target every block
+    bq = dsp.Biquad(SR, 2, "lowpass", 1000.0, 0.8)
+
+    def biquad(block, p):
+        bq.set_params(cutoff_hz=p, q=0.7 + 0.6 * (p / 5400.0))
+        return bq.process(block)
+    _, cpu = stream(biquad, x, args.block, list(cutoffs))
+    fixed = dsp.Biquad(SR, 2, "lowpass", 1200.0, 1.1)
+    check, _ = stream(lambda b, p: fixed.process(b), x[:SR * 2], args.block, [None])
+    rows.append(("biquad lowpass (ramped)", cpu, np.abs(check - reference_biquad(x[:SR * 2], 1200.0, 1.1)).max()))
+
+    # Reverb send: 1.8 s IR, partitioned convolution + ramped wet mix
+    rv = dsp.Reverb(SR, 2, seconds=1.8)
+    _, cpu = stream(lambda b, p: rv.process(b, p), x, args.block, list(0.05 + 0.8 * rng_params.random(64)))
+    ir = dsp.synthetic_ir(SR, 1.8, 2)
+    conv = dsp.PartitionedConvolver(ir)
+    short = x[:SR]
+    wet, _ = stream(lambda b, p: conv.process(b), short, args.block, [None])
+    ref = np.stack([np.convolve(short[:, c], ir[:, c])[:short.shape[0]] for c in range(2)], axis=1)
+    rows.append(("convolution reverb 1.8 s", cpu, np.abs(wet - ref).max()))
+
+    # Saturation with the drive ramped between blocks
+    drives = list(rng_params.random(64))
+    state = {"prev": 0.0}
+
+    def saturation(block, p):
+        y = dsp.saturate(block, p, state["prev"])
+        state["prev"] = p
+        return y
+    _, cpu = stream(saturation, x, args.block, drives)
+    rows.append(("tanh saturation (ramped)", cpu, np.abs(dsp.saturate(short, 0.5) - np.tanh(5.5 * short) / np.tanh(5.5)).max()))
+
+    # Tempo-synced 1/8 feedback delay, tempo drifting every block
+    dl = dsp.TempoDelay(SR, 2, "1/8", 120.0)
+
+    def delay(block, p):
+        dl.set_time(p, "1/8")
+        return dl.process(block, feedback=0.45, mix=0.35)
+    _, cpu = stream(delay, x, args.block, list(100 + 40 * rng_params.random(64)))
+    fixed_dl = dsp.TempoDelay(SR, 2, "1/8", 120.0)
+    fixed_dl.mix = 0.35
+    got, _ = stream(lambda b, p: fixed_dl.process(b, feedback=0.45), short, args.block, [None])
+    D, line = fixed_dl.delay_frames, np.zeros((short.shape[0] + fixed_dl.delay_frames, 2))
+    for n in range(short.shape[0]):
+        line[n + D] = short[n] + 0.45 * line[n]
+    rows.append(("tempo delay 1/8 feedback", cpu, np.abs(got - (short + 0.35 * line[:short.shape[0]])).max()))
+
+    # Phase-vocoder time-stretch (whole buffer at once, as used offline)
+    start = time.process_time()
+    for rate in (0.85, 1.2):
+        dsp.time_stretch(x, rate)
+    cpu = (time.process_time() - start) / 2.0
+    t = np.arange(SR * 2) / SR
+    tone = np.stack([0.5 * np.sin(2 * np.pi * 440 * t)] * 2, axis=1)
+    stretched = dsp.time_stretch(tone, 1.25)
+    spectrum = np.abs(np.fft.rfft(stretched[:, 0] * np.hanning(stretched.shape[0])))
+    pitch = np.fft.rfftfreq(stretched.shape[0], 1.0 / SR)[spectrum.argmax()]
+    rows.append(("phase-vocoder time-stretch", cpu, abs(pitch - 440.0)))
+
+    print(f"{args.seconds:.0f} s stereo @ {SR} Hz, block {args.block} frames, 1 thread")
+    print(f"{'kernel':<30}{'cpu s':>9}{'x realtime':>12}{'check':>12}")
+    failed = False
+    for name, cpu, err in rows:
+        rtf = args.seconds / max(cpu, 1e-9)
+        flag = "" if rtf >= args.target else "  < target"
+        failed |= rtf < args.target
+        print(f"{name:<30}{cpu:>9.3f}{rtf:>12.1f}{err:>12.2e}{flag}")
+    print("check: max abs error vs reference (time-stretch: 440 Hz tone pitch error in Hz)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Accuracy / lead-time benchmark for the emotion trajectory predictor.
+
+Replays recorded sessions (JSONL written with AURA_SESSION_RECORD_PATH set on the backend)
+through EmotionPredictor and compares its forecasts with what actually happened
+`horizon` seconds later, against a naive "hold the current vector" baseline.
+
+    python benchmarks/bench_predictor.py [session.jsonl ...] [--horizon 1.5]
+
+Without session files a synthetic session (ramped emotion changes + sensor noise) is used.
+"""
+import argparse
+import bisect
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aura_backend"))
+
+from app.orchestrator import EMOTIONS  # noqa: E402
+from app.predictor import EmotionPredictor  # noqa: E402
+from app.timeline import load_vector_timeline  # noqa: E402
+
+
+def synthetic_session(seconds=600.0, tick=0.5, seed=7):
+    rng = random.Random(seed)
+    timeline, t = [], 0.0
+    current = {k: 0.0 for k in EMOTIONS}
+    current["calm"] = 0.8
+    while t < seconds:
+        target = {k: 0.0 for k in EMOTIONS}
+        target[rng.choice(EMOTIONS)] = rng.uniform(0.5, 1.0)
+        ramp, hold = rng.uniform(2.0, 8.0), rng.uniform(3.0, 15.0)
+        start = dict(current)
+        steps = int(ramp / tick)
+        for i in range(1, steps + int(hold / tick) + 1):
+            f = min(1.0, i / steps)
+            current = {k: start[k] + (target[k] - start[k]) * f for k in EMOTIONS}
+            noisy = {k: max(0.0, min(1.0, v + rng.gauss(0, 0.03))) for k, v in current.items()}
+            timeline.append((t, noisy))
+            t += tick
+    return timeline
+
+
+def value_at(times, timeline, t):
+    """Linearly interpolated vector at time t (None past the end)."""
+    i = bisect.bisect_left(times, t)
+    if i >= len(times):
+        return None
+    if times[i] == t or i == 0:
+        return timeline[i][1]
+    (t0, v0), (t1, v1) = timeline[i - 1], timeline[i]
+    f = (t - t0) / (t1 - t0)
+    return {k: v0.get(k, 0.0) + (v1.get(k, 0.0) - v0.get(k, 0.0)) * f for k in EMOTIONS}
+
+
+def primary(v):
+    return max(EMOTIONS, key=lambda k: v.get(k, 0.0))
+
+
+def evaluate(timeline, horizon):
+    times = [t for t, _ in timeline]
+    predictor = EmotionPredictor(horizon=horizon)
+    err_pred, err_hold, forecast_primary = [], [], []
+    start = time.perf_counter()
+    for t, vector in timeline:
+        predictor.update(vector, t)
+        forecast = predictor.forecast()
+        forecast_primary.append(primary(forecast))
+        future = value_at(times, timeline, t + horizon)
+        if future is None:
+            continue
+        err_pred.append(sum(abs(forecast[k] - future.get(k, 0.0)) for k in EMOTIONS) / len(EMOTIONS))
+        err_hold.append(sum(abs(vector.get(k, 0.0) - future.get(k, 0.0)) for k in EMOTIONS) / len(EMOTIONS))
+    per_tick_us = (time.perf_counter() - start) / max(1, len(timeline)) * 1e6
+
+    # Lead time: how long before the actual primary emotion switches does the forecast already show it
+    leads = []
+    actual_primary = [primary(v) for _, v in timeline]
+    for i in range(1, len(timeline)):
+        if actual_primary[i] == actual_primary[i - 1]:
+            continue
+        j = i
+        while j > 0 and forecast_primary[j - 1] == actual_primary[i] and actual_primary[j - 1] != actual_primary[i]:
+            j -= 1
+        leads.append(times[i] - times[j])
+    return {
+        "ticks": len(timeline),
+        "mae_forecast": statistics.mean(err_pred) if err_pred else float("nan"),
+        "mae_hold": statistics.mean(err_hold) if err_hold else float("nan"),
+        "transitions": len(leads),
+        "mean_lead_s": statistics.mean(leads) if leads else 0.0,
+        "median_lead_s": statistics.median(leads) if leads else 0.0,
+        "per_tick_us": per_tick_us,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sessions", nargs="*", help="recorded session JSONL files")
+    parser.add_argument("--horizon", type=float, default=1.5)
+    args = parser.parse_args()
+
+    sessions = [(p, load_vector_timeline(p)) for p in args.sessions] or [("synthetic", synthetic_session())]
+    print(f"{'session':<24}{'ticks':>7}{'MAE pred':>10}{'MAE hold':>10}{'trans':>7}{'lead mean':>11}{'lead med':>10}{'us/tick':>9}")
+    for name, timeline in sessions:
+        r = evaluate(timeline, args.horizon)
+        print(f"{os.path.basename(name)[:23]:<24}{r['ticks']:>7}{r['mae_forecast']:>10.4f}{r['mae_hold']:>10.4f}"
+              f"{r['transitions']:>7}{r['mean_lead_s']:>10.2f}s{r['median_lead_s']:>9.2f}s{r['per_tick_us']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Speech features per analysis window: librosa one-shot vs the streaming extractor.
+
+Slides the speech sender's 2 s window over a recording one second at a time (starts on
+the 512-sample hop grid, as the sender does) and reports CPU milliseconds per window for
+`extract_feature_from_array` and `StreamingFeatureExtractor`, the largest relative
+difference between their 180 features and whether the speech model predicts the same
+label from both.
+
+    python benchmarks/bench_speech_features.py [recording.wav]
+
+The first window of each is run once before timing (librosa/numba warm-up).
+"""
+import argparse
+import os
+import pickle
+import statistics
+import sys
+import time
+import warnings
+
+import numpy as np
+import soundfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "sensor_modules"))
+
+from speech_features import HOP_LENGTH, StreamingFeatureExtractor, extract_feature_from_array  # noqa: E402
+
+MODEL_PATH = os.path.join(ROOT, "aura_backend", "emotion_models", "emotion_recognition_model.pkl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", nargs="?", default=os.path.join(ROOT, "aura_backend", "music_dna_store", "calm_sample.wav"))
+    args = parser.parse_args()
+
+    audio, sr = soundfile.read(args.recording, dtype="float32")
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    window = 2 * sr
+    starts = [(end - window) // HOP_LENGTH * HOP_LENGTH for end in range(window, len(audio) + 1, sr)]
+    if len(starts) < 2:
+        sys.exit("Recording is too short (need at least 3 s)")
+    model = None
+    if os.path.exists(MODEL_PATH):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            with open(MODEL_PATH, "rb") as f:
+                model = pickle.load(f)
+
+    extractor = StreamingFeatureExtractor(sr)
+    extract_feature_from_array(audio[starts[0]:starts[0] + window], sr)  # warm-up
+    ref_ms, new_ms, errors, same = [], [], [], 0
+    for i, start in enumerate(starts):
+        chunk = audio[start:start + window]
+        t = time.process_time()
+        ref = extract_feature_from_array(chunk, sr)
+        ref_ms.append((time.process_time() - t) * 1000.0)
+        t = time.process_time()
+        new = extractor.features(chunk, start)
+        new_ms.append((time.process_time() - t) * 1000.0)
+        errors.append(float(np.max(np.abs(ref - new) / (np.abs(ref) + 1e-3))))
+        if model is not None:
+            same += model.predict([ref])[0] == model.predict([new])[0]
+
+    print(f"{len(starts)} windows of {window} samples at {sr} Hz, 1 s apart")
+    print(f"{'extractor':<22}{'mean ms':>10}{'median':>10}")
+    print(f"{'librosa one-shot':<22}{statistics.mean(ref_ms):>10.1f}{statistics.median(ref_ms):>10.1f}")
+    # the first streaming window has nothing cached yet
+    print(f"{'streaming':<22}{statistics.mean(new_ms[1:]):>10.1f}{statistics.median(new_ms[1:]):>10.1f}"
+          f"   (first window {new_ms[0]:.1f})")
+    print(f"speed-up: {statistics.mean(ref_ms[1:]) / max(statistics.mean(new_ms[1:]), 1e-9):.1f}x; "
+          f"STFT frames computed {extractor.frames_computed}, reused {extractor.frames_reused}")
+    print(f"max relative feature difference: {max(errors):.1e}")
+    if model is not None:
+        print(f"same predicted label: {same}/{len(starts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Speech model: pickled scikit-learn estimator vs the NumPy-only .npz path.
+
+Reports, for each way of loading the model:
+  * cold load time in a fresh interpreter (imports + reading the model file)
+  * latency of one predict_proba call on a single feature vector (what the speech
+    worker does per analysis window)
+and checks that both give the same labels and probabilities.
+
+    python sensor_modules/speech_model.py aura_backend/emotion_models/emotion_recognition_model.pkl
+    python benchmarks/bench_speech_model.py [--calls 2000]
+"""
+import argparse
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SENSORS = os.path.join(ROOT, "sensor_modules")
+sys.path.insert(0, SENSORS)
+
+from speech_model import NumpyMLP, check_parity  # noqa: E402
+
+PICKLE = os.path.join(ROOT, "aura_backend", "emotion_models", "emotion_recognition_model.pkl")
+NPZ = os.path.splitext(PICKLE)[0] + ".npz"
+
+LOADERS = {
+    "pickle (sklearn)": f"import pickle\nwith open({PICKLE!r}, 'rb') as f: m = pickle.load(f)",
+    "npz (numpy)": f"import sys; sys.path.insert(0, {SENSORS!r})\n"
+                   f"from speech_model import NumpyMLP\nm = NumpyMLP.load({NPZ!r})",
+}
+
+
+def cold_load_seconds(code, runs=3):
+    """Median wall time of `code` in a fresh interpreter, numpy import excluded."""
+    timer = ("import time, numpy, warnings; warnings.simplefilter('ignore'); t = time.perf_counter()\n"
+             f"{code}\nprint(time.perf_counter() - t)")
+    return statistics.median(float(subprocess.check_output([sys.executable, "-c", timer])) for _ in range(runs))
+
+
+def latency_us(model, X):
+    times = []
+    for x in X:
+        start = time.perf_counter()
+        model.predict_proba([x])
+        times.append((time.perf_counter() - start) * 1e6)
+    return statistics.mean(times), statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    if not os.path.exists(NPZ):
+        sys.exit(f"{NPZ} not found; run sensor_modules/speech_model.py first")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with open(PICKLE, "rb") as f:
+            estimator = pickle.load(f)
+    model = NumpyMLP.load(NPZ)
+    X = np.random.default_rng(0).normal(0.0, 50.0, size=(args.calls, model.coefs[0].shape[0]))
+
+    print(f"{'model':<20}{'cold load ms':>14}{'predict_proba us':>18}{'median':>10}")
+    for name, m in (("pickle (sklearn)", estimator), ("npz (numpy)", model)):
+        mean_us, median_us = latency_us(m, X)
+        print(f"{name:<20}{cold_load_seconds(LOADERS[name]) * 1000:>14.0f}{mean_us:>18.1f}{median_us:>10.1f}")
+    print(f"parity on 1000 random inputs: same labels, max probability difference "
+          f"{check_parity(estimator, model):.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Cold-start benchmark for the AURA backend.
+
+Starts the real server (uvicorn app.main:app) in a fresh interpreter, several times, and
+measures from process launch to:
+
+    import      `import app.main` in a separate fresh interpreter (no server)
+    health      first 200 from /health (liveness)
+    aura_update first `aura_update` received by a studio connected to /ws/studio
+    ready       first 200 from /ready (last-active DNA loaded and playing)
+
+    python benchmarks/bench_startup.py [--runs 5] [--track calm_sample.wav]
+
+--track remembers that track as last-active before the runs, so every start has to
+preload it (this changes which track the backend resumes with). The first run after a
+cache wipe also pays for decoding; later runs measure a warm PCM cache, like a restarted
+container with a persistent volume.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aura_backend")
+sys.path.insert(0, BACKEND_DIR)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1.0) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def time_import() -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def time_server(timeout: float = 30.0) -> dict:
+    from websockets.sync.client import connect
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=BACKEND_DIR)
+    marks = {}
+    try:
+        while "health" not in marks:
+            if time.perf_counter() - start > timeout or proc.poll() is not None:
+                raise RuntimeError("server did not come up")
+            if get_status(base + "/health") == 200:
+                marks["health"] = time.perf_counter() - start
+            else:
+                time.sleep(0.005)
+        with connect(f"ws://127.0.0.1:{port}/ws/studio", open_timeout=timeout) as ws:
+            while "aura_update" not in marks:
+                if json.loads(ws.recv(timeout=timeout)).get("type") == "aura_update":
+                    marks["aura_update"] = time.perf_counter() - start
+        while "ready" not in marks:
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError("server never became ready")
+            if get_status(base + "/ready") == 200:
+                marks["ready"] = time.perf_counter() - start
+            else:
+                time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--track", help="remember this music_dna_store track as last-active first")
+    args = parser.parse_args()
+
+    if args.track:
+        from app.dna_library import DnaLibrary
+        DnaLibrary(os.path.join(BACKEND_DIR, "music_dna_store")).remember_active(args.track)
+
+    results = {"import": [], "health": [], "aura_update": [], "ready": []}
+    for i in range(args.runs):
+        results["import"].append(time_import())
+        for key, value in time_server().items():
+            results[key].append(value)
+        print(f"run {i + 1}: " + "  ".join(f"{k} {v[-1] * 1000:.0f} ms" for k, v in results.items()))
+
+    print(f"\n{'milestone':<14}{'median ms':>11}{'max ms':>10}")
+    for key, values in results.items():
+        print(f"{key:<14}{statistics.median(values) * 1000:>11.0f}{max(values) * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
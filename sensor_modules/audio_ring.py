@@ -0,0 +1,62 @@
+import threading
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Preallocated ring of audio samples that hands out windows as contiguous views.
+
+    Storage holds every sample twice (at i and i + capacity), so the newest n samples are
+    always one contiguous slice: `latest(n)` is a view, not a copy. Writes from the audio
+    callback are at most three slice copies, with no per-sample Python objects.
+
+    A view stays valid until `capacity - n` more samples have been written; size the ring
+    as window + the time the reader may hold on to a window.
+    """
+    def __init__(self, capacity: int, dtype=np.float32):
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        self._pos = 0  # next write index, in [0, capacity)
+        self.written = 0  # samples ever written
+        self._lock = threading.Lock()
+
+    @property
+    def filled(self) -> int:
+        return min(self.written, self.capacity)
+
+    def write(self, samples: np.ndarray):
+        """Append samples (called from the audio thread)."""
+        n = len(samples)
+        if n == 0:
+            return
+        cap = self.capacity
+        with self._lock:
+            self.written += n
+            if n > cap:
+                samples, n = samples[-cap:], cap
+            pos = self._pos
+            data = self._data
+            data[pos:pos + n] = samples
+            if pos + n <= cap:
+                data[pos + cap:pos + cap + n] = samples
+            else:
+                k = cap - pos
+                data[pos + cap:] = samples[:k]
+                data[:n - k] = samples[k:]
+            self._pos = (pos + n) % cap
+
+    def latest(self, n: int) -> np.ndarray:
+        """View of the newest `n` samples (fewer if not that many were written yet); don't write to it."""
+        n = min(n, self.filled)
+        with self._lock:
+            end = self._pos + self.capacity
+        return self._data[end - n:end]
+
+    def window(self, start: int, n: int) -> np.ndarray:
+        """View of the `n` samples beginning at stream position `start` (samples since the first write)."""
+        with self._lock:
+            back = self.written - start
+            if start < 0 or n > back or back > self.capacity:
+                raise ValueError(f"samples [{start}, {start + n}) are not in the buffer")
+            end = self._pos + self.capacity - (back - n)
+        return self._data[end - n:end]
@@ -3,11 +3,14 @@ import asyncio
 import websockets
 import json
 import logging
-from deepface import DeepFace
 import time
 import base64
 from collections import deque
 import os
+import numpy as np
+from inference_worker import LatestFrameWorker
+from face_tracking import FaceTracker, scale_box
+from stream_control import StreamController, StreamSettings
 logging.basicConfig(level=logging.INFO)
 
 # --- Configuration ---
@@ -15,11 +18,114 @@ SERVER_URI = "ws://localhost:8000/ws/sensors"
 # SERVER_URI = os.environ.get("AURA_BACKEND_WS_URL", "ws://localhost:8000/ws/sensors")
 FACE_CASCADE = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 FRAME_RATE = 8  # Target visual frame rate sent over WS
-ANALYZE_EVERY_N_FRAMES = 4  # Run DeepFace only every N frames to reduce CPU
+ANALYZE_EVERY_N_FRAMES = 4  # Offer a face crop to the DeepFace worker every N frames
+DETECT_EVERY_N_FRAMES = 8  # Full-frame Haar detection this often; faces are tracked in between
+MAX_FACES = 8  # Faces analyzed per step (largest first)
 STREAM_WIDTH = 320  # Width we will scale outgoing frame to for consistency
 JPEG_QUALITY = 70  # Trade-off clarity vs bandwidth
 CAMERA_INDICES = [0, 1, 2]  # Try multiple indices in case default isn't 0 (USB cams)
 
+# --- Adaptive stream control (see stream_control.py) ---
+# The values above are the best settings; under CPU or network pressure the controller
+# steps down towards these floors and climbs back once there is headroom again
+LATENCY_BUDGET_MS = 120  # websocket.send time above this counts as network pressure
+MIN_STREAM_WIDTH = 160
+MIN_JPEG_QUALITY = 35
+MIN_FRAME_RATE = 3
+MAX_ANALYZE_EVERY_N_FRAMES = 16
+
+# --- DeepFace worker (runs in its own process; see inference_worker.py) ---
+# Output order of DeepFace's facial-expression model
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+BATCH_RETRY_SECONDS = 30  # After a failed batch, faces go one by one this long before batching is tried again
+_emotion_model = None
+_batching_retry_at = 0.0  # time.time() from which batching may be used; inf once it can never work
+
+def _scores_result(scores):
+    dominant_emotion = max(scores, key=scores.get)
+    return {"emotion": dominant_emotion, "confidence": scores[dominant_emotion], "scores": scores}
+
+def _load_emotion_model():
+    global _emotion_model
+    if _emotion_model is None:
+        from deepface import DeepFace  # heavy (TensorFlow) import stays out of the capture process
+        try:
+            model = DeepFace.build_model(task="facial_attribute", model_name="Emotion")
+        except TypeError:  # DeepFace < 0.0.90
+            model = DeepFace.build_model("Emotion")
+        _emotion_model = getattr(model, "model", model)  # newer versions wrap the Keras model
+    return _emotion_model
+
+def analyze_emotion(roi_rgb):
+    """DeepFace emotion analysis of one face crop (the unbatched fallback)."""
+    from deepface import DeepFace
+    result = DeepFace.analyze(roi_rgb, actions=['emotion'], enforce_detection=False)
+    analysis = result[0] if isinstance(result, list) else result
+    em_map = analysis.get('emotion', {})
+    total = float(sum(em_map.values())) or 1.0
+    return _scores_result({k: float(v) / total for k, v in em_map.items()} or {"neutral": 0.0})
+
+def analyze_faces(faces):
+    """Emotion scores for [(face_id, roi_rgb), ...] with one model call for all faces.
+
+    Each tracked crop is resized straight to the emotion model's input (48x48 grayscale
+    in [0, 1]) and all crops go through the model as one batch, so the cost of a step
+    grows far slower than the face count. DeepFace.analyze instead re-detects the face
+    inside the crop and letterboxes it, so scores differ somewhat from analyze_emotion.
+
+    Runs inside the worker process only. If a batch fails, faces go through
+    DeepFace.analyze one by one for BATCH_RETRY_SECONDS before batching is tried again;
+    only a model that can't be called directly (unexpected DeepFace version) turns
+    batching off for good.
+    """
+    global _batching_retry_at
+    if not faces:
+        return []
+    if time.time() >= _batching_retry_at:
+        try:
+            model = _load_emotion_model()
+            predict = model.predict_on_batch
+        except (AttributeError, TypeError) as e:
+            _batching_retry_at = float("inf")
+            logging.warning("Emotion model can't be batched (%s); analyzing faces one by one", e)
+        except Exception as e:
+            _batching_retry_at = time.time() + BATCH_RETRY_SECONDS
+            logging.warning("Emotion model failed to load (%s); retrying in %ds", e, BATCH_RETRY_SECONDS)
+        else:
+            try:
+                batch = np.stack([cv2.resize(cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY), (48, 48))
+                                  for _, roi in faces]).astype(np.float32)[..., None] / 255.0
+                probs = np.asarray(predict(batch), dtype=np.float64)
+                probs /= np.maximum(probs.sum(axis=1, keepdims=True), 1e-9)
+                return [dict(id=face_id, **_scores_result(dict(zip(EMOTION_LABELS, map(float, p)))))
+                        for (face_id, _), p in zip(faces, probs)]
+            except Exception as e:
+                _batching_retry_at = time.time() + BATCH_RETRY_SECONDS
+                logging.warning("Batched emotion analysis failed (%s); analyzing faces one by one for %ds",
+                                e, BATCH_RETRY_SECONDS)
+    results = []
+    for face_id, roi in faces:
+        try:
+            results.append(dict(id=face_id, **analyze_emotion(roi)))
+        except Exception as e:
+            logging.warning("DeepFace analysis failed for face %s: %s", face_id, e)
+    return results
+
+def warm_up_deepface():
+    """Load the emotion model before the first real face arrives."""
+    analyze_faces([(0, np.zeros((48, 48, 3), dtype=np.uint8))])
+
+def aggregate_emotions(results):
+    """Room-level emotion: per-face score vectors averaged, then the dominant label."""
+    totals = {}
+    for r in results:
+        for label, score in r["scores"].items():
+            totals[label] = totals.get(label, 0.0) + score
+    if not totals:
+        return {"emotion": "neutral", "confidence": 0.0}
+    dominant_emotion = max(totals, key=totals.get)
+    return {"emotion": dominant_emotion, "confidence": totals[dominant_emotion] / len(results)}
+
 def open_camera():
     for idx in CAMERA_INDICES:
         cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
@@ -29,7 +135,7 @@ def open_camera():
         cap.release()
     return None
 
-async def face_emotion_sender():
+async def face_emotion_sender(worker: LatestFrameWorker):
     logging.info("Attempting to connect to AURA server at %s", SERVER_URI)
     try:
         async with websockets.connect(SERVER_URI) as websocket:
@@ -43,10 +149,24 @@ async def face_emotion_sender():
             await websocket.send(json.dumps({"source": "face", "payload": {"emotion": "neutral", "confidence": 0.0}}))
 
             frame_counter = 0
+            tracker = FaceTracker(FACE_CASCADE, detect_every=DETECT_EVERY_N_FRAMES, max_faces=MAX_FACES)
             last_emotion = {"emotion": "neutral", "confidence": 0.0}
-            last_box = None  # (x,y,w,h)
+            face_emotions = {}  # track id -> latest analysis of that face
+            last_faces = []  # [(id, (x,y,w,h))]
+            analysis_ms = None
             fps_times = deque(maxlen=30)
+            controller = StreamController(
+                StreamSettings(STREAM_WIDTH, JPEG_QUALITY, FRAME_RATE, ANALYZE_EVERY_N_FRAMES),
+                min_width=MIN_STREAM_WIDTH, max_width=STREAM_WIDTH,
+                min_quality=MIN_JPEG_QUALITY, max_quality=JPEG_QUALITY,
+                min_frame_rate=MIN_FRAME_RATE, max_frame_rate=FRAME_RATE,
+                min_analyze_every=ANALYZE_EVERY_N_FRAMES, max_analyze_every=MAX_ANALYZE_EVERY_N_FRAMES,
+                latency_budget_ms=LATENCY_BUDGET_MS)
+            settings = controller.settings
+            stream_width = settings.width
+            next_frame_at = time.time()
             while True:
+                cpu_start = time.process_time()
                 ret, frame = cap.read()
                 if not ret:
                     logging.warning("Can't receive frame (stream end?). Exiting ...")
@@ -61,77 +181,117 @@ async def face_emotion_sender():
 
                 # Resize frame to consistent width while keeping aspect
                 h, w = frame.shape[:2]
-                scale = STREAM_WIDTH / float(w)
-                resized = cv2.resize(frame, (STREAM_WIDTH, int(h * scale)))
+                if settings.width != stream_width:
+                    # Carry tracked faces (and their ids / per-face results) over to the new size
+                    factor = settings.width / float(stream_width)
+                    stream_width = settings.width
+                    tracker.rescale(factor, stream_width, int(h * stream_width / float(w)))
+                    last_faces = [(face_id, scale_box(box, factor)) for face_id, box in last_faces]
+                scale = stream_width / float(w)
+                resized = cv2.resize(frame, (stream_width, int(h * scale)))
                 gray_resized = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+                cpu_capture = time.process_time()
 
-                # Detect faces on resized frame
-                faces = FACE_CASCADE.detectMultiScale(gray_resized, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+                # Detect (periodically) and track (every frame) faces on the resized frame
+                tracker.update(gray_resized)
+                tracked = tracker.tracked()
+                cpu_track = time.process_time()
 
-                # Only run heavy DeepFace every N frames if a face exists
-                run_analysis = (frame_counter % ANALYZE_EVERY_N_FRAMES == 0) and len(faces) > 0
-                dominant_emotion = last_emotion["emotion"]
-                confidence = last_emotion["confidence"]
+                # Merge the newest finished analysis; it may belong to a frame a few ticks back
+                done = worker.poll()
+                if done is not None:
+                    if done["error"]:
+                        logging.warning("DeepFace analysis failed: %s", done["error"])
+                    elif done["result"] is not None:
+                        for face_result in done["result"]:
+                            face_emotions[face_result["id"]] = face_result
+                        analysis_ms = done["inference_ms"]
+                        controller.record_inference(analysis_ms)
 
-                if len(faces) > 0:
-                    (x, y, w_box, h_box) = faces[0]
-                    last_box = (x, y, w_box, h_box)
-                    if run_analysis:
-                        # Extract ROI from resized (convert BGR->RGB for DeepFace)
-                        roi_bgr = resized[y:y+h_box, x:x+w_box]
-                        roi_rgb = cv2.cvtColor(roi_bgr, cv2.COLOR_BGR2RGB)
-                        try:
-                            result = DeepFace.analyze(roi_rgb, actions=['emotion'], enforce_detection=False)
-                            analysis = result[0] if isinstance(result, list) else result
-                            dominant_emotion = analysis.get('dominant_emotion', 'neutral')
-                            em_map = analysis.get('emotion', {})
-                            if dominant_emotion in em_map:
-                                confidence = float(em_map[dominant_emotion]) / 100.0
-                            else:
-                                confidence = 0.0
-                            last_emotion = {"emotion": dominant_emotion, "confidence": confidence}
-                        except Exception as e:
-                            logging.warning("DeepFace analysis failed: %s", e)
+                if tracked:
+                    last_faces = tracked
+                    live_ids = {face_id for face_id, _ in tracked}
+                    # Forget faces that are no longer followed
+                    face_emotions = {k: v for k, v in face_emotions.items() if k in live_ids}
+                    if face_emotions:
+                        last_emotion = aggregate_emotions(list(face_emotions.values()))
+                    if frame_counter % settings.analyze_every == 0:
+                        # Every face's ROI (BGR->RGB for DeepFace) goes to the worker as one batch; an
+                        # older batch it has not started on yet is replaced, so analysis never lags
+                        worker.submit([(face_id, cv2.cvtColor(resized[y:y+bh, x:x+bw], cv2.COLOR_BGR2RGB))
+                                       for face_id, (x, y, bw, bh) in tracked])
                 else:
-                    # No face this frame; keep last box a few frames then clear
-                    if frame_counter % (ANALYZE_EVERY_N_FRAMES * 3) == 0:
-                        last_box = None
+                    # No face this frame; keep last boxes a few frames then clear
+                    if frame_counter % (settings.analyze_every * 3) == 0:
+                        last_faces = []
+                dominant_emotion = last_emotion["emotion"]
+                confidence = last_emotion["confidence"]
 
-                # Draw bounding box + label if we have one
-                if last_box:
-                    (bx, by, bw, bh) = last_box
+                cpu_encode = time.process_time()
+                # Draw bounding boxes + per-face labels if we have any
+                for face_id, (bx, by, bw, bh) in last_faces:
                     cv2.rectangle(resized, (bx, by), (bx+bw, by+bh), (120, 0, 255), 2)
-                    label = f"{dominant_emotion}:{confidence*100:.1f}%"
+                    face_result = face_emotions.get(face_id)
+                    label = f"#{face_id} {face_result['emotion']}:{face_result['confidence']*100:.1f}%" if face_result else f"#{face_id}"
                     cv2.putText(resized, label, (bx, max(0, by-8)), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255,255,255), 1, cv2.LINE_AA)
-                else:
+                if not last_faces:
                     cv2.putText(resized, "NO FACE", (8, 16), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,255), 1, cv2.LINE_AA)
 
                 # Overlay FPS small
                 cv2.putText(resized, f"FPS:{fps:.1f}", (8, resized.shape[0]-8), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200,200,200), 1, cv2.LINE_AA)
 
                 # Encode full frame
-                success, buf = cv2.imencode('.jpg', resized, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])
+                success, buf = cv2.imencode('.jpg', resized, [int(cv2.IMWRITE_JPEG_QUALITY), settings.jpeg_quality])
                 frame_b64 = base64.b64encode(buf.tobytes()).decode('utf-8') if success else None
 
                 payload = {
                     "source": "face",
+                    # Aggregate over every tracked face (what the backend fuses)
                     "payload": {
                         "emotion": dominant_emotion,
                         "confidence": round(confidence, 4)
                     },
+                    # Per-face breakdown; ids stay stable while a face is tracked
+                    "faces": [{
+                        "id": face_id,
+                        "box": [int(v) for v in box],
+                        "emotion": face_emotions[face_id]["emotion"] if face_id in face_emotions else None,
+                        "confidence": round(face_emotions[face_id]["confidence"], 4) if face_id in face_emotions else None
+                    } for face_id, box in tracked],
                     "frame": frame_b64,
                     "meta": {
                         "width": resized.shape[1],
                         "height": resized.shape[0],
-                        "fps": round(fps, 2)
+                        "fps": round(fps, 2),
+                        "analysis_ms": analysis_ms,
+                        "face_count": len(tracked),
+                        "stream": controller.describe()
                     }
                 }
+                message = json.dumps(payload)
+                cpu_done = time.process_time()
 
-                await websocket.send(json.dumps(payload))
+                send_start = time.time()
+                await websocket.send(message)
+                send_ms = (time.time() - send_start) * 1000.0
                 logging.debug(f"Sent face frame + emotion: {payload['payload']}")
+                # Bytes the transport has not written yet: grows when the link can't keep up
+                transport = getattr(websocket, "transport", None)
+                backlog = transport.get_write_buffer_size() if transport is not None else 0
+                controller.record_frame({
+                    "capture": (cpu_capture - cpu_start) * 1000.0,
+                    "track": (cpu_track - cpu_capture) * 1000.0,
+                    "encode": (cpu_done - cpu_encode) * 1000.0,
+                }, send_ms, backlog)
 
                 frame_counter += 1
-                await asyncio.sleep(1 / FRAME_RATE)
+                # Fixed cadence: wait for the next frame slot, not a full interval after the work;
+                # if we fell behind, restart the schedule rather than bursting to catch up
+                next_frame_at += 1.0 / settings.frame_rate
+                delay = next_frame_at - time.time()
+                if delay < 0:
+                    next_frame_at, delay = time.time(), 0.0
+                await asyncio.sleep(delay)
 
             cap.release()
 
@@ -142,12 +302,18 @@ async def face_emotion_sender():
         logging.error(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
-    while True:
-        try:
-            asyncio.run(face_emotion_sender())
-        except KeyboardInterrupt:
-            print("Sender stopped by user.")
-            break
-        except Exception as e:
-            logging.exception("Unexpected top-level error in face sender: %s", e)
-            time.sleep(3)
\ No newline at end of file
+    # One worker for the life of the sender, so reconnects don't reload the model
+    analysis_worker = LatestFrameWorker(analyze_faces, warmup=warm_up_deepface, name="deepface-worker")
+    analysis_worker.start()
+    try:
+        while True:
+            try:
+                asyncio.run(face_emotion_sender(analysis_worker))
+            except KeyboardInterrupt:
+                print("Sender stopped by user.")
+                break
+            except Exception as e:
+                logging.exception("Unexpected top-level error in face sender: %s", e)
+                time.sleep(3)
+    finally:
+        analysis_worker.stop()
\ No newline at end of file
@@ -0,0 +1,188 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+DETECT_KWARGS = {"scaleFactor": 1.1, "minNeighbors": 5, "minSize": (30, 30)}
+
+
+def expand_box(box: Box, margin: float, width: int, height: int) -> Box:
+    """`box` grown by `margin` x its size on every side, clipped to the frame."""
+    x, y, w, h = box
+    dx, dy = int(w * margin), int(h * margin)
+    x0, y0 = max(0, x - dx), max(0, y - dy)
+    x1, y1 = min(width, x + w + dx), min(height, y + h + dy)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def scale_box(box: Box, factor: float) -> Box:
+    return tuple(max(1, int(round(v * factor))) if i >= 2 else int(round(v * factor))
+                 for i, v in enumerate(box))
+
+
+def iou(a: Box, b: Box) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / float(union) if union else 0.0
+
+
+class _Track:
+    def __init__(self, box: Box, gray: np.ndarray, template_width: int, track_id: int = 0):
+        self.id = track_id
+        self.box = box
+        self.score = 1.0
+        x, y, w, h = box
+        # Templates are matched at a reduced scale: a ~32 px face is plenty to follow it
+        self.scale = min(1.0, template_width / float(w))
+        self.template = cv2.resize(gray[y:y + h, x:x + w], None, fx=self.scale, fy=self.scale,
+                                   interpolation=cv2.INTER_AREA)
+
+
+class FaceTracker:
+    """Detect-then-track for Haar face boxes.
+
+    A full-frame cascade runs every `detect_every` frames (or when nothing is tracked);
+    in between each face is followed by normalized template matching inside a window
+    `search_margin` around its last box. When a match gets weak the cascade is re-run,
+    but only within `redetect_margin` around the last box and for similar face sizes;
+    if that fails too the face is dropped and the next frame does a full detection.
+
+    Every face keeps an id for as long as it is followed; a full detection hands the id
+    of the best-overlapping previous track (IoU >= `match_iou`) to each new box.
+    """
+    def __init__(self, cascade, detect_every: int = 8, search_margin: float = 0.3,
+                 redetect_margin: float = 0.5, min_score: float = 0.55, template_width: int = 32,
+                 max_faces: Optional[int] = None, detect_kwargs: Optional[dict] = None,
+                 match_iou: float = 0.3):
+        self.cascade = cascade
+        self.detect_every = detect_every
+        self.search_margin = search_margin
+        self.redetect_margin = redetect_margin
+        self.min_score = min_score
+        self.template_width = template_width
+        self.max_faces = max_faces
+        self.detect_kwargs = dict(DETECT_KWARGS, **(detect_kwargs or {}))
+        self.match_iou = match_iou
+        self.tracks: List[_Track] = []
+        self._frames_since_detect = 0
+        self._next_id = 1
+        # Counters (see benchmarks/bench_face_tracking.py)
+        self.full_detections = 0
+        self.roi_detections = 0
+        self.tracked_updates = 0
+
+    def reset(self):
+        self.tracks = []
+        self._frames_since_detect = 0
+
+    def rescale(self, factor: float, width: int, height: int):
+        """Follow the same faces in frames resized by `factor` (now `width` x `height`).
+
+        Boxes are scaled and clipped; templates are kept and matched at an adjusted scale,
+        so faces keep their ids and nothing has to be detected again.
+        """
+        for t in self.tracks:
+            x, y, w, h = scale_box(t.box, factor)
+            x, y = min(max(0, x), max(0, width - w)), min(max(0, y), max(0, height - h))
+            t.box = (x, y, min(w, width), min(h, height))
+            t.scale /= factor
+            if t.scale > 1.0:  # never match on an upsampled window: shrink the template instead
+                t.template = cv2.resize(t.template, None, fx=1.0 / t.scale, fy=1.0 / t.scale,
+                                        interpolation=cv2.INTER_AREA)
+                t.scale = 1.0
+
+    def update(self, gray: np.ndarray) -> List[Box]:
+        """Face boxes for this (grayscale) frame, largest first."""
+        if not self.tracks or self._frames_since_detect >= self.detect_every:
+            self._detect_full(gray, self.tracks)
+        else:
+            self._frames_since_detect += 1
+            height, width = gray.shape[:2]
+            previous = self.tracks
+            self.tracks = [t for t in previous
+                           if self._follow(t, gray, width, height) or self._redetect(t, gray, width, height)]
+            if not self.tracks:  # lost everything: look again right away rather than next frame
+                self._detect_full(gray, previous)
+        return [t.box for t in self.tracks]
+
+    def _detect_full(self, gray: np.ndarray, previous: List[_Track]):
+        self.full_detections += 1
+        self._frames_since_detect = 0
+        faces = self.cascade.detectMultiScale(gray, **self.detect_kwargs)
+        boxes = sorted((tuple(int(v) for v in f) for f in faces), key=lambda b: b[2] * b[3], reverse=True)
+        if self.max_faces:
+            boxes = boxes[:self.max_faces]
+        # Greedy IoU matching (best pairs first) carries ids over from the previous tracks
+        pairs = sorted(((iou(t.box, b), ti, bi) for ti, t in enumerate(previous) for bi, b in enumerate(boxes)),
+                       reverse=True)
+        ids: Dict[int, int] = {}
+        used = set()
+        for overlap, ti, bi in pairs:
+            if overlap < self.match_iou:
+                break
+            if bi in ids or ti in used:
+                continue
+            ids[bi] = previous[ti].id
+            used.add(ti)
+        tracks = []
+        for bi, b in enumerate(boxes):
+            if bi not in ids:
+                ids[bi] = self._next_id
+                self._next_id += 1
+            tracks.append(_Track(b, gray, self.template_width, ids[bi]))
+        self.tracks = tracks
+
+    def _follow(self, track: _Track, gray: np.ndarray, width: int, height: int) -> bool:
+        """Template match inside the search window; True (and box moved) if the match is good."""
+        self.tracked_updates += 1
+        x, y, w, h = track.box
+        sx, sy, sw, sh = expand_box(track.box, self.search_margin, width, height)
+        window = cv2.resize(gray[sy:sy + sh, sx:sx + sw], None, fx=track.scale, fy=track.scale,
+                            interpolation=cv2.INTER_AREA)
+        th, tw = track.template.shape[:2]
+        if window.shape[0] < th or window.shape[1] < tw:
+            return False
+        _, score, _, loc = cv2.minMaxLoc(cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED))
+        track.score = float(score)
+        if score < self.min_score:
+            return False
+        nx = min(width - w, max(0, sx + int(round(loc[0] / track.scale))))
+        ny = min(height - h, max(0, sy + int(round(loc[1] / track.scale))))
+        track.box = (nx, ny, w, h)
+        return True
+
+    def _redetect(self, track: _Track, gray: np.ndarray, width: int, height: int) -> bool:
+        """Cascade restricted to a margin around the last box and to similar face sizes."""
+        self.roi_detections += 1
+        x, y, w, h = track.box
+        rx, ry, rw, rh = expand_box(track.box, self.redetect_margin, width, height)
+        kwargs = dict(self.detect_kwargs)
+        min_side = max(self.detect_kwargs["minSize"][0], int(w * 0.7))
+        kwargs["minSize"] = (min_side, min_side)
+        kwargs["maxSize"] = (int(w * 1.4) + 1, int(w * 1.4) + 1)
+        faces = self.cascade.detectMultiScale(gray[ry:ry + rh, rx:rx + rw], **kwargs)
+        if len(faces) == 0:
+            return False
+        # Closest to where the face was
+        cx, cy = x + w / 2.0, y + h / 2.0
+        fx, fy, fw, fh = min(faces, key=lambda f: (rx + f[0] + f[2] / 2.0 - cx) ** 2 + (ry + f[1] + f[3] / 2.0 - cy) ** 2)
+        box = (int(rx + fx), int(ry + fy), int(fw), int(fh))
+        refreshed = _Track(box, gray, self.template_width)
+        track.box, track.scale, track.template, track.score = box, refreshed.scale, refreshed.template, 1.0
+        return True
+
+    def tracked(self) -> List[Tuple[int, Box]]:
+        """(id, box) for every face currently followed, largest (at detection) first."""
+        return [(t.id, t.box) for t in self.tracks]
+
+    def stats(self) -> dict:
+        return {
+            "full_detections": self.full_detections,
+            "roi_detections": self.roi_detections,
+            "tracked_updates": self.tracked_updates,
+        }
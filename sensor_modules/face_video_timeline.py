@@ -0,0 +1,223 @@
+"""Offline mode for the face sensor: an emotion timeline for a video file.
+
+    python sensor_modules/face_video_timeline.py holiday.mp4 -o holiday.jsonl [--sample-fps 2]
+
+Instead of streaming a camera, the video is sampled at `--sample-fps` and each sample's
+faces go through the same emotion model as the live sender. The output is a JSONL
+timeline, one {"t", "emotion", "confidence"} entry per sample (see
+aura_backend/app/timeline.py), that `python -m app.render` turns into a soundtrack.
+
+The video is cut into segments that worker processes decode in parallel. Each worker
+samples its frames, skips samples whose shot has not changed since the last analyzed
+one (mean difference of a small thumbnail) and runs the Haar detector on the rest. The
+face crops come back to the main process, which runs the emotion model on large batches
+while the workers keep decoding.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from face_tracking import DETECT_KWARGS
+logging.basicConfig(level=logging.INFO)
+
+# --- Configuration ---
+SAMPLE_FPS = 2.0  # Samples analyzed per second of video
+ANALYSIS_WIDTH = 320  # Frames are scaled to this width for detection (as in the live sender)
+SEGMENT_SECONDS = 30.0  # Video per worker job
+SCENE_THRESHOLD = 0.05  # Mean thumbnail difference (0..1) that counts as a changed shot
+MAX_HOLD_SECONDS = 2.0  # A static shot is still re-analyzed this often (expressions change while the camera doesn't)
+THUMB_SIZE = (32, 18)
+BATCH_FACES = 64  # Face crops per emotion-model call
+MAX_FACES = 8  # Faces analyzed per sample (largest first)
+
+Sample = Tuple[float, Optional[List[np.ndarray]]]  # (t, RGB face crops) or (t, None) = same shot as before
+
+_cascade = None
+
+
+def _detector():
+    global _cascade
+    if _cascade is None:
+        _cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    return _cascade
+
+
+def video_info(path: str) -> Tuple[float, int]:
+    """(frames per second, frame count); the count is 0 when the container doesn't say."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    cap.release()
+    return fps, max(0, frame_count)
+
+
+def scan_segment(path: str, first_sample: int, end_sample: Optional[int], step: float, fps: float,
+                 width: int = ANALYSIS_WIDTH, scene_threshold: float = SCENE_THRESHOLD,
+                 max_hold: float = MAX_HOLD_SECONDS, max_faces: int = MAX_FACES) -> List[Sample]:
+    """Decode samples [first_sample, end_sample) (sample k is frame round(k * step)) and detect faces.
+
+    Runs in a worker process. The first sample of a segment is always analyzed.
+    """
+    cv2.setNumThreads(1)  # one process per core already
+    cascade = _detector()
+    cap = cv2.VideoCapture(path)
+    frame_index = int(round(first_sample * step))
+    if frame_index:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    samples: List[Sample] = []
+    reference = None  # thumbnail of the last analyzed sample
+    reference_t = 0.0
+    k = first_sample
+    while end_sample is None or k < end_sample:
+        target = int(round(k * step))
+        # grab() skips frames without converting them; only sampled frames are retrieved
+        while frame_index < target and cap.grab():
+            frame_index += 1
+        if frame_index < target:
+            break
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frame_index += 1
+        t = target / fps
+        k += 1
+
+        h, w = frame.shape[:2]
+        resized = cv2.resize(frame, (width, int(h * width / float(w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+        thumb = cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+        if (reference is not None and t - reference_t < max_hold
+                and float(np.mean(np.abs(thumb - reference))) / 255.0 < scene_threshold):
+            samples.append((t, None))
+            continue
+        reference, reference_t = thumb, t
+
+        faces = cascade.detectMultiScale(gray, **DETECT_KWARGS)
+        boxes = sorted((tuple(int(v) for v in f) for f in faces), key=lambda b: b[2] * b[3], reverse=True)
+        samples.append((t, [cv2.cvtColor(resized[y:y+bh, x:x+bw], cv2.COLOR_BGR2RGB)
+                            for x, y, bw, bh in boxes[:max_faces]]))
+    cap.release()
+    return samples
+
+
+def _scan_job(args):
+    return scan_segment(*args)
+
+
+class _TimelineBuilder:
+    """Turns samples into timeline entries in order, batching face crops across samples."""
+    def __init__(self, out_fh, batch_faces: int):
+        from face_emotion_sender import aggregate_emotions, analyze_faces  # the live sender's model path
+        self._analyze, self._aggregate = analyze_faces, aggregate_emotions
+        self.out_fh = out_fh
+        self.batch_faces = batch_faces
+        self.pending: List[Sample] = []
+        self.pending_faces = 0
+        self.last_entry: Optional[Dict] = None
+        self.stats = {"samples": 0, "analyzed": 0, "static": 0, "faces": 0, "model_calls": 0}
+
+    def add(self, sample: Sample):
+        self.pending.append(sample)
+        self.pending_faces += len(sample[1] or [])
+        if self.pending_faces >= self.batch_faces:
+            self.flush()
+
+    def flush(self):
+        crops = [(i, crop) for i, (_, faces) in enumerate(self.pending) for crop in faces or []]
+        per_sample: Dict[int, List[Dict]] = {}
+        for start in range(0, len(crops), self.batch_faces):
+            batch = [(n, crop) for n, (_, crop) in enumerate(crops[start:start + self.batch_faces], start)]
+            self.stats["model_calls"] += 1
+            for result in self._analyze(batch):
+                per_sample.setdefault(crops[result["id"]][0], []).append(result)
+        for i, (t, faces) in enumerate(self.pending):
+            self.stats["samples"] += 1
+            if faces is None and self.last_entry is not None:
+                # Same shot as the last analyzed sample: repeat its reading
+                self.stats["static"] += 1
+                entry = dict(self.last_entry, t=round(t, 3))
+            else:
+                self.stats["analyzed"] += 1
+                self.stats["faces"] += len(faces or [])
+                results = per_sample.get(i, [])
+                reading = self._aggregate(results)
+                entry = {"t": round(t, 3), "emotion": reading["emotion"],
+                         "confidence": round(reading["confidence"], 4), "faces": len(results)}
+            self.out_fh.write(json.dumps(entry) + "\n")
+            self.last_entry = entry
+        self.pending, self.pending_faces = [], 0
+
+
+def build_video_timeline(path: str, out_path: str, sample_fps: float = SAMPLE_FPS,
+                         workers: Optional[int] = None, width: int = ANALYSIS_WIDTH,
+                         scene_threshold: float = SCENE_THRESHOLD, max_hold: float = MAX_HOLD_SECONDS,
+                         segment_seconds: float = SEGMENT_SECONDS, batch_faces: int = BATCH_FACES) -> Dict:
+    """Write the emotion timeline of `path` to `out_path`; returns timing and sample stats."""
+    started = time.time()
+    fps, frame_count = video_info(path)
+    if fps <= 0:
+        logging.warning("%s does not report a frame rate; assuming 25 fps", path)
+        fps = 25.0
+    step = max(1.0, fps / sample_fps)
+    per_segment = max(1, int(segment_seconds * fps / step))
+    if frame_count:
+        n_samples = int(math.ceil(frame_count / step))
+        ranges = [(k, min(k + per_segment, n_samples)) for k in range(0, n_samples, per_segment)]
+    else:  # unknown length: one sequential pass
+        ranges = [(0, None)]
+    jobs = [(path, k0, k1, step, fps, width, scene_threshold, max_hold, MAX_FACES) for k0, k1 in ranges]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    logging.info("Scanning %s (%.1f fps, %d frames) in %d segments on %d workers",
+                 path, fps, frame_count, len(jobs), workers)
+
+    with open(out_path, "w", encoding="utf-8") as out_fh:
+        builder = _TimelineBuilder(out_fh, batch_faces)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # map() yields segments in order while later ones are still being decoded
+                for samples in pool.map(_scan_job, jobs):
+                    for sample in samples:
+                        builder.add(sample)
+        else:
+            for job in jobs:
+                for sample in _scan_job(job):
+                    builder.add(sample)
+        builder.flush()
+
+    elapsed = time.time() - started
+    duration = builder.last_entry["t"] + step / fps if builder.last_entry else 0.0
+    stats = dict(builder.stats, video_seconds=round(duration, 2), wall_seconds=round(elapsed, 2),
+                 realtime_factor=round(duration / elapsed, 1) if elapsed > 0 else None, workers=workers)
+    logging.info("Wrote %s: %s", out_path, stats)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Write a face-emotion timeline (JSONL) for a video file")
+    parser.add_argument("video")
+    parser.add_argument("-o", "--output", default=None, help="timeline path (default: <video>.jsonl)")
+    parser.add_argument("--sample-fps", type=float, default=SAMPLE_FPS)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--width", type=int, default=ANALYSIS_WIDTH, help="detection frame width")
+    parser.add_argument("--scene-threshold", type=float, default=SCENE_THRESHOLD,
+                        help="thumbnail difference below which a sample counts as the same shot (0 disables)")
+    parser.add_argument("--max-hold", type=float, default=MAX_HOLD_SECONDS,
+                        help="seconds a static shot may reuse its last analysis")
+    args = parser.parse_args(argv)
+    out_path = args.output or os.path.splitext(args.video)[0] + ".jsonl"
+    build_video_timeline(args.video, out_path, sample_fps=args.sample_fps, workers=args.workers,
+                         width=args.width, scene_threshold=args.scene_threshold, max_hold=args.max_hold)
+
+
+if __name__ == "__main__":
+    main()
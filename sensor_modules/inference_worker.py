@@ -0,0 +1,117 @@
+import logging
+import multiprocessing as mp
+import queue
+import time
+from typing import Any, Callable, Optional
+
+
+def _worker_main(handler: Callable[[Any], Any], warmup: Optional[Callable[[], None]], inbox, outbox, stop):
+    if warmup is not None:
+        try:
+            warmup()
+        except Exception as e:
+            logging.warning("Inference worker warm-up failed: %s", e)
+    while not stop.is_set():
+        try:
+            seq, submitted_at, item = inbox.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        started = time.time()
+        try:
+            result, error = handler(item), None
+        except Exception as e:
+            result, error = None, str(e)
+        outbox.put({
+            "seq": seq,
+            "result": result,
+            "error": error,
+            "submitted_at": submitted_at,
+            "inference_ms": round((time.time() - started) * 1000.0, 1),
+        })
+
+
+class LatestFrameWorker:
+    """Runs a slow model in its own process on whatever input is most recent.
+
+    The inbox holds at most one item: submit() replaces a pending item instead of queueing
+    behind it, so the worker never falls behind and the caller never blocks. Results come
+    back through poll(), which returns the newest finished result (or None).
+
+    `handler` and `warmup` must be module-level functions (they are pickled into the child
+    process); heavy imports belong inside them so only the worker pays for them.
+    """
+    def __init__(self, handler: Callable[[Any], Any], warmup: Optional[Callable[[], None]] = None,
+                 name: str = "inference-worker", restart_backoff: float = 5.0):
+        self.handler = handler
+        self.warmup = warmup
+        self.name = name
+        self._ctx = mp.get_context("spawn")  # same behaviour on Windows/macOS/Linux; no forked camera handles
+        self._process: Optional[mp.Process] = None
+        self._started_at = 0.0
+        self.restart_backoff = restart_backoff  # a crashing worker is restarted at most this often
+        self._seq = 0
+        self.submitted = 0
+        self.replaced = 0  # items dropped because a newer one arrived first
+        self.completed = 0
+
+    def start(self):
+        self._inbox = self._ctx.Queue(maxsize=1)
+        self._outbox = self._ctx.Queue()
+        self._stop = self._ctx.Event()
+        self._process = self._ctx.Process(
+            target=_worker_main, name=self.name, daemon=True,
+            args=(self.handler, self.warmup, self._inbox, self._outbox, self._stop))
+        self._process.start()
+        self._started_at = time.time()
+        logging.info("%s started (pid %s)", self.name, self._process.pid)
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def submit(self, item: Any):
+        """Hand `item` to the worker, replacing any item it has not picked up yet. Never blocks."""
+        if not self.alive:
+            if time.time() - self._started_at < self.restart_backoff:
+                return
+            logging.warning("%s is not running; restarting it", self.name)
+            self.start()
+        self._seq += 1
+        self.submitted += 1
+        entry = (self._seq, time.time(), item)
+        try:
+            self._inbox.put_nowait(entry)
+            return
+        except queue.Full:
+            pass
+        try:
+            self._inbox.get_nowait()  # drop the stale item
+            self.replaced += 1
+        except queue.Empty:
+            pass  # the worker took it in the meantime
+        try:
+            self._inbox.put_nowait(entry)
+        except queue.Full:
+            self.replaced += 1  # the pending item was still being flushed to the pipe; the next submit wins
+
+    def poll(self) -> Optional[dict]:
+        """Newest finished result since the last poll, or None. Never blocks."""
+        latest = None
+        while True:
+            try:
+                latest = self._outbox.get_nowait()
+            except queue.Empty:
+                break
+            except (OSError, ValueError):  # queue closed
+                break
+            self.completed += 1
+        return latest
+
+    def stop(self, timeout: float = 2.0):
+        if self._process is None:
+            return
+        self._stop.set()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
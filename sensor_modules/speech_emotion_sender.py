@@ -2,16 +2,18 @@ import asyncio
 import websockets
 import json
 import logging
-import pickle
 import numpy as np
 import pyaudio
 import wave
 import os
 import threading
 import time
-from collections import deque
 import soundfile
-import librosa
+from audio_ring import AudioRingBuffer
+from inference_worker import LatestFrameWorker
+from speech_features import HOP_LENGTH, StreamingFeatureExtractor
+from speech_model import classify, load_model
+from voice_activity import VoiceActivityGate, fade_emotion
 
 logging.basicConfig(level=logging.INFO)
 
@@ -19,71 +21,122 @@ logging.basicConfig(level=logging.INFO)
 SERVER_URI = "ws://localhost:8000/ws/sensors" 
 # SERVER_URI = os.environ.get("AURA_BACKEND_WS_URL", "ws://localhost:8000/ws/sensors")
 MODEL_PATH = "aura_backend/emotion_models/" # Relative path to models
+MODEL_FILE = os.path.join(MODEL_PATH, 'emotion_recognition_model.pkl')
+MODEL_NPZ = os.path.join(MODEL_PATH, 'emotion_recognition_model.npz')  # NumPy copy of the pickle (see speech_model.py)
+SAMPLE_RATE = 44100
+ANALYSIS_INTERVAL = 1.0  # Seconds between analysis windows
+RESULT_POLL_INTERVAL = 0.05  # How often finished analyses are picked up and sent
+DECAY_SECONDS = 4.0  # While nobody speaks the last emotion fades to neutral with this time constant
+MIN_CONFIDENCE = 0.05  # A faded emotion below this is reported as neutral
 
-# --- Model Loading ---
-try:
-    with open(os.path.join(MODEL_PATH, 'emotion_recognition_model.pkl'), 'rb') as f:
-        model = pickle.load(f)
-    logging.info("Speech emotion model loaded successfully.")
-except FileNotFoundError:
-    logging.error(f"Model file not found in {MODEL_PATH}. Please ensure the path is correct.")
-    exit()
-
-def extract_feature_from_array(audio_data, sample_rate):
-    result = np.array([])
-    mfccs = np.mean(librosa.feature.mfcc(y=audio_data, sr=sample_rate, n_mfcc=40).T, axis=0)
-    result = np.hstack((result, mfccs))
-    stft = np.abs(librosa.stft(audio_data))
-    chroma = np.mean(librosa.feature.chroma_stft(S=stft, sr=sample_rate).T, axis=0)
-    result = np.hstack((result, chroma))
-    mel = np.mean(librosa.feature.melspectrogram(y=audio_data, sr=sample_rate).T, axis=0)
-    result = np.hstack((result, mel))
-    return result
+# --- Speech model worker (runs in its own process; see inference_worker.py) ---
+_model = None
+_extractor = None
+_extractor_stream = None
+
+def _load_model():
+    global _model
+    if _model is None:
+        # The .npz needs only NumPy; the pickle (scikit-learn) is the fallback
+        _model = load_model(MODEL_FILE, MODEL_NPZ)
+        logging.info("Speech emotion model loaded successfully (%s).", type(_model).__name__)
+    return _model
+
+def analyze_window(item):
+    """Emotion of one analysis window; runs in the worker process.
+
+    `item` is (stream id, stream position of the window's first sample, sample rate,
+    samples). The extractor reuses STFT frames between windows of the same stream.
+    """
+    global _extractor, _extractor_stream
+    stream_id, start, sample_rate, audio = item
+    if _extractor is None or _extractor_stream != stream_id:
+        _extractor, _extractor_stream = StreamingFeatureExtractor(sample_rate), stream_id
+    return classify(_load_model(), _extractor.features(audio, start))
+
+def warm_up_model():
+    """Load the model (and compile librosa's kernels) before the first real window."""
+    analyze_window((None, None, SAMPLE_RATE, np.zeros(2 * SAMPLE_RATE, dtype=np.float32)))
 
 class RealTimeEmotionRecognizer:
-    def __init__(self, websocket):
+    def __init__(self, websocket, worker: LatestFrameWorker):
         self.websocket = websocket
+        self.worker = worker
         self.chunk_duration = 2.0  # seconds
-        self.sample_rate = 44100
+        self.sample_rate = SAMPLE_RATE
         self.chunk_samples = int(self.chunk_duration * self.sample_rate)
-        self.audio_buffer = deque(maxlen=self.chunk_samples)
+        # Window + 1 s of headroom: the window view handed to feature extraction is not
+        # overwritten until another second of audio has arrived
+        self.audio_buffer = AudioRingBuffer(self.chunk_samples + self.sample_rate)
+        self.vad = VoiceActivityGate(self.sample_rate)
+        self.gated_upto = 0  # stream position up to which audio has been through the VAD
+        self.stream_id = time.time()  # stream positions restart with every recognizer
+        self.last_emotion = {"emotion": "neutral", "confidence": 0.0}
+        self.last_heard = None  # when last_emotion was measured
         self.is_recording = False
         self.p = pyaudio.PyAudio()
         self.stream = None
 
     def audio_callback(self, in_data, frame_count, time_info, status):
         audio_data = np.frombuffer(in_data, dtype=np.float32)
-        self.audio_buffer.extend(audio_data)
+        self.audio_buffer.write(audio_data)
         return (in_data, pyaudio.paContinue)
 
     async def process_audio_chunk(self):
-        if len(self.audio_buffer) < self.chunk_samples:
+        """Gate the newest audio; windows with speech go to the worker, silence only decays."""
+        if self.audio_buffer.filled < self.chunk_samples:
             return
 
-        audio_array = np.array(list(self.audio_buffer))
-        
-        try:
-            features = extract_feature_from_array(audio_array, self.sample_rate)
-            prediction = model.predict([features])
-            confidence_scores = model.predict_proba([features])[0]
-            
-            dominant_emotion = prediction[0]
-            confidence = np.max(confidence_scores)
-
-            payload = {
-                "source": "speech",
-                "payload": {
-                    "emotion": dominant_emotion,
-                    "confidence": round(float(confidence), 4)
-                }
+        written = self.audio_buffer.written
+        new = min(written - self.gated_upto, self.audio_buffer.capacity)
+        speech = self.vad.update(self.audio_buffer.window(written - new, new))
+        self.gated_upto = written
+        if not speech:
+            await self.send_decayed()
+            return
+
+        # Newest window starting on an STFT hop boundary, so it shares its frames with the
+        # previous window's; a window the worker hasn't started on yet is replaced
+        start = (written - self.chunk_samples) // HOP_LENGTH * HOP_LENGTH
+        self.worker.submit((self.stream_id, start, self.sample_rate,
+                            self.audio_buffer.window(start, self.chunk_samples)))
+
+    async def send_result(self):
+        """Send the worker's newest finished analysis, if any."""
+        done = self.worker.poll()
+        if done is None:
+            return
+        if done["error"]:
+            logging.error(f"Processing error: {done['error']}")
+            return
+        if done["result"] is None:
+            return
+        self.last_emotion = done["result"]
+        self.last_heard = time.time()
+        await self.send(self.last_emotion, voice=True, analysis_ms=done["inference_ms"])
+
+    async def send_decayed(self):
+        """Nobody is speaking: fade the last emotion towards neutral instead of running the model."""
+        elapsed = time.time() - self.last_heard if self.last_heard is not None else None
+        await self.send(fade_emotion(self.last_emotion, elapsed, DECAY_SECONDS, MIN_CONFIDENCE), voice=False)
+
+    async def send(self, emotion, voice, analysis_ms=None):
+        payload = {
+            "source": "speech",
+            "payload": {
+                "emotion": emotion["emotion"],
+                "confidence": round(float(emotion["confidence"]), 4)
+            },
+            "meta": {
+                "voice": voice,
+                "voiced_fraction": round(self.vad.voiced_fraction, 3),
+                "analysis_ms": analysis_ms
             }
-            
-            await self.websocket.send(json.dumps(payload))
+        }
+        await self.websocket.send(json.dumps(payload))
+        if voice:
             logging.info(f"Sent speech emotion: {payload['payload']}")
 
-        except Exception as e:
-            logging.error(f"Processing error: {e}")
-
     async def start(self):
         logging.info("Starting real-time speech recognition...")
         self.stream = self.p.open(
@@ -97,10 +150,14 @@ class RealTimeEmotionRecognizer:
         self.is_recording = True
         self.stream.start_stream()
         
+        next_analysis = time.time() + ANALYSIS_INTERVAL
         try:
             while self.is_recording:
-                await self.process_audio_chunk()
-                await asyncio.sleep(1.0) # Analyze every second
+                await self.send_result()
+                if time.time() >= next_analysis:
+                    next_analysis += ANALYSIS_INTERVAL
+                    await self.process_audio_chunk()
+                await asyncio.sleep(RESULT_POLL_INTERVAL)
         finally:
             self.stop()
 
@@ -111,7 +168,7 @@ class RealTimeEmotionRecognizer:
             self.stream.close()
         self.p.terminate()
 
-async def speech_emotion_sender():
+async def speech_emotion_sender(worker: LatestFrameWorker):
     logging.info("Attempting to connect to AURA server at %s", SERVER_URI)
     try:
         async with websockets.connect(SERVER_URI) as websocket:
@@ -121,7 +178,7 @@ async def speech_emotion_sender():
                 await websocket.send(json.dumps({"source": "speech", "payload": {"emotion": "neutral", "confidence": 0.0}}))
             except Exception:
                 logging.debug("Failed to send initial handshake payload")
-            recognizer = RealTimeEmotionRecognizer(websocket)
+            recognizer = RealTimeEmotionRecognizer(websocket, worker)
             await recognizer.start()
     except (websockets.exceptions.ConnectionClosedError, ConnectionRefusedError) as e:
         logging.error(f"Connection to server failed: {e}. Retrying in 5 seconds...")
@@ -130,12 +187,21 @@ async def speech_emotion_sender():
         logging.error(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
-    while True:
-        try:
-            asyncio.run(speech_emotion_sender())
-        except KeyboardInterrupt:
-            print("Sender stopped by user.")
-            break
-        except Exception:
+    if not (os.path.exists(MODEL_FILE) or os.path.exists(MODEL_NPZ)):
+        logging.error(f"Model file not found in {MODEL_PATH}. Please ensure the path is correct.")
+        exit()
+    # One worker for the life of the sender, so reconnects don't reload the model
+    analysis_worker = LatestFrameWorker(analyze_window, warmup=warm_up_model, name="speech-worker")
+    analysis_worker.start()
+    try:
+        while True:
+            try:
+                asyncio.run(speech_emotion_sender(analysis_worker))
+            except KeyboardInterrupt:
+                print("Sender stopped by user.")
+                break
+            except Exception:
 
-            pass
+                pass
+    finally:
+        analysis_worker.stop()
@@ -0,0 +1,128 @@
+from typing import Dict, List, Optional, Tuple
+
+import librosa
+import numpy as np
+import scipy.fftpack
+
+# Features the speech model was trained on: mean MFCC (40), chroma (12) and mel bands (128)
+# of a centred librosa STFT with the default 2048-sample frames and 512-sample hop
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MFCC = 40
+N_MELS = 128
+N_CHROMA = 12
+
+
+def extract_feature_from_array(audio_data, sample_rate):
+    result = np.array([])
+    mfccs = np.mean(librosa.feature.mfcc(y=audio_data, sr=sample_rate, n_mfcc=40).T, axis=0)
+    result = np.hstack((result, mfccs))
+    stft = np.abs(librosa.stft(audio_data))
+    chroma = np.mean(librosa.feature.chroma_stft(S=stft, sr=sample_rate).T, axis=0)
+    result = np.hstack((result, chroma))
+    mel = np.mean(librosa.feature.melspectrogram(y=audio_data, sr=sample_rate).T, axis=0)
+    result = np.hstack((result, mel))
+    return result
+
+
+class StreamingFeatureExtractor:
+    """`extract_feature_from_array` for overlapping windows of one audio stream.
+
+    The one-shot version runs three STFTs over the whole window (inside mfcc, for chroma
+    and inside melspectrogram). Here every STFT frame is computed once and mel, MFCC and
+    chroma all derive from it. Frames that lie entirely inside a window are cached under
+    their position in the stream, so the next window (which overlaps by half) only
+    computes its new frames plus the few at its edges, which see librosa's zero padding.
+
+    Two steps depend on the whole window and are redone per window from the cached
+    frames, exactly as librosa does them: the 80 dB floor of the MFCC log-mel and the
+    tuning estimate behind the chroma filter bank.
+
+    Reuse needs windows that start on a multiple of `hop_length` in the stream; other
+    windows get the same features, computed from scratch.
+    """
+    def __init__(self, sample_rate: int, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH):
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.fft_window = librosa.filters.get_window("hann", n_fft, fftbins=True).astype(np.float32)
+        self.mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=N_MELS)
+        self._chroma_basis: Dict[float, np.ndarray] = {}  # tuning -> chroma filter bank
+        # Per-frame cache, one column per slot (slot = stream frame index % slots):
+        # magnitude spectrum, mel power and the frame's piptrack peaks (pitches, magnitudes)
+        self._mag: Optional[np.ndarray] = None
+        self._mel: Optional[np.ndarray] = None
+        self._peaks: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._slot_key: Optional[np.ndarray] = None  # stream frame index cached in each slot (-1: none)
+        self.frames_computed = 0
+        self.frames_reused = 0
+
+    def _allocate(self, n_frames: int):
+        self._mag = np.zeros((self.n_fft // 2 + 1, n_frames), dtype=np.float32)
+        self._mel = np.zeros((N_MELS, n_frames), dtype=np.float32)
+        self._peaks = [(np.zeros(0), np.zeros(0))] * n_frames
+        self._slot_key = np.full(n_frames, -1, dtype=np.int64)
+
+    def _analyze(self, frames: np.ndarray):
+        """Magnitude, mel power and piptrack peaks for a (n_fft, k) block of raw frames."""
+        mag = np.abs(np.fft.rfft(self.fft_window[:, None] * frames, axis=0))
+        mel = self.mel_basis @ (mag ** 2)
+        pitches, pitch_mags = librosa.piptrack(S=mag, sr=self.sample_rate, n_fft=self.n_fft)
+        rows, cols = np.nonzero(pitches > 0)  # sorted by row; regroup per frame
+        order = np.argsort(cols, kind="stable")
+        rows, cols = rows[order], cols[order]
+        bounds = np.searchsorted(cols, np.arange(frames.shape[1] + 1))
+        peaks = [(pitches[rows[lo:hi], c], pitch_mags[rows[lo:hi], c])
+                 for c, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]))]
+        return mag, mel, peaks
+
+    def _chroma_filters(self, tuning: float) -> np.ndarray:
+        basis = self._chroma_basis.get(tuning)
+        if basis is None:
+            basis = librosa.filters.chroma(sr=self.sample_rate, n_fft=self.n_fft, tuning=tuning, n_chroma=N_CHROMA)
+            self._chroma_basis[tuning] = basis
+        return basis
+
+    def features(self, window: np.ndarray, start: Optional[int] = None) -> np.ndarray:
+        """The 180 features of `window`, which begins at sample `start` of the stream."""
+        n, half, hop = len(window), self.n_fft // 2, self.hop_length
+        n_frames = 1 + n // hop
+        if self._slot_key is None or len(self._slot_key) < n_frames:
+            self._allocate(n_frames)
+        slots = len(self._slot_key)
+        cacheable = start is not None and start % hop == 0
+        centers = np.arange(n_frames) * hop
+        keys = (start // hop if cacheable else 0) + np.arange(n_frames)
+        slot = keys % slots
+        # Frames touching the window edges see zero padding and are never shared
+        interior = cacheable & (centers >= half) & (centers + half <= n)
+        missing = np.nonzero(~(interior & (self._slot_key[slot] == keys)))[0]
+
+        if len(missing):
+            padded = np.pad(window, half)  # center=True with librosa's zero padding
+            frames = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft)[::hop][missing].T
+            mag, mel, peaks = self._analyze(frames)
+            where = slot[missing]
+            self._mag[:, where] = mag
+            self._mel[:, where] = mel
+            for s_, p in zip(where, peaks):
+                self._peaks[s_] = p
+            self._slot_key[where] = np.where(interior[missing], keys[missing], -1)
+        self.frames_computed += len(missing)
+        self.frames_reused += n_frames - len(missing)
+
+        mag, mel = self._mag[:, slot], self._mel[:, slot]
+        pitches = np.concatenate([self._peaks[s_][0] for s_ in slot])
+        pitch_mags = np.concatenate([self._peaks[s_][1] for s_ in slot])
+
+        # MFCC: log-mel with the window's 80 dB floor; the DCT is linear, so take it of the mean
+        log_mel = 10.0 * np.log10(np.maximum(1e-10, mel))
+        log_mel = np.maximum(log_mel, log_mel.max() - 80.0)
+        mfccs = scipy.fftpack.dct(log_mel.mean(axis=1), type=2, norm="ortho")[:N_MFCC]
+
+        # Chroma: tuning estimated over the window, as librosa.estimate_tuning does
+        threshold = np.median(pitch_mags) if len(pitch_mags) else 0.0
+        tuning = librosa.pitch_tuning(pitches[pitch_mags >= threshold], resolution=0.01, bins_per_octave=N_CHROMA)
+        chroma = librosa.util.normalize(self._chroma_filters(tuning) @ mag, norm=np.inf, axis=0)
+
+        return np.hstack((mfccs, chroma.mean(axis=1), mel.mean(axis=1))).astype(np.float64)
@@ -0,0 +1,183 @@
+"""Offline mode for the speech sensor: emotion timelines for recorded audio files.
+
+    python sensor_modules/speech_file_timeline.py session.wav [more.flac | recordings/ ...] [--workers N]
+
+Every file (directories are searched recursively for WAV/FLAC/OGG) is cut into the same
+2 s windows, 1 s apart, that the live sender analyzes, and each window goes through the
+same voice-activity gate, features and model. Each file gets a JSONL timeline next to it
+(or in --output-dir), one {"t", "emotion", "confidence", "voice"} entry per window with
+`t` at the window's centre (see aura_backend/app/timeline.py). Windows without speech fade
+the last emotion towards neutral, as the live sender does.
+
+Files are split into chunks of consecutive windows that a process pool scores in
+parallel. Within a chunk the windows share STFT frames (StreamingFeatureExtractor); each
+chunk primes its voice-activity gate on the few windows before it. Chunks are fixed by
+the file, not by the pool, so timelines do not depend on the number of workers.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile
+
+from speech_features import HOP_LENGTH, StreamingFeatureExtractor
+from speech_model import classify, load_model
+from voice_activity import VoiceActivityGate, fade_emotion
+logging.basicConfig(level=logging.INFO)
+
+# --- Configuration ---
+MODEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aura_backend", "emotion_models",
+                          "emotion_recognition_model.pkl")
+WINDOW_SECONDS = 2.0  # As the live sender
+STEP_SECONDS = 1.0
+CHUNK_WINDOWS = 60  # Windows per worker job
+PREROLL_WINDOWS = 4  # Earlier windows replayed through the voice-activity gate at the start of a job
+DECAY_SECONDS = 4.0
+MIN_CONFIDENCE = 0.05
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg")
+
+_models: Dict[str, object] = {}
+
+
+def _model(model_path: str):
+    if model_path not in _models:
+        _models[model_path] = load_model(model_path)
+    return _models[model_path]
+
+
+def window_starts(n_samples: int, sample_rate: int) -> List[int]:
+    """First sample of every window, snapped to the STFT hop grid like the live sender's."""
+    window = int(WINDOW_SECONDS * sample_rate)
+    step = int(STEP_SECONDS * sample_rate)
+    count = 1 + max(0, n_samples - window) // step
+    return [k * step // HOP_LENGTH * HOP_LENGTH for k in range(count)]
+
+
+def _read_mono(path: str, start: int, stop: int) -> np.ndarray:
+    audio, _ = soundfile.read(path, start=start, stop=stop, dtype="float32", always_2d=True)
+    return audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+
+
+def score_chunk(path: str, starts: List[int], preroll: List[int], sample_rate: int,
+                model_path: str) -> List[Optional[Dict]]:
+    """Emotion per window (None where the gate heard no speech); runs in a worker process.
+
+    `preroll` are the starts of the windows just before `starts`: they are only run
+    through the voice-activity gate, so it enters the chunk in the state it would have
+    reached on the whole file.
+    """
+    window = int(WINDOW_SECONDS * sample_rate)
+    model = _model(model_path)
+    extractor = StreamingFeatureExtractor(sample_rate)
+    gate = VoiceActivityGate(sample_rate)
+    # Start on a gate block boundary of the file, so blocks split the audio as they would live
+    read_from = max(0, preroll[0] - int(STEP_SECONDS * sample_rate)) // gate.block * gate.block if preroll else 0
+    audio = _read_mono(path, read_from, starts[-1] + window)
+    gated_upto = read_from
+    results = []
+    for i, start in enumerate(preroll + starts):
+        # As live, the gate hears the audio each window adds
+        speech = gate.update(audio[gated_upto - read_from:start - read_from + window])
+        gated_upto = start + window
+        if i < len(preroll):
+            continue
+        samples = audio[start - read_from:start - read_from + window]
+        if len(samples) < window:  # file shorter than one window
+            samples = np.pad(samples, (0, window - len(samples)))
+        results.append(classify(model, extractor.features(samples, start)) if speech else None)
+    return results
+
+
+def _score_job(args):
+    return score_chunk(*args)
+
+
+def find_audio_files(paths: List[str]) -> List[str]:
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.extend(os.path.join(root, n) for n in sorted(names) if n.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            found.append(path)
+    return found
+
+
+def build_speech_timelines(paths: List[str], output_dir: Optional[str] = None, workers: Optional[int] = None,
+                           model_path: str = MODEL_FILE, chunk_windows: int = CHUNK_WINDOWS) -> Dict:
+    """Write one timeline per audio file; returns timing and window stats."""
+    started = time.time()
+    files = find_audio_files(paths)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    jobs: List[Tuple] = []
+    plan = []  # (path, sample rate, window starts, number of jobs)
+    audio_seconds = 0.0
+    for path in files:
+        info = soundfile.info(path)
+        starts = window_starts(info.frames, info.samplerate)
+        offsets = range(0, len(starts), chunk_windows)
+        jobs.extend((path, starts[i:i + chunk_windows], starts[max(0, i - PREROLL_WINDOWS):i], info.samplerate,
+                     model_path) for i in offsets)
+        plan.append((path, info.samplerate, starts, len(offsets)))
+        audio_seconds += info.frames / float(info.samplerate)
+    workers = min(workers or os.cpu_count() or 1, max(1, len(jobs)))
+    logging.info("Scoring %d files (%.1f s of audio) in %d chunks on %d workers",
+                 len(files), audio_seconds, len(jobs), workers)
+
+    stats = {"files": len(files), "windows": 0, "voiced": 0}
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_score_job, jobs)  # in job order, while later chunks are still scored
+    else:
+        pool, results = None, map(_score_job, jobs)
+    try:
+        for path, sample_rate, starts, n_jobs in plan:
+            scored = [r for _ in range(n_jobs) for r in next(results)]
+            out_path = os.path.splitext(path)[0] + ".jsonl"
+            if output_dir:
+                out_path = os.path.join(output_dir, os.path.basename(out_path))
+            last, last_t = {"emotion": "neutral", "confidence": 0.0}, None
+            with open(out_path, "w", encoding="utf-8") as out_fh:
+                for start, result in zip(starts, scored):
+                    t = (start + WINDOW_SECONDS * sample_rate / 2.0) / sample_rate
+                    if result is not None:
+                        last, last_t = result, t
+                        emotion = result
+                    else:
+                        elapsed = t - last_t if last_t is not None else None
+                        emotion = fade_emotion(last, elapsed, DECAY_SECONDS, MIN_CONFIDENCE)
+                    out_fh.write(json.dumps({"t": round(t, 3), "emotion": emotion["emotion"],
+                                             "confidence": round(emotion["confidence"], 4),
+                                             "voice": result is not None}) + "\n")
+            stats["windows"] += len(starts)
+            stats["voiced"] += sum(r is not None for r in scored)
+            logging.info("Wrote %s", out_path)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.time() - started
+    stats.update(audio_seconds=round(audio_seconds, 2), wall_seconds=round(elapsed, 2),
+                 realtime_factor=round(audio_seconds / elapsed, 1) if elapsed > 0 else None, workers=workers)
+    logging.info("Done: %s", stats)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Write speech-emotion timelines (JSONL) for audio files")
+    parser.add_argument("inputs", nargs="+", help="audio files and/or directories")
+    parser.add_argument("--output-dir", default=None, help="where timelines go (default: next to each file)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--model", default=MODEL_FILE, help="pickled speech model (a converted .npz next to it is preferred)")
+    args = parser.parse_args(argv)
+    build_speech_timelines(args.inputs, output_dir=args.output_dir, workers=args.workers, model_path=args.model)
+
+
+if __name__ == "__main__":
+    main()
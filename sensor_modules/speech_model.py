@@ -0,0 +1,183 @@
+"""NumPy-only inference for the speech emotion model.
+
+The speech model is a scikit-learn MLPClassifier (emotion_recognition_model.pkl).
+Unpickling it imports scikit-learn, which takes over a second on a small box, and every
+prediction goes through the estimator's input validation. `convert_model` extracts the
+fitted weights into a compact .npz once; `NumpyMLP` evaluates them with a few vectorized
+NumPy operations and loads without scikit-learn.
+
+    python sensor_modules/speech_model.py aura_backend/emotion_models/emotion_recognition_model.pkl
+
+writes emotion_recognition_model.npz next to the pickle and checks that both give the
+same probabilities. Supported: MLPClassifier (multi-class or binary), optionally behind
+StandardScaler steps in a Pipeline (folded into the first layer).
+"""
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+from typing import Dict, List, Optional
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def _logistic(x):
+    return np.exp(-np.logaddexp(0.0, -x))
+
+
+HIDDEN_ACTIVATIONS = {
+    "identity": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0, out=x),
+    "tanh": np.tanh,
+    "logistic": _logistic,
+}
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def extract_parameters(estimator) -> Dict[str, np.ndarray]:
+    """Fitted weights of a supported estimator as plain arrays (see module docstring)."""
+    steps = [step for _, step in estimator.steps] if hasattr(estimator, "steps") else [estimator]
+    *preprocessing, mlp = steps
+    if type(mlp).__name__ != "MLPClassifier":
+        raise TypeError(f"Unsupported estimator {type(mlp).__name__} (expected MLPClassifier)")
+    binarizer = getattr(mlp, "_label_binarizer", None)
+    if mlp.out_activation_ not in ("softmax", "logistic") or (
+            binarizer is not None and binarizer.y_type_ == "multilabel-indicator"):
+        raise TypeError("Multi-label MLPClassifier is not supported")
+
+    coefs = [np.asarray(c, dtype=np.float64) for c in mlp.coefs_]
+    intercepts = [np.asarray(b, dtype=np.float64) for b in mlp.intercepts_]
+    # StandardScaler steps are affine: fold them into the first layer, last step first
+    for step in reversed(preprocessing):
+        if type(step).__name__ != "StandardScaler":
+            raise TypeError(f"Unsupported pipeline step {type(step).__name__}")
+        mean = step.mean_ if step.mean_ is not None else np.zeros(coefs[0].shape[0])
+        scale = step.scale_ if step.scale_ is not None else np.ones(coefs[0].shape[0])
+        coefs[0] = coefs[0] / scale[:, None]
+        intercepts[0] = intercepts[0] - mean @ coefs[0]
+
+    arrays = {
+        "format_version": np.array(FORMAT_VERSION),
+        "activation": np.array(mlp.activation),
+        "out_activation": np.array(mlp.out_activation_),
+        "classes": np.asarray(mlp.classes_),
+        "n_layers": np.array(len(coefs)),
+    }
+    for i, (coef, intercept) in enumerate(zip(coefs, intercepts)):
+        arrays[f"coef_{i}"] = coef
+        arrays[f"intercept_{i}"] = intercept
+    return arrays
+
+
+def convert_model(pickle_path: str, npz_path: Optional[str] = None) -> str:
+    """Write the weights of the pickled estimator to `npz_path` (default: next to the pickle)."""
+    npz_path = npz_path or os.path.splitext(pickle_path)[0] + ".npz"
+    with open(pickle_path, "rb") as f:
+        estimator = pickle.load(f)
+    arrays = extract_parameters(estimator)
+    arrays["source_sha256"] = np.array(file_digest(pickle_path))
+    np.savez_compressed(npz_path, **arrays)
+    return npz_path
+
+
+class NumpyMLP:
+    """`predict_proba` / `predict` of a converted MLPClassifier in plain NumPy."""
+    def __init__(self, coefs: List[np.ndarray], intercepts: List[np.ndarray], activation: str,
+                 out_activation: str, classes: np.ndarray, source_sha256: Optional[str] = None):
+        if activation not in HIDDEN_ACTIVATIONS:
+            raise ValueError(f"Unknown activation {activation}")
+        self.coefs = coefs
+        self.intercepts = intercepts
+        self.activation = activation
+        self.out_activation = out_activation
+        self.classes_ = classes
+        self.source_sha256 = source_sha256
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyMLP":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format_version"]) != FORMAT_VERSION:
+                raise ValueError(f"{path}: unsupported format version {int(data['format_version'])}")
+            n_layers = int(data["n_layers"])
+            return cls([data[f"coef_{i}"] for i in range(n_layers)],
+                       [data[f"intercept_{i}"] for i in range(n_layers)],
+                       str(data["activation"]), str(data["out_activation"]), data["classes"],
+                       str(data["source_sha256"]) if "source_sha256" in data.files else None)
+
+    def predict_proba(self, X) -> np.ndarray:
+        a = np.asarray(X, dtype=np.float64)
+        if a.ndim == 1:
+            a = a[None, :]
+        hidden = HIDDEN_ACTIVATIONS[self.activation]
+        last = len(self.coefs) - 1
+        for i, (coef, intercept) in enumerate(zip(self.coefs, self.intercepts)):
+            a = a @ coef
+            a += intercept
+            if i < last:
+                a = hidden(a)
+        if self.out_activation == "softmax":
+            a -= a.max(axis=1, keepdims=True)
+            np.exp(a, out=a)
+            a /= a.sum(axis=1, keepdims=True)
+            return a
+        p = _logistic(a[:, 0])  # binary: one logistic output for the second class
+        return np.column_stack((1.0 - p, p))
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load_model(pickle_path: str, npz_path: Optional[str] = None):
+    """The NumPy model when a .npz converted from `pickle_path` exists, else the pickled estimator."""
+    npz_path = npz_path or os.path.splitext(pickle_path)[0] + ".npz"
+    if os.path.exists(npz_path):
+        model = NumpyMLP.load(npz_path)
+        if model.source_sha256 is None or not os.path.exists(pickle_path) \
+                or model.source_sha256 == file_digest(pickle_path):
+            return model
+        logging.warning("%s was converted from a different %s; using the pickle "
+                        "(re-run speech_model.py to refresh it)", npz_path, pickle_path)
+    with open(pickle_path, "rb") as f:
+        return pickle.load(f)
+
+
+def classify(model, features: np.ndarray) -> Dict:
+    """{"emotion", "confidence"} for one feature vector from a single predict_proba pass."""
+    confidence_scores = model.predict_proba([features])[0]
+    best = int(np.argmax(confidence_scores))
+    return {"emotion": str(model.classes_[best]), "confidence": float(confidence_scores[best])}
+
+
+def check_parity(estimator, model: NumpyMLP, n_samples: int = 1000, seed: int = 0) -> float:
+    """Largest absolute probability difference on random inputs (raises if predictions differ)."""
+    n_features = model.coefs[0].shape[0]
+    X = np.random.default_rng(seed).normal(0.0, 50.0, size=(n_samples, n_features))
+    expected, actual = estimator.predict_proba(X), model.predict_proba(X)
+    if not np.array_equal(estimator.predict(X), model.predict(X)):
+        raise AssertionError("NumPy model predicts different labels than the pickled estimator")
+    return float(np.max(np.abs(expected - actual)))
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Convert the pickled speech model to a NumPy .npz")
+    parser.add_argument("pickle", help="emotion_recognition_model.pkl")
+    parser.add_argument("-o", "--output", default=None, help=".npz path (default: next to the pickle)")
+    args = parser.parse_args(argv)
+    npz_path = convert_model(args.pickle, args.output)
+    with open(args.pickle, "rb") as f:
+        estimator = pickle.load(f)
+    diff = check_parity(estimator, NumpyMLP.load(npz_path))
+    logging.info("Wrote %s (%d bytes); max probability difference vs the pickle: %.2e",
+                 npz_path, os.path.getsize(npz_path), diff)
+
+
+if __name__ == "__main__":
+    main()
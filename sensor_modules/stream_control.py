@@ -0,0 +1,172 @@
+import logging
+from typing import Dict, Optional
+
+# Resolution ladder (outgoing frame width); the controller moves one rung at a time
+WIDTH_STEPS = [160, 224, 288, 320, 384, 480]
+
+
+class StreamSettings:
+    def __init__(self, width: int, jpeg_quality: int, frame_rate: float, analyze_every: int):
+        self.width = width
+        self.jpeg_quality = jpeg_quality
+        self.frame_rate = frame_rate
+        self.analyze_every = analyze_every
+
+    def to_dict(self) -> Dict:
+        return {
+            "width": self.width,
+            "jpeg_quality": self.jpeg_quality,
+            "frame_rate": self.frame_rate,
+            "analyze_every": self.analyze_every,
+        }
+
+
+class StreamController:
+    """Feedback controller for the face stream's quality / rate knobs.
+
+    Each frame reports its local CPU time per stage, how long `websocket.send` took and
+    the transport's unsent backlog; the worker reports inference time. Every
+    `adjust_every` frames the smoothed measurements are compared with their budgets:
+
+      * network pressure (send latency vs `latency_budget_ms`, backlog vs `backlog_budget_bytes`)
+        -> lower JPEG quality, then resolution, then frame rate
+      * CPU pressure (capture+track+encode time vs `cpu_share` of the frame interval, or
+        inference slower than the analysis period) -> analyze less often, then lower
+        resolution, then frame rate
+
+    Under pressure one knob moves one step per adjustment; with clear headroom for
+    `recover_after` adjustments in a row one knob moves back (in reverse order), so a
+    weak machine or a congested link settles at the best settings it can sustain
+    instead of building a backlog. All knobs stay within the configured bounds.
+    """
+    def __init__(self, settings: StreamSettings, min_width: int = 160, max_width: int = 480,
+                 min_quality: int = 35, max_quality: int = 85, quality_step: int = 10,
+                 min_frame_rate: float = 3.0, max_frame_rate: float = 12.0,
+                 min_analyze_every: int = 2, max_analyze_every: int = 16,
+                 latency_budget_ms: float = 120.0, backlog_budget_bytes: int = 256 * 1024,
+                 cpu_share: float = 0.6, adjust_every: int = 8, recover_after: int = 3,
+                 smoothing: float = 0.3):
+        self.settings = settings
+        self.widths = [w for w in WIDTH_STEPS if min_width <= w <= max_width] or [settings.width]
+        self.min_quality, self.max_quality, self.quality_step = min_quality, max_quality, quality_step
+        self.min_frame_rate, self.max_frame_rate = min_frame_rate, max_frame_rate
+        self.min_analyze_every, self.max_analyze_every = min_analyze_every, max_analyze_every
+        self.latency_budget_ms = latency_budget_ms
+        self.backlog_budget_bytes = backlog_budget_bytes
+        self.cpu_share = cpu_share
+        self.adjust_every = adjust_every
+        self.recover_after = recover_after
+        self.smoothing = smoothing
+        self.send_ms = 0.0
+        self.backlog_bytes = 0.0
+        self.cpu_ms = 0.0
+        self.stage_ms: Dict[str, float] = {}
+        self.inference_ms: Optional[float] = None
+        self._frames = 0
+        self._calm_rounds = 0
+        self.last_change: Optional[str] = None
+
+    def _ewma(self, old: float, new: float) -> float:
+        return new if self._frames <= 1 else old + self.smoothing * (new - old)
+
+    # --- Measurements ---
+
+    def record_frame(self, stage_cpu_ms: Dict[str, float], send_ms: float, backlog_bytes: int):
+        self._frames += 1
+        for stage, ms in stage_cpu_ms.items():
+            self.stage_ms[stage] = self._ewma(self.stage_ms.get(stage, ms), ms)
+        self.cpu_ms = self._ewma(self.cpu_ms, sum(stage_cpu_ms.values()))
+        self.send_ms = self._ewma(self.send_ms, send_ms)
+        self.backlog_bytes = self._ewma(self.backlog_bytes, float(backlog_bytes))
+        if self._frames % self.adjust_every == 0:
+            self._adjust()
+
+    def record_inference(self, inference_ms: float):
+        if self.inference_ms is None:
+            self.inference_ms = inference_ms
+        else:
+            self.inference_ms += self.smoothing * (inference_ms - self.inference_ms)
+
+    # --- Control ---
+
+    def pressure(self) -> Dict[str, float]:
+        """Load relative to budget per resource (> 1 = over budget)."""
+        frame_ms = 1000.0 / self.settings.frame_rate
+        analysis_period_ms = frame_ms * self.settings.analyze_every
+        return {
+            "network": max(self.send_ms / self.latency_budget_ms, self.backlog_bytes / self.backlog_budget_bytes),
+            "cpu": self.cpu_ms / (frame_ms * self.cpu_share),
+            "analysis": (self.inference_ms or 0.0) / analysis_period_ms,
+        }
+
+    def _adjust(self):
+        load = self.pressure()
+        change = None
+        if load["network"] > 1.0:
+            self._calm_rounds = 0
+            change = self._step_quality(-1) or self._step_width(-1) or self._step_rate(-1)
+        elif load["cpu"] > 1.0 or load["analysis"] > 1.0:
+            self._calm_rounds = 0
+            if load["cpu"] <= 1.0:  # only the worker is behind: analyze less often
+                change = self._step_analysis(+1) or self._step_width(-1) or self._step_rate(-1)
+            else:  # capture/track/encode over budget: smaller frames, then fewer of them
+                change = self._step_width(-1) or self._step_rate(-1) or self._step_analysis(+1)
+        elif max(load.values()) < 0.6:
+            self._calm_rounds += 1
+            if self._calm_rounds >= self.recover_after:
+                self._calm_rounds = 0
+                change = (self._step_rate(+1) or self._step_width(+1) or self._step_quality(+1)
+                          or self._step_analysis(-1))
+        else:
+            self._calm_rounds = 0
+        if change:
+            self.last_change = change
+            logging.info("Stream controller: %s (load %s) -> %s", change,
+                         {k: round(v, 2) for k, v in load.items()}, self.settings.to_dict())
+
+    def _step_quality(self, direction: int) -> Optional[str]:
+        s = self.settings
+        target = max(self.min_quality, min(self.max_quality, s.jpeg_quality + direction * self.quality_step))
+        if target == s.jpeg_quality:
+            return None
+        s.jpeg_quality = target
+        return "jpeg_quality " + ("up" if direction > 0 else "down")
+
+    def _step_width(self, direction: int) -> Optional[str]:
+        s = self.settings
+        smaller = [w for w in self.widths if w < s.width]
+        larger = [w for w in self.widths if w > s.width]
+        if direction < 0 and smaller:
+            s.width = smaller[-1]
+        elif direction > 0 and larger:
+            s.width = larger[0]
+        else:
+            return None
+        return "width " + ("up" if direction > 0 else "down")
+
+    def _step_rate(self, direction: int) -> Optional[str]:
+        s = self.settings
+        target = s.frame_rate * (1.25 if direction > 0 else 0.8)
+        target = max(self.min_frame_rate, min(self.max_frame_rate, target))
+        if abs(target - s.frame_rate) < 1e-6:
+            return None
+        s.frame_rate = round(target, 2)
+        return "frame_rate " + ("up" if direction > 0 else "down")
+
+    def _step_analysis(self, direction: int) -> Optional[str]:
+        s = self.settings
+        target = s.analyze_every + direction * max(1, s.analyze_every // 2)
+        target = max(self.min_analyze_every, min(self.max_analyze_every, target))
+        if target == s.analyze_every:
+            return None
+        s.analyze_every = target
+        return "analyze_every " + ("up" if direction > 0 else "down")
+
+    def describe(self) -> Dict:
+        return dict(self.settings.to_dict(), **{
+            "send_ms": round(self.send_ms, 1),
+            "backlog_bytes": int(self.backlog_bytes),
+            "cpu_ms": round(self.cpu_ms, 1),
+            "stage_ms": {k: round(v, 1) for k, v in self.stage_ms.items()},
+            "inference_ms": round(self.inference_ms, 1) if self.inference_ms is not None else None,
+        })
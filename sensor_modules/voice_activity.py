@@ -0,0 +1,88 @@
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class VoiceActivityGate:
+    """Cheap speech / no-speech decision, made before any feature or model work.
+
+    The audio is cut into `block`-sample blocks. A block is voiced when it is both loud
+    (at least `margin_db` above the noise floor and above `min_level_db`) and changing:
+    its spectral flux, the mean rise in dB of `n_bands` log-spaced band energies
+    (`fmin`-`fmax`) over the previous block, reaches `flux_db`. Speech keeps producing
+    such onsets. Fans, hum and other steady noise can be loud but barely change from one
+    block to the next.
+
+    An update is active when at least `min_voiced` of its blocks are voiced, and stays
+    active for `hangover` seconds afterwards so windows that still contain the speech get
+    scored. The noise floor drops at once to any quieter block and otherwise creeps up by
+    `floor_rise_db` per second, so it follows a room getting louder but not a speaker.
+    """
+    def __init__(self, sample_rate: int, block: int = 1024, n_bands: int = 8, fmin: float = 200.0,
+                 fmax: float = 6000.0, flux_db: float = 4.0, margin_db: float = 10.0,
+                 min_level_db: float = -60.0, min_voiced: float = 0.05, floor_rise_db: float = 3.0,
+                 hangover: float = 1.0):
+        self.sample_rate = sample_rate
+        self.block = block
+        self.flux_db = flux_db
+        self.margin_db = margin_db
+        self.min_level_db = min_level_db
+        self.min_voiced = min_voiced
+        self.floor_rise_db = floor_rise_db
+        self.hangover = hangover
+        self._window = np.hanning(block).astype(np.float32)
+        freqs = np.fft.rfftfreq(block, 1.0 / sample_rate)
+        self._band_edges = np.unique(np.searchsorted(freqs, np.geomspace(fmin, fmax, n_bands + 1)))
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._prev_bands = None
+        self._hang = 0.0
+        self.noise_floor_db = None
+        self.voiced_fraction = 0.0
+        self.active = False
+
+    def update(self, samples: np.ndarray) -> bool:
+        """Feed the audio that arrived since the last call; True if it contained speech."""
+        audio = np.concatenate((self._tail, samples)) if len(self._tail) else np.asarray(samples, dtype=np.float32)
+        n = len(audio) // self.block
+        self._tail = audio[n * self.block:].copy()
+        if n == 0:
+            return self.active
+        blocks = audio[:n * self.block].reshape(n, self.block)
+
+        level_db = 10.0 * np.log10(np.mean(blocks ** 2, axis=1) + 1e-12)
+        power = np.abs(np.fft.rfft(blocks * self._window, axis=1)) ** 2
+        edges = self._band_edges
+        bands = 10.0 * np.log10(np.add.reduceat(power[:, :edges[-1]], edges[:-1], axis=1) + 1e-12)
+        previous = bands[:1] if self._prev_bands is None else self._prev_bands[None, :]
+        flux_db = np.maximum(0.0, np.diff(np.vstack((previous, bands)), axis=0)).mean(axis=1)
+        self._prev_bands = bands[-1]
+
+        rise = self.floor_rise_db * self.block / float(self.sample_rate)
+        floor = self.noise_floor_db
+        voiced = 0
+        for level, flux in zip(level_db.tolist(), flux_db.tolist()):
+            floor = level if floor is None else min(floor + rise, level)
+            if flux >= self.flux_db and level >= max(floor + self.margin_db, self.min_level_db):
+                voiced += 1
+        self.noise_floor_db = floor
+        self.voiced_fraction = voiced / float(n)
+
+        speech = self.voiced_fraction >= self.min_voiced
+        if speech:
+            self._hang = self.hangover
+        self.active = speech or self._hang > 0
+        if not speech:
+            self._hang = max(0.0, self._hang - n * self.block / float(self.sample_rate))
+        return self.active
+
+
+def fade_emotion(emotion: Dict, elapsed: Optional[float], time_constant: float = 4.0,
+                 min_confidence: float = 0.05) -> Dict:
+    """`emotion` measured `elapsed` seconds ago, faded towards neutral while nobody speaks."""
+    confidence = 0.0
+    if elapsed is not None:
+        confidence = emotion["confidence"] * math.exp(-elapsed / time_constant)
+    if confidence < min_confidence:
+        return {"emotion": "neutral", "confidence": 0.0}
+    return {"emotion": emotion["emotion"], "confidence": confidence}